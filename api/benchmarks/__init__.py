@@ -0,0 +1 @@
+"""Benchmarks for the sentiment analysis API."""
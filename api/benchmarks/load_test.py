@@ -0,0 +1,421 @@
+"""
+HTTP load test for the sentiment analysis API.
+
+Replays a JSONL corpus (or a synthetic one) against the API, either at a
+fixed number of concurrent clients (closed loop) or at a fixed arrival rate
+(open loop), and prints the results as JSON so runs can be compared over
+time. Targets a running server by URL, or the app in this process:
+
+    python -m benchmarks.load_test --url http://localhost:8000 --corpus reviews.jsonl --concurrency 16
+    python -m benchmarks.load_test --in-process --synthetic 2000 --rate 50 --duration 30 --output run.json
+
+In open-loop mode latency is measured from each request's scheduled send
+time, so a server that falls behind is charged for the time requests spent
+waiting to go out (no coordinated omission).
+
+Every text sent carries a per-run nonce and its position in the run, so the
+server's prediction caches never answer for the model, even when a short
+corpus is cycled or the benchmark is repeated. Pass --reuse-texts to send the
+corpus verbatim and measure cached serving instead. /predict/stream is sent
+as an NDJSON body of --batch-size records.
+"""
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import sys
+import time
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+import numpy as np
+
+# Vocabulary for synthetic reviews; content doesn't matter, token counts do
+_WORDS = (
+    "great terrible okay fabric size fit color love hate return quality cheap soft "
+    "small large comfortable shipping arrived broke perfect recommend again never "
+    "dress shirt shoes material stitching price worth disappointed amazing fine"
+).split()
+
+
+def load_corpus(path: Path, field: str = "text", limit: int | None = None) -> list[str]:
+    """
+    Read texts from a JSONL file.
+
+    Args:
+        path: JSONL file with one object per line.
+        field: Key holding the text in each object.
+        limit: Maximum number of texts to read.
+
+    Returns:
+        The texts, in file order.
+    """
+    texts = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if isinstance(record.get(field), str):
+                texts.append(record[field])
+            if limit is not None and len(texts) >= limit:
+                break
+    if not texts:
+        raise ValueError(f"No {field!r} strings found in {path}")
+    return texts
+
+
+def synthetic_corpus(count: int, mean_words: float = 40.0, sigma: float = 0.8, seed: int = 0) -> list[str]:
+    """
+    Generate reviews with log-normally distributed word counts.
+
+    Review lengths are heavily right-skewed in practice, which is what
+    exercises the sequence-length buckets.
+
+    Args:
+        count: Number of texts to generate.
+        mean_words: Median number of words per text.
+        sigma: Spread of the log-normal length distribution.
+        seed: Random seed, so runs replay the same corpus.
+
+    Returns:
+        The generated texts.
+    """
+    rng = random.Random(seed)
+    texts = []
+    for _ in range(count):
+        words = max(1, min(400, round(rng.lognormvariate(np.log(mean_words), sigma))))
+        texts.append(" ".join(rng.choices(_WORDS, k=words)))
+    return texts
+
+
+# Endpoints taking an NDJSON body of {"text": ...} records rather than a JSON object
+NDJSON_ENDPOINTS = ("/predict/stream",)
+
+
+def _request_body(endpoint: str, texts: list[str]) -> dict:
+    """Keyword arguments for ``client.post`` sending ``texts`` in the form the endpoint expects."""
+    if endpoint.startswith(NDJSON_ENDPOINTS):
+        body = "".join(json.dumps({"text": text}) + "\n" for text in texts)
+        return {"content": body.encode(), "headers": {"Content-Type": "application/x-ndjson"}}
+    if endpoint.startswith("/predict/batch") or endpoint.startswith("/predict/compare/batch"):
+        return {"json": {"texts": texts}}
+    return {"json": {"text": texts[0]}}
+
+
+def summarize(
+    latencies: list[float], statuses: list[int], errors: list[str], elapsed: float, texts_sent: int = 0
+) -> dict:
+    """
+    Aggregate per-request outcomes into throughput, latency percentiles and error rate.
+
+    Args:
+        latencies: Latency of every request in seconds.
+        statuses: HTTP status of every request (0 for transport errors).
+        errors: Description of every failed request (or streamed record).
+        elapsed: Wall-clock duration of the measured run in seconds.
+        texts_sent: Texts sent across all requests.
+
+    Returns:
+        Dict of summary statistics.
+    """
+    total = len(statuses)
+    succeeded = sum(200 <= status < 300 for status in statuses)
+    ok_latencies = np.array([lat for lat, status in zip(latencies, statuses) if 200 <= status < 300]) * 1000
+    status_counts: dict[str, int] = {}
+    for status in statuses:
+        status_counts[str(status)] = status_counts.get(str(status), 0) + 1
+
+    latency_ms = None
+    if len(ok_latencies):
+        p50, p95, p99 = np.percentile(ok_latencies, [50, 95, 99])
+        latency_ms = {
+            "mean": float(ok_latencies.mean()),
+            "p50": float(p50),
+            "p95": float(p95),
+            "p99": float(p99),
+            "max": float(ok_latencies.max()),
+        }
+
+    return {
+        "requests": total,
+        "texts_sent": texts_sent,
+        "succeeded": succeeded,
+        "error_rate": (total - succeeded) / total if total else 0.0,
+        "status_codes": status_counts,
+        "duration_s": elapsed,
+        "throughput_rps": succeeded / elapsed if elapsed else 0.0,
+        "latency_ms": latency_ms,
+        "sample_errors": sorted(set(errors))[:10],
+    }
+
+
+class _Recorder:
+    def __init__(self):
+        self.latencies: list[float] = []
+        self.statuses: list[int] = []
+        self.errors: list[str] = []
+        self.texts_sent = 0
+
+    def summary(self, elapsed: float) -> dict:
+        return summarize(self.latencies, self.statuses, self.errors, elapsed, self.texts_sent)
+
+    async def send(self, client: httpx.AsyncClient, endpoint: str, texts: list[str], started: float) -> None:
+        self.texts_sent += len(texts)
+        try:
+            response = await client.post(endpoint, **_request_body(endpoint, texts))
+            status = response.status_code
+            if status >= 400:
+                self.errors.append(f"{status}: {response.text[:200]}")
+            elif endpoint.startswith(NDJSON_ENDPOINTS):
+                # Streamed responses are 200 even when records fail; those are reported per line
+                for line in response.text.splitlines():
+                    record = json.loads(line)
+                    if "error" in record:
+                        self.errors.append(f"record {record.get('index')}: {record['error'][:200]}")
+        except httpx.HTTPError as exc:
+            status = 0
+            self.errors.append(f"{type(exc).__name__}: {exc}")
+        self.latencies.append(time.perf_counter() - started)
+        self.statuses.append(status)
+
+
+def _batches(texts: list[str], batch_size: int, start: int = 0, nonce: str | None = None):
+    # Cycle through the corpus forever from text ``start``, batch_size texts at a time.
+    # With a nonce every text sent is unique, so no response can come from a cache.
+    index = start
+    while True:
+        batch = [texts[(index + i) % len(texts)] for i in range(batch_size)]
+        if nonce is not None:
+            batch = [f"{text} #{nonce}-{index + i}" for i, text in enumerate(batch)]
+        yield batch
+        index += batch_size
+
+
+async def run_closed_loop(
+    client: httpx.AsyncClient,
+    endpoint: str,
+    texts: list[str],
+    concurrency: int,
+    requests: int | None,
+    duration: float | None,
+    batch_size: int = 1,
+    start: int = 0,
+    nonce: str | None = None,
+) -> dict:
+    """
+    Keep ``concurrency`` requests in flight until the request count or duration is reached.
+
+    Args:
+        client: HTTP client pointed at the API.
+        endpoint: Path to POST to.
+        texts: Corpus to replay, cycled as needed.
+        concurrency: Number of concurrent clients.
+        requests: Total number of requests to send.
+        duration: Seconds to run for (used when ``requests`` is None).
+        batch_size: Texts per request for batch endpoints.
+        start: Corpus position to start from.
+        nonce: Per-run tag making every text unique (None sends texts as they are).
+
+    Returns:
+        Summary as returned by ``summarize()``.
+    """
+    recorder = _Recorder()
+    batches = _batches(texts, batch_size, start, nonce)
+    sent = 0
+    started = time.perf_counter()
+    deadline = started + duration if duration else None
+
+    async def worker():
+        nonlocal sent
+        while (requests is None or sent < requests) and (deadline is None or time.perf_counter() < deadline):
+            sent += 1
+            await recorder.send(client, endpoint, next(batches), time.perf_counter())
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return recorder.summary(time.perf_counter() - started)
+
+
+async def run_open_loop(
+    client: httpx.AsyncClient,
+    endpoint: str,
+    texts: list[str],
+    rate: float,
+    requests: int | None,
+    duration: float | None,
+    batch_size: int = 1,
+    max_outstanding: int = 1000,
+    seed: int = 0,
+    start: int = 0,
+    nonce: str | None = None,
+) -> dict:
+    """
+    Send requests with Poisson arrivals at ``rate`` per second, regardless of responses.
+
+    Args:
+        client: HTTP client pointed at the API.
+        endpoint: Path to POST to.
+        texts: Corpus to replay, cycled as needed.
+        rate: Mean arrival rate in requests per second.
+        requests: Total number of requests to send.
+        duration: Seconds to send for (used when ``requests`` is None).
+        batch_size: Texts per request for batch endpoints.
+        max_outstanding: Requests allowed in flight before arrivals are
+            counted as client-side errors instead of sent.
+        seed: Random seed for the arrival times.
+        start: Corpus position to start from.
+        nonce: Per-run tag making every text unique (None sends texts as they are).
+
+    Returns:
+        Summary as returned by ``summarize()``, plus the offered rate.
+    """
+    recorder = _Recorder()
+    batches = _batches(texts, batch_size, start, nonce)
+    rng = random.Random(seed)
+    tasks: set[asyncio.Task] = set()
+    sent = 0
+    started = time.perf_counter()
+    scheduled = started
+
+    while (requests is None or sent < requests) and (duration is None or scheduled - started < duration):
+        scheduled += rng.expovariate(rate)
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        sent += 1
+        if len(tasks) >= max_outstanding:
+            recorder.latencies.append(0.0)
+            recorder.statuses.append(0)
+            recorder.errors.append("client: too many outstanding requests")
+            continue
+        task = asyncio.create_task(recorder.send(client, endpoint, next(batches), scheduled))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+    if tasks:
+        await asyncio.gather(*tasks)
+    summary = recorder.summary(time.perf_counter() - started)
+    summary["offered_rps"] = rate
+    return summary
+
+
+@asynccontextmanager
+async def _in_process_client(timeout: float, ready_timeout: float):
+    """Client for the app in this process, with its lifespan (model loading) running."""
+    import main
+
+    async with main.lifespan(main.app):
+        ready = await asyncio.to_thread(main.startup.wait, ready_timeout)
+        if not ready:
+            raise RuntimeError(f"App did not become ready: {main.startup.status()}")
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://in-process", timeout=timeout) as client:
+            yield client
+
+
+def _git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def _run(args: argparse.Namespace, texts: list[str]) -> dict:
+    if args.in_process:
+        client_context = _in_process_client(args.timeout, args.ready_timeout)
+    else:
+        limits = httpx.Limits(max_connections=max(args.concurrency or 0, 100))
+        client_context = httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits)
+
+    nonce = None if args.reuse_texts else uuid.uuid4().hex[:8]
+    # The measured run picks up the corpus where the warmup left off
+    start = args.warmup * args.batch_size
+    async with client_context as client:
+        if args.warmup:
+            await run_closed_loop(
+                client, args.endpoint, texts, min(args.warmup, 8), args.warmup, None, args.batch_size, 0, nonce,
+            )
+        if args.rate:
+            return await run_open_loop(
+                client, args.endpoint, texts, args.rate, args.requests, args.duration,
+                args.batch_size, args.max_outstanding, args.seed, start, nonce,
+            )
+        return await run_closed_loop(
+            client, args.endpoint, texts, args.concurrency, args.requests, args.duration, args.batch_size, start, nonce,
+        )
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Load test the sentiment analysis API.")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--url", help="Base URL of a running API, e.g. http://localhost:8000")
+    target.add_argument("--in-process", action="store_true", help="Serve the app in this process")
+
+    corpus = parser.add_mutually_exclusive_group(required=True)
+    corpus.add_argument("--corpus", type=Path, help="JSONL file of records to replay")
+    corpus.add_argument("--synthetic", type=int, metavar="N", help="Generate N synthetic reviews")
+    parser.add_argument("--field", default="text", help="JSONL key holding the text (default: text)")
+    parser.add_argument("--mean-words", type=float, default=40.0, help="Median words per synthetic review")
+    parser.add_argument("--length-sigma", type=float, default=0.8, help="Spread of synthetic review lengths")
+
+    load = parser.add_mutually_exclusive_group()
+    load.add_argument("--concurrency", type=int, default=8, help="Concurrent clients (closed loop)")
+    load.add_argument("--rate", type=float, help="Arrival rate in requests/s (open loop)")
+    parser.add_argument("--requests", type=int, help="Requests to send (default: run for --duration)")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to run for")
+    parser.add_argument("--warmup", type=int, default=20, help="Unmeasured requests sent first")
+    parser.add_argument("--max-outstanding", type=int, default=1000, help="Open-loop cap on requests in flight")
+
+    parser.add_argument("--endpoint", default="/predict", help="Endpoint to POST to (default: /predict)")
+    parser.add_argument("--batch-size", type=int, default=1, help="Texts per request for batch and stream endpoints")
+    parser.add_argument(
+        "--reuse-texts",
+        action="store_true",
+        help="Send corpus texts verbatim, so repeats can be served from the prediction caches",
+    )
+    parser.add_argument("--timeout", type=float, default=30.0, help="Per-request timeout in seconds")
+    parser.add_argument("--ready-timeout", type=float, default=600.0, help="Seconds to wait for --in-process startup")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="Also write the results JSON to this file")
+    args = parser.parse_args(argv)
+
+    if args.requests is not None:
+        args.duration = None
+    if args.corpus:
+        texts = load_corpus(args.corpus, args.field)
+    else:
+        texts = synthetic_corpus(args.synthetic, args.mean_words, args.length_sigma, args.seed)
+
+    started_at = datetime.now(timezone.utc).isoformat()
+    summary = asyncio.run(_run(args, texts))
+    result = {
+        "started_at": started_at,
+        "git_revision": _git_revision(),
+        "target": "in-process" if args.in_process else args.url,
+        "endpoint": args.endpoint,
+        "mode": "open-loop" if args.rate else "closed-loop",
+        "concurrency": None if args.rate else args.concurrency,
+        "batch_size": args.batch_size,
+        "corpus": str(args.corpus) if args.corpus else f"synthetic:{args.synthetic}",
+        "corpus_texts": len(texts),
+        "unique_texts": not args.reuse_texts,
+        **summary,
+    }
+    # How many times the corpus was cycled through; above 1 without unique texts means cache hits
+    result["corpus_passes"] = summary["texts_sent"] / len(texts)
+
+    output = json.dumps(result, indent=2)
+    print(output)
+    if args.output:
+        args.output.write_text(output + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
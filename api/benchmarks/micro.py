@@ -0,0 +1,272 @@
+"""
+Micro-benchmarks for the inference path in src/model.py, below the HTTP layer.
+
+Measures tokenizer throughput, forward-pass latency over a grid of batch
+sizes and sequence lengths, end-to-end ``predict_*`` latency and memory use,
+on the backend configured in src/config.py. Results can be saved as a
+baseline and later runs compared against it:
+
+    python -m benchmarks.micro --save-baseline benchmarks/baseline.json
+    python -m benchmarks.micro --baseline benchmarks/baseline.json --threshold 0.10
+
+The comparison exits with status 1 if a median latency, a throughput or the
+resident memory is worse than the baseline by more than the threshold. Tail
+latencies and load times are recorded but not compared, as they are too
+noisy over a few dozen repeats to gate on.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+
+from benchmarks.load_test import synthetic_corpus
+
+# Metrics compared against the baseline, by whether lower or higher is better
+_LOWER_IS_BETTER = ("p50_ms", "rss_after_load_bytes", "peak_rss_bytes")
+_HIGHER_IS_BETTER = ("_per_s",)
+
+# Environment variables that change threading behaviour and so the results
+_THREAD_ENV = ("OMP_NUM_THREADS", "TF_NUM_INTRAOP_THREADS", "TF_NUM_INTEROP_THREADS", "MKL_NUM_THREADS")
+
+
+def _time(fn: Callable[[], object], repeats: int, warmup: int = 2) -> np.ndarray:
+    """Wall-clock seconds of ``repeats`` calls to ``fn``, after ``warmup`` unmeasured calls."""
+    for _ in range(warmup):
+        fn()
+    timings = np.empty(repeats)
+    for i in range(repeats):
+        started = time.perf_counter()
+        fn()
+        timings[i] = time.perf_counter() - started
+    return timings
+
+
+def _latency(timings: np.ndarray) -> dict:
+    p50, p95 = np.percentile(timings * 1000, [50, 95])
+    return {"p50_ms": float(p50), "p95_ms": float(p95)}
+
+
+def _peak_rss() -> int:
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kB everywhere else
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+def bench_tokenizer(tokenizer, texts: list[str], batch_sizes: list[int], repeats: int) -> dict:
+    """
+    Tokenizer throughput at each batch size.
+
+    Args:
+        tokenizer: Tokenizer to benchmark.
+        texts: Corpus to tokenize.
+        batch_sizes: Number of texts per tokenizer call.
+        repeats: Measured calls per batch size.
+
+    Returns:
+        Texts and tokens per second, keyed by ``batch_<n>``.
+    """
+    from src import config
+
+    results = {}
+    for size in batch_sizes:
+        batch = texts[:size]
+        tokens = sum(len(ids) for ids in tokenizer(batch, max_length=config.max_len, truncation=True)["input_ids"])
+        timings = _time(lambda: tokenizer(batch, max_length=config.max_len, truncation=True), repeats)
+        median = float(np.median(timings))
+        results[f"batch_{size}"] = {
+            **_latency(timings),
+            "texts_per_s": size / median,
+            "tokens_per_s": tokens / median,
+        }
+    return results
+
+
+def bench_forward(backend, batch_sizes: list[int], seq_lens: list[int], repeats: int) -> dict:
+    """
+    Forward-pass latency over a grid of batch sizes and sequence lengths.
+
+    Args:
+        backend: Inference backend to benchmark.
+        batch_sizes: Batch sizes to measure.
+        seq_lens: Padded sequence lengths to measure.
+        repeats: Measured calls per grid point.
+
+    Returns:
+        Latency and throughput, keyed by ``b<batch>_s<length>``.
+    """
+    results = {}
+    rng = np.random.default_rng(0)
+    for length in seq_lens:
+        if backend.name == "tf" and length not in backend.lengths:
+            # The TF backend only has graphs for its configured buckets
+            continue
+        for size in batch_sizes:
+            input_ids = rng.integers(3, 1000, size=(size, length), dtype=np.int32)
+            attention_mask = np.ones((size, length), dtype=np.int32)
+            timings = _time(lambda: backend(input_ids, attention_mask), repeats)
+            results[f"b{size}_s{length}"] = {
+                **_latency(timings),
+                "texts_per_s": size / float(np.median(timings)),
+            }
+    return results
+
+
+def bench_predict(texts: list[str], batch_sizes: list[int], repeats: int) -> dict:
+    """
+    End-to-end latency of predict_finetuned and predict_finetuned_batch.
+
+    Every call uses texts the prediction caches haven't seen, so the numbers
+    measure inference rather than cache lookups. Texts carry a per-run nonce,
+    as the disk cache (``disk_cache_path``) keeps earlier runs' texts.
+
+    Args:
+        texts: Corpus to draw inputs from.
+        batch_sizes: Batch sizes for predict_finetuned_batch.
+        repeats: Measured calls per function and batch size.
+
+    Returns:
+        Latency and throughput, keyed by ``single`` and ``batch_<n>``.
+    """
+    from src import predict_finetuned, predict_finetuned_batch
+
+    counter = 0
+    nonce = uuid.uuid4().hex[:8]
+
+    def fresh(count: int) -> list[str]:
+        nonlocal counter
+        counter += 1
+        return [f"{texts[(counter + i) % len(texts)]} #{nonce}-{counter}" for i in range(count)]
+
+    single = _time(lambda: predict_finetuned(fresh(1)[0]), repeats)
+    results = {"single": {**_latency(single), "texts_per_s": 1 / float(np.median(single))}}
+    for size in batch_sizes:
+        timings = _time(lambda: predict_finetuned_batch(fresh(size)), repeats)
+        results[f"batch_{size}"] = {**_latency(timings), "texts_per_s": size / float(np.median(timings))}
+    return results
+
+
+def run(args: argparse.Namespace) -> dict:
+    """Run every benchmark and return the results with their environment."""
+    from src import config, load_model, memory_usage, registry, warmup
+
+    started_at = datetime.now(timezone.utc).isoformat()
+    rss_before = memory_usage()["rss"]
+    started = time.perf_counter()
+    load_model()
+    warmup()
+    load_seconds = time.perf_counter() - started
+    rss_loaded = memory_usage()["rss"]
+
+    tokenizer = registry.get("tokenizer")
+    backend = registry.get("finetuned").backend
+    texts = synthetic_corpus(max(args.batch_sizes) * 4, args.mean_words, seed=args.seed)
+
+    results = {
+        "tokenizer": bench_tokenizer(tokenizer, texts, args.batch_sizes, args.repeats),
+        "forward": bench_forward(backend, args.batch_sizes, args.seq_lens or list(backend.lengths), args.repeats),
+        "predict": bench_predict(texts, args.batch_sizes, args.repeats),
+        "memory": {
+            "load_ms": load_seconds * 1000,
+            "model_rss_bytes": rss_loaded - rss_before,
+            "rss_after_load_bytes": rss_loaded,
+            "peak_rss_bytes": _peak_rss(),
+        },
+    }
+    return {
+        "started_at": started_at,
+        "environment": {
+            "backend": config.backend,
+            "max_len": config.max_len,
+            "seq_len_buckets": list(backend.lengths),
+            "inference_batch_size": config.inference_batch_size,
+            "onnx_intra_op_threads": config.onnx_intra_op_threads,
+            "cpu_count": os.cpu_count(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            **{name: os.environ.get(name) for name in _THREAD_ENV},
+        },
+        "results": results,
+    }
+
+
+def _flatten(results: dict, prefix: str = "") -> dict[str, float]:
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(_flatten(value, name))
+        elif isinstance(value, (int, float)):
+            flat[name] = float(value)
+    return flat
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list[dict]:
+    """
+    Find metrics that regressed against a baseline by more than ``threshold``.
+
+    Args:
+        current: Results of this run (the ``results`` section).
+        baseline: Results of the baseline run (the ``results`` section).
+        threshold: Allowed relative change, e.g. 0.1 for 10%.
+
+    Returns:
+        One dict per regressed metric with its baseline and current values.
+    """
+    regressions = []
+    previous = _flatten(baseline)
+    for name, value in _flatten(current).items():
+        before = previous.get(name)
+        if not before:
+            continue
+        if name.endswith(_HIGHER_IS_BETTER):
+            change = (before - value) / before
+        elif name.endswith(_LOWER_IS_BETTER):
+            change = (value - before) / before
+        else:
+            continue
+        if change > threshold:
+            regressions.append({"metric": name, "baseline": before, "current": value, "worse_by": change})
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Micro-benchmark the inference path.")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--seq-lens", type=int, nargs="+", help="Sequence lengths (default: the backend's buckets)")
+    parser.add_argument("--repeats", type=int, default=20, help="Measured calls per data point")
+    parser.add_argument("--mean-words", type=float, default=40.0, help="Median words per synthetic review")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="Write the results JSON to this file")
+    parser.add_argument("--save-baseline", type=Path, help="Write the results as the new baseline")
+    parser.add_argument("--baseline", type=Path, help="Compare against this baseline")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Allowed relative regression (default 0.10)")
+    args = parser.parse_args(argv)
+
+    report = run(args)
+    status = 0
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())
+        report["baseline"] = {"path": str(args.baseline), "environment": baseline.get("environment")}
+        report["regressions"] = compare(report["results"], baseline["results"], args.threshold)
+        status = 1 if report["regressions"] else 0
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        args.output.write_text(output + "\n")
+    if args.save_baseline:
+        args.save_baseline.write_text(output + "\n")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
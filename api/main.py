@@ -1,19 +1,80 @@
 """FastAPI sentiment analysis API."""
 
+import asyncio
+import functools
+import hmac
+import time
+from datetime import datetime
+from pathlib import Path
 from contextlib import asynccontextmanager
+from typing import Literal
 
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI, Header, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import JSONResponse, PlainTextResponse
+from pydantic import BaseModel, Field
 
-from src import load_model, predict_finetuned, predict_pretrained
+from src import (
+    BodyStreamingResponse,
+    Counter,
+    Gauge,
+    InferenceExecutor,
+    MetricsMiddleware,
+    MicroBatcher,
+    ProfilerBusyError,
+    QueueFullError,
+    RequestTimings,
+    Startup,
+    UnknownModelError,
+    activate_version,
+    collect_timings,
+    compare_batch,
+    config,
+    disk_cache,
+    import_runtime,
+    load_background_models,
+    load_model,
+    load_version,
+    memory_usage,
+    metrics,
+    predict_batch,
+    predict_finetuned_batch,
+    prediction_cache,
+    profiler,
+    read_body,
+    registry,
+    score_ndjson,
+    tf_profile,
+    unload_version,
+    warmup,
+)
+
+batcher = MicroBatcher(
+    predict_finetuned_batch,
+    max_batch_size=config.batch_max_size,
+    max_wait_ms=config.batch_max_wait_ms,
+    max_queue=config.batch_max_queue,
+)
+executor = InferenceExecutor(
+    max_workers=config.inference_workers,
+    max_queue=config.inference_max_queue,
+)
+startup = Startup(retries=config.startup_retries, backoff_seconds=config.startup_retry_backoff_seconds)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Load model on startup."""
-    load_model()
+    """Start the request batcher and load the model in the background."""
+    batcher.start()
+    startup.start([
+        ("imports", import_runtime),
+        ("model", load_model),
+        ("warmup", warmup),
+        ("background", load_background_models),
+    ])
     yield
+    batcher.stop()
+    executor.shutdown()
 
 
 app = FastAPI(
@@ -35,11 +96,52 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
+
+
+@app.exception_handler(QueueFullError)
+async def queue_full_handler(request: Request, exc: QueueFullError):
+    """Shed load with 429 instead of letting requests queue until they time out."""
+    return JSONResponse(
+        status_code=429,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+@app.exception_handler(UnknownModelError)
+async def unknown_model_handler(request: Request, exc: UnknownModelError):
+    """Unknown model names and versions are a 404, not a server error."""
+    return JSONResponse(status_code=404, content={"detail": str(exc)})
+
 
 class ReviewRequest(BaseModel):
     """Request model for sentiment analysis."""
 
     text: str
+    version: str | None = None
+
+
+class BatchReviewRequest(BaseModel):
+    """Request model for batch sentiment analysis."""
+
+    texts: list[str] = Field(..., max_length=config.batch_request_max_texts)
+    model: Literal["finetuned", "pretrained"] = "finetuned"
+    version: str | None = None
+
+
+class CompareBatchRequest(BaseModel):
+    """Request model for comparing models on several reviews."""
+
+    texts: list[str] = Field(..., max_length=config.batch_request_max_texts)
+
+
+class LoadVersionRequest(BaseModel):
+    """Request model for loading a new model version."""
+
+    path: str | None = None
+    version: str | None = None
+    activate: bool = True
 
 
 class SentimentResponse(BaseModel):
@@ -47,31 +149,382 @@ class SentimentResponse(BaseModel):
 
     label: str
     confidence: float
+    # Stage-by-stage breakdown, only present when debug timings are requested
+    timings: dict[str, float] | None = None
+
+
+class BatchSentimentResponse(BaseModel):
+    """Response model for batch sentiment analysis."""
+
+    results: list[SentimentResponse]
+    timings: dict[str, float] | None = None
+
+
+class ScoredSentimentResponse(SentimentResponse):
+    """Sentiment prediction with the probability of every label."""
+
+    scores: dict[str, float]
+
+
+class ComparisonResponse(BaseModel):
+    """Response model for comparing the fine-tuned and pretrained models."""
+
+    finetuned: ScoredSentimentResponse
+    pretrained: ScoredSentimentResponse
+
+
+class BatchComparisonResponse(BaseModel):
+    """Response model for comparing models on several reviews."""
+
+    results: list[ComparisonResponse]
+
+
+def require_ready():
+    """Reject prediction requests until the model is loaded and warmed up."""
+    if not startup.ready:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Model is not ready ({startup.state})",
+            headers={"Retry-After": "5"},
+        )
+
+
+def require_admin(authorization: str | None = Header(default=None)):
+    """
+    Allow /admin routes only with the configured admin token.
+    
+    They load models from server paths, switch live traffic and write profiles
+    to disk, so without an ``ADMIN_TOKEN`` they don't exist at all (404), and
+    with one they need an ``Authorization: Bearer <token>`` header.
+    """
+    if config.admin_token is None:
+        raise HTTPException(status_code=404, detail="Not Found")
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(token.encode(), config.admin_token.encode()):
+        raise HTTPException(
+            status_code=401,
+            detail="Invalid or missing admin token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+
+def debug_timings(request: Request) -> RequestTimings | None:
+    """
+    Start a timing breakdown if the request asks for one.
+    
+    Enabled by an ``X-Debug-Timings: 1`` header or a ``?debug=timings`` query
+    parameter. Requests without either pay nothing beyond this check.
+    """
+    header = request.headers.get("x-debug-timings", "").lower()
+    if header in ("1", "true", "yes") or request.query_params.get("debug") == "timings":
+        return RequestTimings()
+    return None
+
+
+def _with_timings(response: BaseModel, timings: RequestTimings | None, started: float) -> BaseModel:
+    if timings is not None:
+        timings.add("total", time.perf_counter() - started)
+        response.timings = timings.as_dict()
+    return response
+
+
+def _readiness() -> JSONResponse:
+    status = startup.status()
+    return JSONResponse(status_code=200 if startup.ready else 503, content=status)
 
 
 @app.get("/health")
 def health_check():
-    """Health check endpoint."""
-    return {"status": "healthy"}
+    """Health check endpoint (same as /health/ready)."""
+    return _readiness()
+
+
+@app.get("/health/live")
+def liveness():
+    """
+    Liveness probe: the process is up and serving HTTP.
+    
+    Returns 503 once startup has failed for good, so the orchestrator restarts
+    a process that would otherwise never become ready.
+    """
+    if startup.failed:
+        return JSONResponse(status_code=503, content=startup.status())
+    return {"status": "alive"}
+
 
+@app.get("/health/ready")
+def readiness():
+    """Readiness probe: 200 once the model is loaded and warmed up, 503 before."""
+    return _readiness()
 
-@app.post("/predict", response_model=SentimentResponse)
-def predict_sentiment(request: ReviewRequest):
+
+@app.get("/models")
+def list_models():
+    """Load state and load time of every registered model."""
+    return registry.status()
+
+
+@app.get("/cache/stats")
+def cache_stats():
+    """Prediction cache hit/miss/eviction counters for each cache tier."""
+    return {
+        "memory": prediction_cache.stats(),
+        "disk": disk_cache.stats() if disk_cache is not None else None,
+    }
+
+
+@app.get("/queue/stats")
+def queue_stats():
+    """Queue depth and wait times of the batcher and the inference executor."""
+    return {"batcher": batcher.stats(), "executor": executor.stats()}
+
+
+def _collect_metrics():
+    """Mirror the existing cache, queue, model and memory stats as metrics at scrape time."""
+    cache_hits = Counter("sentiment_cache_hits_total", "Prediction cache hits.", ("tier",))
+    cache_misses = Counter("sentiment_cache_misses_total", "Prediction cache misses.", ("tier",))
+    cache_hit_ratio = Gauge("sentiment_cache_hit_ratio", "Prediction cache hit ratio since start.", ("tier",))
+    cache_entries = Gauge("sentiment_cache_entries", "Predictions currently cached.", ("tier",))
+    tiers = {"memory": prediction_cache.stats()}
+    if disk_cache is not None:
+        tiers["disk"] = disk_cache.stats()
+    for tier, stats in tiers.items():
+        cache_hits.set_total(stats["hits"], tier=tier)
+        cache_misses.set_total(stats["misses"], tier=tier)
+        cache_hit_ratio.set(stats["hit_rate"], tier=tier)
+        cache_entries.set(stats.get("entries", stats.get("rows", 0)), tier=tier)
+
+    queue_depth = Gauge("sentiment_queue_depth", "Requests waiting for inference.", ("queue",))
+    queue_rejected = Counter("sentiment_queue_rejected_total", "Requests rejected with 429.", ("queue",))
+    for queue, stats in (("batcher", batcher.stats()), ("executor", executor.stats())):
+        queue_depth.set(stats["queued"], queue=queue)
+        queue_rejected.set_total(stats["rejected"], queue=queue)
+
+    load_seconds = Gauge("sentiment_model_load_seconds", "Time the last load of each model took.", ("model",))
+    loaded = Gauge("sentiment_model_loaded", "Loaded model versions (1 = active).", ("model", "version"))
+    for name, status in registry.status().items():
+        if status["load_seconds"] is not None:
+            load_seconds.set(status["load_seconds"], model=name)
+        for version in status.get("versions", {}):
+            loaded.set(1 if version == status["active_version"] else 0, model=name, version=version)
+
+    memory = Gauge("process_memory_bytes", "Memory footprint of this worker process.", ("kind",))
+    for kind, value in memory_usage().items():
+        if kind != "pid":
+            memory.set(value, kind=kind)
+
+    return [
+        cache_hits, cache_misses, cache_hit_ratio, cache_entries,
+        queue_depth, queue_rejected, load_seconds, loaded, memory,
+    ]
+
+
+metrics.register_collector(_collect_metrics)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics_endpoint():
+    """
+    Metrics in the Prometheus text format.
+    
+    Covers request latency per endpoint, queue wait, per-stage inference
+    latency, batch-size and sequence-length distributions, cache hit rates,
+    model load times and process memory. Under serve.py each worker reports
+    its own metrics.
+    """
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.get("/debug/memory")
+def debug_memory():
+    """Memory footprint of the worker process serving this request."""
+    return memory_usage()
+
+
+async def _predict_finetuned(request: ReviewRequest, timings: RequestTimings | None) -> SentimentResponse:
+    started = time.perf_counter()
+    with collect_timings(timings):
+        if request.version is None:
+            result = await asyncio.wrap_future(batcher.submit(request.text))
+        else:
+            # Pinned versions bypass the batcher, which always uses the active version
+            [result] = await executor.run(predict_batch, [request.text], "finetuned", request.version)
+    return _with_timings(SentimentResponse(**result), timings, started)
+
+
+@app.post(
+    "/predict",
+    response_model=SentimentResponse,
+    response_model_exclude_none=True,
+    dependencies=[Depends(require_ready)],
+)
+async def predict_sentiment(request: ReviewRequest, timings: RequestTimings | None = Depends(debug_timings)):
     """Predict sentiment for a product review (uses fine-tuned model by default)."""
-    result = predict_finetuned(request.text)
-    return SentimentResponse(**result)
+    return await _predict_finetuned(request, timings)
 
 
-@app.post("/predict/finetuned", response_model=SentimentResponse)
-def predict_finetuned_endpoint(request: ReviewRequest):
+@app.post(
+    "/predict/finetuned",
+    response_model=SentimentResponse,
+    response_model_exclude_none=True,
+    dependencies=[Depends(require_ready)],
+)
+async def predict_finetuned_endpoint(request: ReviewRequest, timings: RequestTimings | None = Depends(debug_timings)):
     """Predict sentiment using fine-tuned model."""
-    result = predict_finetuned(request.text)
-    return SentimentResponse(**result)
+    return await _predict_finetuned(request, timings)
 
 
-@app.post("/predict/pretrained", response_model=SentimentResponse)
-def predict_pretrained_endpoint(request: ReviewRequest):
+@app.post(
+    "/predict/pretrained",
+    response_model=SentimentResponse,
+    response_model_exclude_none=True,
+    dependencies=[Depends(require_ready)],
+)
+async def predict_pretrained_endpoint(request: ReviewRequest, timings: RequestTimings | None = Depends(debug_timings)):
     """Predict sentiment using pretrained model (before fine-tuning)."""
-    result = predict_pretrained(request.text)
-    return SentimentResponse(**result)
+    started = time.perf_counter()
+    with collect_timings(timings):
+        [result] = await executor.run(predict_batch, [request.text], "pretrained", request.version)
+    return _with_timings(SentimentResponse(**result), timings, started)
+
+
+@app.post(
+    "/predict/batch",
+    response_model=BatchSentimentResponse,
+    response_model_exclude_none=True,
+    dependencies=[Depends(require_ready)],
+)
+async def predict_batch_endpoint(request: BatchReviewRequest, timings: RequestTimings | None = Depends(debug_timings)):
+    """Predict sentiment for several reviews in one call, in input order."""
+    started = time.perf_counter()
+    with collect_timings(timings):
+        results = await executor.run(predict_batch, request.texts, request.model, request.version)
+    response = BatchSentimentResponse(results=[SentimentResponse(**r) for r in results])
+    return _with_timings(response, timings, started)
+
+
+@app.post(
+    "/predict/compare",
+    response_model=ComparisonResponse,
+    response_model_exclude_none=True,
+    dependencies=[Depends(require_ready)],
+)
+async def predict_compare_endpoint(request: ReviewRequest):
+    """Score a review with both models in one pass, sharing its tokenization."""
+    [result] = await executor.run(compare_batch, [request.text])
+    return ComparisonResponse(**result)
+
+
+@app.post(
+    "/predict/compare/batch",
+    response_model=BatchComparisonResponse,
+    response_model_exclude_none=True,
+    dependencies=[Depends(require_ready)],
+)
+async def predict_compare_batch_endpoint(request: CompareBatchRequest):
+    """Score several reviews with both models in one pass, in input order."""
+    results = await executor.run(compare_batch, request.texts)
+    return BatchComparisonResponse(results=[ComparisonResponse(**r) for r in results])
+
+
+@app.post("/predict/stream", dependencies=[Depends(require_ready)])
+async def predict_stream_endpoint(
+    request: Request,
+    model: Literal["finetuned", "pretrained"] = "finetuned",
+    version: str | None = None,
+):
+    """
+    Score a streamed NDJSON body of {"text": ...} records.
+    
+    Results are streamed back as NDJSON in input order while the upload is
+    still being read, so memory use does not depend on the body size.
+    """
+    if version is not None and version not in registry.entry(model).versions:
+        # Fail before streaming starts rather than on every chunk
+        raise UnknownModelError(f"Unknown version {version!r} of model {model!r}")
+    body_read = asyncio.Event()
+    return BodyStreamingResponse(
+        score_ndjson(
+            read_body(request.receive, body_read),
+            functools.partial(predict_batch, model_name=model, version=version),
+            executor.run,
+            chunk_size=config.stream_chunk_size,
+            max_line_bytes=config.stream_max_line_bytes,
+            max_retries=config.stream_max_retries,
+        ),
+        media_type="application/x-ndjson",
+        body_read=body_read,
+    )
+
+
+@app.post("/admin/models/{name}/versions", dependencies=[Depends(require_admin)])
+async def load_model_version(name: Literal["finetuned", "pretrained"], request: LoadVersionRequest):
+    """
+    Load and warm up a new model version without downtime.
+    
+    Traffic keeps flowing to the current version while the new one loads.
+    With ``activate`` it then switches over atomically and the old version is
+    freed once its in-flight requests finish; otherwise the new version only
+    serves requests that pin it.
+    """
+    try:
+        # Loading takes seconds, so it runs off the loop and off the inference workers
+        await asyncio.to_thread(load_version, name, request.path, request.version, request.activate)
+    except FileNotFoundError as exc:
+        raise HTTPException(status_code=404, detail=str(exc))
+    except ValueError as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
+    return registry.entry(name).status()
+
+
+@app.post("/admin/models/{name}/versions/{version}/activate", dependencies=[Depends(require_admin)])
+def activate_model_version(name: Literal["finetuned", "pretrained"], version: str):
+    """Switch a model's traffic to an already loaded version."""
+    activate_version(name, version)
+    return registry.entry(name).status()
+
+
+@app.delete("/admin/models/{name}/versions/{version}", dependencies=[Depends(require_admin)])
+def unload_model_version(name: Literal["finetuned", "pretrained"], version: str):
+    """Free a loaded version that isn't the active one."""
+    try:
+        unload_version(name, version)
+    except ValueError as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
+    return registry.entry(name).status()
+
 
+@app.post("/admin/profile", dependencies=[Depends(require_admin)])
+async def capture_profile(seconds: float = 10.0, kind: Literal["cprofile", "tf"] = "cprofile"):
+    """
+    Profile the inference path for a number of seconds and write the trace to disk.
+    
+    ``cprofile`` profiles the inference threads and writes a ``.prof`` file
+    (open with ``python -m pstats`` or snakeviz), returning the top functions.
+    ``tf`` captures a TensorFlow profiler trace for TensorBoard; it needs the
+    TF backend. The capture covers whatever traffic arrives in the window.
+    """
+    if not 0 < seconds <= config.profile_max_seconds:
+        raise HTTPException(status_code=422, detail=f"seconds must be in (0, {config.profile_max_seconds}]")
+    
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    if kind == "tf":
+        if config.backend != "tf":
+            raise HTTPException(status_code=400, detail="TF profiling needs the TF backend; use kind=cprofile")
+        logdir = Path(config.profile_dir) / f"tf-{stamp}"
+        try:
+            with tf_profile(logdir):
+                await asyncio.sleep(seconds)
+        except ProfilerBusyError as exc:
+            raise HTTPException(status_code=409, detail=str(exc))
+        return {"path": str(logdir), "seconds": seconds}
+    
+    try:
+        profiler.start()
+    except ProfilerBusyError as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        result = await asyncio.to_thread(profiler.stop, Path(config.profile_dir) / f"cprofile-{stamp}.prof")
+    return {**result, "seconds": seconds}
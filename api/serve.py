@@ -0,0 +1,156 @@
+"""
+Pre-fork server for the sentiment analysis API.
+
+The parent process binds the listening socket and imports the application
+once, then forks the workers. With an ONNX backend it also imports the ML
+runtime and loads the tokenizer before forking, so they are shared
+copy-on-write. The workers then memory-map the same weights file, so the
+model weights are held in memory once no matter how many workers run.
+
+With the TF backend nothing heavy is imported before the fork: TensorFlow's
+thread pools are not fork-safe, and its weights can't be shared anyway, so
+each worker imports TensorFlow and loads its own copy. Pre-forking then
+saves no memory over ``uvicorn --workers``, and a warning says so.
+
+    python serve.py --workers 4 --host 0.0.0.0 --port 8000
+"""
+import argparse
+import gc
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+
+import uvicorn
+
+logger = logging.getLogger("serve")
+
+
+def _bind(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _run_worker(app, sock: socket.socket, log_level: str) -> None:
+    # Children must not inherit the parent's signal handlers
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    server = uvicorn.Server(uvicorn.Config(app, log_level=log_level))
+    server.run(sockets=[sock])
+
+
+def _spawn(app, sock: socket.socket, log_level: str) -> int:
+    pid = os.fork()
+    if pid == 0:
+        status = 1
+        try:
+            _run_worker(app, sock, log_level)
+            status = 0
+        except BaseException:
+            logger.exception("worker %d crashed", os.getpid())
+        finally:
+            os._exit(status)
+    return pid
+
+
+def _report_memory(workers: list[int]) -> None:
+    from src.memory import memory_usage
+
+    total_pss = 0
+    for pid in workers:
+        try:
+            usage = memory_usage(pid)
+        except (OSError, ProcessLookupError):
+            continue
+        total_pss += usage.get("pss", usage["rss"])
+        logger.info(
+            "worker %d: rss=%.0fMB pss=%.0fMB shared=%.0fMB",
+            pid,
+            usage["rss"] / 2**20,
+            usage.get("pss", usage["rss"]) / 2**20,
+            usage.get("shared", 0) / 2**20,
+        )
+    logger.info("workers total pss=%.0fMB", total_pss / 2**20)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Serve the API with pre-forked workers.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--log-level", default="info")
+    parser.add_argument(
+        "--memory-report-interval",
+        type=float,
+        default=60.0,
+        help="Seconds between per-worker memory reports (0 disables them)",
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=args.log_level.upper(), format="%(asctime)s %(name)s %(message)s")
+    sock = _bind(args.host, args.port)
+
+    from main import app
+    from src import config, import_runtime, load_tokenizer
+
+    if config.backend == "tf":
+        # TensorFlow must not be started in the parent: its thread pools don't survive a fork
+        if args.workers > 1:
+            logger.warning(
+                "the tf backend shares no model memory between workers; each of the %d workers "
+                "loads its own copy (use an ONNX backend to share weights)",
+                args.workers,
+            )
+    else:
+        # Heavy imports and the tokenizer happen once, before forking
+        import_runtime()
+        load_tokenizer()
+
+    # Move everything allocated so far out of the GC's reach, so collections
+    # in the workers don't write to (and so un-share) these pages
+    gc.freeze()
+
+    workers = [_spawn(app, sock, args.log_level) for _ in range(args.workers)]
+    logger.info("started %d workers on %s:%d: %s", len(workers), args.host, args.port, workers)
+
+    stopping = False
+
+    def _stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+
+    next_report = time.monotonic() + args.memory_report_interval
+    while workers:
+        pid, status = os.waitpid(-1, os.WNOHANG)
+        if pid:
+            workers.remove(pid)
+            if not stopping:
+                logger.warning("worker %d exited with status %d, restarting", pid, status)
+                workers.append(_spawn(app, sock, args.log_level))
+            continue
+
+        if args.memory_report_interval and time.monotonic() >= next_report:
+            _report_memory(workers)
+            next_report = time.monotonic() + args.memory_report_interval
+        time.sleep(0.5)
+
+    sock.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,73 @@
 """Sentiment analysis for product reviews"""
 from .config import config
-from .model import load_model, predict_finetuned, predict_pretrained
+from .batching import MicroBatcher
+from .executor import InferenceExecutor, QueueFullError
+from .memory import memory_usage
+from .metrics import Counter, Gauge, Histogram, MetricsMiddleware, metrics
+from .profiling import ProfilerBusyError, RequestTimings, collect_timings, profiler, tf_profile
+from .startup import Startup
+from .streaming import BodyStreamingResponse, read_body, score_ndjson
+from .model import (
+    MODEL_NAMES,
+    activate_version,
+    compare,
+    compare_batch,
+    disk_cache,
+    import_runtime,
+    load_background_models,
+    load_model,
+    load_tokenizer,
+    load_version,
+    predict_batch,
+    prediction_cache,
+    registry,
+    predict_finetuned,
+    predict_finetuned_batch,
+    predict_pretrained,
+    predict_pretrained_batch,
+    unload_version,
+    warmup,
+)
+from .registry import UnknownModelError
 
-__all__ = ["load_model", "predict_finetuned", "predict_pretrained", "config"]
+__all__ = [
+    "import_runtime",
+    "load_model",
+    "load_tokenizer",
+    "load_background_models",
+    "load_version",
+    "activate_version",
+    "unload_version",
+    "predict_batch",
+    "predict_finetuned",
+    "predict_finetuned_batch",
+    "predict_pretrained",
+    "predict_pretrained_batch",
+    "compare",
+    "compare_batch",
+    "warmup",
+    "MicroBatcher",
+    "InferenceExecutor",
+    "QueueFullError",
+    "UnknownModelError",
+    "memory_usage",
+    "metrics",
+    "Counter",
+    "Gauge",
+    "Histogram",
+    "MetricsMiddleware",
+    "score_ndjson",
+    "read_body",
+    "BodyStreamingResponse",
+    "Startup",
+    "RequestTimings",
+    "collect_timings",
+    "profiler",
+    "ProfilerBusyError",
+    "tf_profile",
+    "prediction_cache",
+    "disk_cache",
+    "registry",
+    "MODEL_NAMES",
+    "config",
+]
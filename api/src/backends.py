@@ -0,0 +1,257 @@
+"""Inference backends for the sentiment classifier."""
+from abc import ABC, abstractmethod
+from pathlib import Path
+
+import numpy as np
+
+# Artifact file names produced by `python -m src.export`
+ONNX_FILENAME = "model.onnx"
+ONNX_INT8_FILENAME = "model.int8.onnx"
+
+BACKENDS = ("tf", "onnx", "onnx-int8")
+
+
+class InferenceBackend(ABC):
+    """
+    Base class for something that turns padded token batches into probabilities.
+    
+    Batches are padded to one of a fixed set of sequence lengths, so backends
+    that compile per shape only ever see a handful of shapes. Subclasses must
+    define ``name`` (a class attribute is enough) and ``__call__``.
+    """
+
+    @property
+    @abstractmethod
+    def name(self) -> str:
+        """Backend name reported in cache keys and metrics."""
+
+    def __init__(self, lengths: tuple[int, ...]):
+        """
+        Initialize the backend.
+        
+        Args:
+            lengths: Sequence-length buckets inputs are padded to.
+        """
+        self.lengths = tuple(sorted(lengths))
+
+    def bucket_length(self, length: int) -> int:
+        """Smallest bucket length that fits ``length`` tokens."""
+        for bucket in self.lengths:
+            if bucket >= length:
+                return bucket
+        return self.lengths[-1]
+
+    @abstractmethod
+    def __call__(self, input_ids: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+        """
+        Compute class probabilities for a padded batch.
+        
+        Args:
+            input_ids: Token ids of shape (batch, length), length a bucket length.
+            attention_mask: Attention mask of the same shape.
+        
+        Returns:
+            Array of shape (batch, num_labels) with softmax probabilities.
+        """
+
+    def warmup(self) -> None:
+        """Run every bucket once so no request pays for first-call setup."""
+        for length in self.lengths:
+            dummy = np.ones((1, length), dtype=np.int32)
+            self(dummy, dummy)
+
+
+class TFBackend(InferenceBackend):
+    """
+    Graph-compiled TensorFlow inference for a Keras sequence classifier.
+    
+    One ``tf.function`` is traced per sequence-length bucket with a fixed input
+    signature, so every request runs a pre-built graph instead of eager Keras
+    calls.
+    """
+
+    name = "tf"
+
+    def __init__(self, classifier, lengths: tuple[int, ...]):
+        """
+        Initialize the backend.
+        
+        Args:
+            classifier: Loaded ``TFRobertaForSequenceClassification`` model.
+            lengths: Sequence-length buckets to compile.
+        """
+        super().__init__(lengths)
+        self.classifier = classifier
+        self._functions = {length: self._compile(length) for length in self.lengths}
+
+    def _compile(self, length: int):
+        import tensorflow as tf
+
+        spec = tf.TensorSpec(shape=(None, length), dtype=tf.int32)
+
+        @tf.function(input_signature=[spec, spec])
+        def forward(input_ids, attention_mask):
+            logits = self.classifier(input_ids=input_ids, attention_mask=attention_mask, training=False).logits
+            return tf.nn.softmax(logits, axis=-1)
+
+        return forward
+
+    def __call__(self, input_ids: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+        forward = self._functions[input_ids.shape[1]]
+        return forward(
+            np.asarray(input_ids, dtype=np.int32),
+            np.asarray(attention_mask, dtype=np.int32),
+        ).numpy()
+
+
+def map_external_initializers(path: str | Path) -> dict[str, np.ndarray]:
+    """
+    Memory-map the externally stored weights of an ONNX model.
+    
+    Pages of a file mapping live in the OS page cache, so every process that
+    maps the same weights file shares one physical copy of them.
+    
+    Args:
+        path: Path to an ``.onnx`` file saved with external data.
+    
+    Returns:
+        Mapping of initializer name to a memory-mapped array (empty if the
+        model stores its weights inline).
+    """
+    import onnx
+    from onnx.helper import tensor_dtype_to_np_dtype
+
+    path = Path(path)
+    proto = onnx.load(str(path), load_external_data=False)
+    arrays = {}
+    for tensor in proto.graph.initializer:
+        if tensor.data_location != onnx.TensorProto.EXTERNAL:
+            continue
+        info = {entry.key: entry.value for entry in tensor.external_data}
+        # Copy-on-write mapping: ONNX Runtime uses the buffer in place, and any
+        # accidental write stays private instead of touching the file
+        arrays[tensor.name] = np.memmap(
+            path.parent / info["location"],
+            dtype=tensor_dtype_to_np_dtype(tensor.data_type),
+            mode="c",
+            offset=int(info.get("offset", 0)),
+            shape=tuple(tensor.dims),
+        )
+    return arrays
+
+
+class OnnxBackend(InferenceBackend):
+    """
+    ONNX Runtime inference for an exported (optionally INT8-quantized) classifier.
+    
+    With ``share_weights`` the model's external weight file is memory-mapped
+    and handed to ONNX Runtime as pre-allocated initializers, so several
+    worker processes serving the same model share its weights in memory.
+    """
+
+    name = "onnx"
+
+    def __init__(
+        self,
+        path: str | Path,
+        lengths: tuple[int, ...],
+        intra_op_threads: int = 0,
+        name: str = "onnx",
+        share_weights: bool = False,
+    ):
+        """
+        Initialize the backend.
+        
+        Args:
+            path: Path to the ``.onnx`` model file.
+            lengths: Sequence-length buckets inputs are padded to.
+            intra_op_threads: ONNX Runtime intra-op threads (0 lets it decide).
+            name: Backend name reported in cache keys and metrics.
+            share_weights: Memory-map external weights instead of loading private copies.
+        """
+        try:
+            import onnxruntime as ort
+        except ImportError as exc:
+            raise ImportError(
+                "The ONNX backend requires onnxruntime. Install it with `pip install .[onnx]`."
+            ) from exc
+
+        super().__init__(lengths)
+        self.name = name
+        self.path = Path(path)
+        if not self.path.exists():
+            raise FileNotFoundError(
+                f"ONNX model not found at {self.path}. Run `python -m src.export` first."
+            )
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = intra_op_threads
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+
+        # Keep references: the session reads straight from these buffers
+        self._shared_weights = map_external_initializers(self.path) if share_weights else {}
+        self._shared_values = []
+        if self._shared_weights:
+            # Pre-packing would copy every weight into a private buffer
+            options.add_session_config_entry("session.disable_prepacking", "1")
+            for name, array in self._shared_weights.items():
+                value = ort.OrtValue.ortvalue_from_numpy(array)
+                self._shared_values.append(value)
+                options.add_initializer(name, value)
+
+        self.session = ort.InferenceSession(
+            str(self.path), sess_options=options, providers=["CPUExecutionProvider"]
+        )
+
+    def __call__(self, input_ids: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+        (logits,) = self.session.run(
+            None,
+            {
+                "input_ids": np.asarray(input_ids, dtype=np.int32),
+                "attention_mask": np.asarray(attention_mask, dtype=np.int32),
+            },
+        )
+        logits = logits - logits.max(axis=-1, keepdims=True)
+        exp = np.exp(logits)
+        return exp / exp.sum(axis=-1, keepdims=True)
+
+
+def load_backend(
+    kind: str,
+    model_path: str | Path,
+    onnx_dir: str | Path,
+    lengths: tuple[int, ...],
+    intra_op_threads: int = 0,
+    share_weights: bool = False,
+) -> InferenceBackend:
+    """
+    Load a fine-tuned classifier on the requested backend.
+    
+    Args:
+        kind: One of ``BACKENDS``.
+        model_path: Directory of the saved TF model.
+        onnx_dir: Directory holding the exported ONNX artifacts.
+        lengths: Sequence-length buckets.
+        intra_op_threads: Intra-op threads for ONNX Runtime.
+        share_weights: Memory-map ONNX weights so worker processes share them.
+    
+    Returns:
+        Ready-to-use inference backend.
+    """
+    if kind == "tf":
+        from transformers import TFRobertaForSequenceClassification
+
+        return TFBackend(TFRobertaForSequenceClassification.from_pretrained(str(model_path)), lengths)
+    if kind == "onnx":
+        return OnnxBackend(
+            Path(onnx_dir) / ONNX_FILENAME, lengths, intra_op_threads, share_weights=share_weights
+        )
+    if kind == "onnx-int8":
+        return OnnxBackend(
+            Path(onnx_dir) / ONNX_INT8_FILENAME,
+            lengths,
+            intra_op_threads,
+            name="onnx-int8",
+            share_weights=share_weights,
+        )
+    raise ValueError(f"Unknown backend {kind!r}. Expected one of {BACKENDS}.")
@@ -0,0 +1,181 @@
+"""Request coalescing for single-text inference."""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable
+
+from .executor import QueueFullError
+from .metrics import queue_wait
+from .profiling import RequestTimings, collect_timings, current_timings, profiler
+
+_STOP = object()
+
+
+class MicroBatcher:
+    """
+    Coalesce concurrent single-text predictions into batched forward passes.
+
+    A background worker takes the first queued request, then keeps collecting
+    requests until either ``max_batch_size`` is reached or ``max_wait_ms`` has
+    elapsed, and runs the whole group through ``predict_batch`` in one call.
+    Each caller gets its own result back through a ``Future``. At most
+    ``max_queue`` requests may wait; further submissions raise QueueFullError.
+    """
+
+    def __init__(
+        self,
+        predict_batch: Callable[[list[str]], list[dict]],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+        max_queue: int = 256,
+    ):
+        """
+        Initialize the batcher.
+
+        Args:
+            predict_batch: Function mapping a list of texts to a list of results.
+            max_batch_size: Maximum number of requests per forward pass.
+            max_wait_ms: Maximum time to wait for a batch to fill up.
+            max_queue: Maximum number of requests waiting to be batched.
+        """
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+
+        self.predict_batch = predict_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_queue = max_queue
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.rejected = 0
+        self._batched_total = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def start(self) -> None:
+        """Start the background worker thread."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the worker after it has flushed already queued requests."""
+        if self._thread is None:
+            return
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._thread = None
+
+    def submit(self, text: str) -> Future:
+        """
+        Queue a text for prediction.
+
+        Args:
+            text: Input text to classify.
+
+        Returns:
+            Future resolving to a dict with 'label' and 'confidence' keys.
+        
+        Raises:
+            QueueFullError: If ``max_queue`` requests are already waiting.
+        """
+        if self._thread is None:
+            raise RuntimeError("Batcher not running. Call start() first.")
+
+        if self._queue.qsize() >= self.max_queue:
+            with self._lock:
+                self.rejected += 1
+            raise QueueFullError(retry_after=1)
+
+        future: Future = Future()
+        self._queue.put((text, future, time.monotonic(), current_timings()))
+        return future
+
+    def predict(self, text: str, timeout: float | None = None) -> dict:
+        """
+        Predict sentiment for a single text, blocking until its batch has run.
+
+        Args:
+            text: Input text to classify.
+            timeout: Optional maximum number of seconds to wait.
+
+        Returns:
+            Dict with 'label' and 'confidence' keys.
+        """
+        return self.submit(text).result(timeout=timeout)
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+
+            batch = [item]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            self._dispatch(batch)
+
+    def _dispatch(self, batch: list[tuple[str, Future, float, RequestTimings | None]]) -> None:
+        now = time.monotonic()
+        waits = [now - queued_at for _, _, queued_at, _ in batch]
+        with self._lock:
+            self.batches += 1
+            self._batched_total += len(batch)
+            self._wait_total += sum(waits)
+            self._wait_max = max(self._wait_max, *waits)
+        queue_wait.observe_many(waits, queue="batcher")
+
+        # Requests that asked for debug timings share the batch's stage timings
+        requested = [(timings, wait) for (*_, timings), wait in zip(batch, waits) if timings is not None]
+        batch_timings = RequestTimings() if requested else None
+
+        # Drop requests whose callers have already given up
+        batch = [(text, future) for text, future, _, _ in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+
+        try:
+            with collect_timings(batch_timings):
+                results = profiler.run(self.predict_batch, [text for text, _ in batch])
+        except Exception as exc:
+            for _, future in batch:
+                future.set_exception(exc)
+            return
+
+        if batch_timings is not None:
+            batch_timings.batch_size = len(batch)
+            for timings, wait in requested:
+                timings.add("queue_wait", wait)
+                timings.merge(batch_timings)
+
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+    def stats(self) -> dict:
+        """Queue depth, batch sizes and wait times."""
+        with self._lock:
+            return {
+                "max_batch_size": self.max_batch_size,
+                "max_queue": self.max_queue,
+                "queued": self._queue.qsize(),
+                "batches": self.batches,
+                "rejected": self.rejected,
+                "avg_batch_size": self._batched_total / self.batches if self.batches else 0.0,
+                "avg_wait_ms": self._wait_total / self._batched_total * 1000 if self._batched_total else 0.0,
+                "max_wait_ms": self._wait_max * 1000,
+            }
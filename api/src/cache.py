@@ -0,0 +1,231 @@
+"""In-process prediction cache."""
+import hashlib
+import sys
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalize review text so trivially different inputs share a cache entry.
+    
+    Applies Unicode NFC normalization and collapses runs of whitespace. The
+    normalized text is also what gets sent to the model, so a cached result
+    is always the result the model would have produced.
+    
+    Args:
+        text: Raw input text.
+    
+    Returns:
+        Normalized text.
+    """
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def text_hash(text: str) -> str:
+    """Hash of normalized text used as the per-model cache key."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def fingerprint_model(path: str | Path) -> str:
+    """
+    Fingerprint a saved model directory from its file names, sizes and mtimes.
+    
+    Redeploying a model into the same directory changes the fingerprint, so
+    cache entries keyed by it can never outlive the weights they came from.
+    
+    Args:
+        path: Model directory or file (or a hub model name if it doesn't exist locally).
+    
+    Returns:
+        Short hex digest identifying the model.
+    """
+    path = Path(path)
+    digest = hashlib.sha256()
+    if path.is_dir():
+        for file in sorted(p for p in path.rglob("*") if p.is_file()):
+            stat = file.stat()
+            digest.update(f"{file.relative_to(path)}:{stat.st_size}:{stat.st_mtime_ns}\n".encode())
+    elif path.is_file():
+        stat = path.stat()
+        digest.update(f"{path.name}:{stat.st_size}:{stat.st_mtime_ns}\n".encode())
+    else:
+        digest.update(str(path).encode())
+    return digest.hexdigest()[:16]
+
+
+def _entry_size(key: tuple[str, str], result: dict) -> int:
+    return (
+        sys.getsizeof(key)
+        + sum(sys.getsizeof(part) for part in key)
+        + sys.getsizeof(result)
+        + sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in result.items())
+    )
+
+
+class PredictionCache:
+    """
+    Thread-safe LRU cache of predictions keyed by model identity and text hash.
+    
+    Entries are evicted least-recently-used first once ``max_entries`` or
+    ``max_bytes`` is exceeded, and expire after ``ttl_seconds`` if set.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 10_000,
+        ttl_seconds: float | None = None,
+        max_bytes: int | None = None,
+    ):
+        """
+        Initialize the cache.
+        
+        Args:
+            max_entries: Maximum number of cached predictions (0 disables caching).
+            ttl_seconds: Optional time-to-live for each entry.
+            max_bytes: Optional approximate memory cap for cached entries.
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[tuple[str, str], tuple[dict, float | None, int]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def enabled(self) -> bool:
+        """Whether the cache stores anything at all."""
+        return self.max_entries > 0
+
+    def get_many(self, model_id: str, texts: list[str]) -> list[dict | None]:
+        """
+        Look up cached predictions for normalized texts.
+        
+        Args:
+            model_id: Fingerprint of the model that produced the predictions.
+            texts: Normalized input texts.
+        
+        Returns:
+            List with a result dict for each hit and None for each miss.
+        """
+        if not self.enabled:
+            return [None] * len(texts)
+
+        now = time.monotonic()
+        found: list[dict | None] = []
+        with self._lock:
+            for text in texts:
+                key = (model_id, text_hash(text))
+                entry = self._entries.get(key)
+                if entry is not None and entry[1] is not None and entry[1] <= now:
+                    self._remove(key)
+                    self.expirations += 1
+                    entry = None
+                if entry is None:
+                    self.misses += 1
+                    found.append(None)
+                else:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    found.append(dict(entry[0]))
+        return found
+
+    def put_many(self, model_id: str, texts: list[str], results: list[dict]) -> None:
+        """
+        Store predictions for normalized texts.
+        
+        Args:
+            model_id: Fingerprint of the model that produced the predictions.
+            texts: Normalized input texts.
+            results: Prediction dicts, one per text.
+        """
+        if not self.enabled:
+            return
+
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds else None
+        with self._lock:
+            for text, result in zip(texts, results):
+                key = (model_id, text_hash(text))
+                if key in self._entries:
+                    self._remove(key)
+                value = dict(result)
+                size = _entry_size(key, value)
+                self._entries[key] = (value, expires_at, size)
+                self._bytes += size
+            self._evict()
+
+    def get(self, model_id: str, text: str) -> dict | None:
+        """Look up a single normalized text."""
+        return self.get_many(model_id, [text])[0]
+
+    def put(self, model_id: str, text: str, result: dict) -> None:
+        """Store a single prediction."""
+        self.put_many(model_id, [text], [result])
+
+    def invalidate(self, keep_model_id: str | None = None) -> int:
+        """
+        Drop cached entries.
+        
+        Args:
+            keep_model_id: If given, only entries for other models are dropped.
+        
+        Returns:
+            Number of entries removed.
+        """
+        with self._lock:
+            stale = [key for key in self._entries if key[0] != keep_model_id]
+            for key in stale:
+                self._remove(key)
+            return len(stale)
+
+    def invalidate_model(self, model_id: str) -> int:
+        """
+        Drop cached entries produced by one model.
+        
+        Args:
+            model_id: Fingerprint of the model whose entries are dropped.
+        
+        Returns:
+            Number of entries removed.
+        """
+        with self._lock:
+            stale = [key for key in self._entries if key[0] == model_id]
+            for key in stale:
+                self._remove(key)
+            return len(stale)
+
+    def stats(self) -> dict:
+        """Hit/miss/eviction counters and current size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+            }
+
+    def _remove(self, key: tuple[str, str]) -> None:
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def _evict(self) -> None:
+        while self._entries and (
+            len(self._entries) > self.max_entries
+            or (self.max_bytes is not None and self._bytes > self.max_bytes)
+        ):
+            _, (_, _, size) = self._entries.popitem(last=False)
+            self._bytes -= size
+            self.evictions += 1
@@ -1,5 +1,6 @@
 """Configuration for the sentiment analyzer"""
-from dataclasses import dataclass
+import os
+from dataclasses import dataclass, field
 
 
 @dataclass(frozen=True)
@@ -8,8 +9,50 @@ class Config:
     model_name: str = "cardiffnlp/twitter-roberta-base-sentiment-latest"
     finetuned_model_path: str = "models/final_model"
     pretrained_model_path: str = "models/pretrained_model"
+    # Models loaded in the background once the fine-tuned model is ready
+    background_models: tuple = ("pretrained",)
+    # Fine-tuned model backend: "tf", "onnx" or "onnx-int8" (see `python -m src.export`)
+    backend: str = "tf"
+    onnx_model_dir: str = "models/final_model_onnx"
+    onnx_intra_op_threads: int = 0
+    # Memory-map ONNX weights so pre-forked workers share one copy (see serve.py)
+    onnx_share_weights: bool = True
     max_len: int = 128
     labels: tuple = ("negative", "neutral", "positive")
+    # Sequence lengths with a pre-compiled inference graph (max_len is always included)
+    seq_len_buckets: tuple = (16, 32, 64, 128)
+    # Texts per forward pass when scoring batches (inputs are length-bucketed)
+    inference_batch_size: int = 32
+    # Upper bound on texts accepted by a single /predict/batch request
+    batch_request_max_texts: int = 1000
+    # Records per inference call, longest accepted line, and retries of a chunk
+    # rejected by a full queue before it is reported as failed, for /predict/stream
+    stream_chunk_size: int = 64
+    stream_max_line_bytes: int = 1024 * 1024
+    stream_max_retries: int = 5
+    # Retries of a failing startup phase, and the delay before the first (doubled each time)
+    startup_retries: int = 3
+    startup_retry_backoff_seconds: float = 5.0
+    # Micro-batching of concurrent /predict requests
+    batch_max_size: int = 32
+    batch_max_wait_ms: float = 5.0
+    batch_max_queue: int = 256
+    # Dedicated inference threads; requests beyond the queue get 429
+    inference_workers: int = 2
+    inference_max_queue: int = 64
+    # In-process prediction cache (0 entries disables it, TTL of None never expires)
+    cache_max_entries: int = 10_000
+    cache_ttl_seconds: float | None = None
+    cache_max_bytes: int | None = 64 * 1024 * 1024
+    # Optional SQLite cache shared by workers and kept across restarts (None disables it)
+    disk_cache_path: str | None = None
+    disk_cache_max_rows: int = 1_000_000
+    # Bearer token required by the /admin routes; they are disabled (404) when unset.
+    # Read from the environment so it never lives in the repository.
+    admin_token: str | None = field(default_factory=lambda: os.environ.get("ADMIN_TOKEN") or None, repr=False)
+    # Where /admin/profile writes captures, and the longest capture allowed
+    profile_dir: str = "profiles"
+    profile_max_seconds: float = 120.0
 
 
 config = Config()
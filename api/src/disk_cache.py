@@ -0,0 +1,220 @@
+"""Persistent SQLite-backed prediction cache."""
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from .cache import text_hash
+
+# SQLite limits the number of bound parameters per statement
+_CHUNK_SIZE = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS predictions (
+    model_id TEXT NOT NULL,
+    text_hash TEXT NOT NULL,
+    label TEXT NOT NULL,
+    confidence REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    PRIMARY KEY (model_id, text_hash)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_predictions_accessed_at ON predictions (accessed_at);
+"""
+
+
+class DiskPredictionCache:
+    """
+    Prediction cache persisted in a SQLite database so it survives restarts.
+    
+    The database runs in WAL mode so several uvicorn workers can read and write
+    it concurrently. Each thread (and each forked process) gets its own
+    connection. Once more than ``max_rows`` predictions are stored, the least
+    recently accessed rows are compacted away.
+    
+    Lookups are plain reads. Access times only need to be roughly right for
+    eviction, so a hit refreshes its row's ``accessed_at`` only when it is
+    more than ``touch_interval`` seconds old, and those refreshes are queued
+    and written in one go with the next write (or once enough pile up)
+    rather than taking the write lock on every hit.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        max_rows: int = 1_000_000,
+        compact_interval: int = 1_000,
+        touch_interval: float = 300.0,
+    ):
+        """
+        Initialize the cache, creating the database if needed.
+        
+        Args:
+            path: Location of the SQLite database file.
+            max_rows: Maximum number of stored predictions.
+            compact_interval: Number of writes between size checks, and the
+                number of queued access time refreshes that forces a write.
+            touch_interval: Age in seconds after which a hit refreshes its
+                row's access time.
+        """
+        self.path = Path(path)
+        self.max_rows = max_rows
+        self.compact_interval = compact_interval
+        self.touch_interval = touch_interval
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._writes_since_compact = 0
+        # (model_id, text_hash) -> access time not yet written to the database
+        self._touched: dict[tuple[str, str], float] = {}
+        self.hits = 0
+        self.misses = 0
+        self.compactions = 0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection().executescript(_SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        # Connections must not cross threads or survive a fork
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        # IMMEDIATE takes the write lock up front so concurrent workers queue
+        # on busy_timeout instead of failing with "database is locked" mid-way
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def get_many(self, model_id: str, texts: list[str]) -> list[dict | None]:
+        """
+        Look up cached predictions for normalized texts in bulk.
+        
+        Args:
+            model_id: Fingerprint of the model that produced the predictions.
+            texts: Normalized input texts.
+        
+        Returns:
+            List with a result dict for each hit and None for each miss.
+        """
+        hashes = [text_hash(text) for text in texts]
+        conn = self._connection()
+        rows: dict[str, dict] = {}
+        now = time.time()
+        stale = []
+        for start in range(0, len(hashes), _CHUNK_SIZE):
+            chunk = list(dict.fromkeys(hashes[start:start + _CHUNK_SIZE]))
+            placeholders = ",".join("?" * len(chunk))
+            cursor = conn.execute(
+                f"SELECT text_hash, label, confidence, accessed_at FROM predictions "
+                f"WHERE model_id = ? AND text_hash IN ({placeholders})",
+                [model_id, *chunk],
+            )
+            for hash_, label, confidence, accessed_at in cursor:
+                rows[hash_] = {"label": label, "confidence": confidence}
+                if now - accessed_at >= self.touch_interval:
+                    stale.append(hash_)
+
+        results = [dict(rows[hash_]) if hash_ in rows else None for hash_ in hashes]
+        hits = sum(result is not None for result in results)
+        with self._lock:
+            self.hits += hits
+            self.misses += len(results) - hits
+            for hash_ in stale:
+                self._touched[(model_id, hash_)] = now
+            flush = len(self._touched) >= self.compact_interval
+        if flush:
+            with self._transaction() as conn:
+                self._write_touched(conn)
+        return results
+
+    def _write_touched(self, conn: sqlite3.Connection) -> None:
+        # Write the queued access time refreshes inside the caller's transaction
+        with self._lock:
+            touched, self._touched = self._touched, {}
+        if touched:
+            conn.executemany(
+                "UPDATE predictions SET accessed_at = MAX(accessed_at, ?) WHERE model_id = ? AND text_hash = ?",
+                [(accessed_at, model_id, hash_) for (model_id, hash_), accessed_at in touched.items()],
+            )
+
+    def put_many(self, model_id: str, texts: list[str], results: list[dict]) -> None:
+        """
+        Store predictions for normalized texts.
+        
+        Args:
+            model_id: Fingerprint of the model that produced the predictions.
+            texts: Normalized input texts.
+            results: Prediction dicts, one per text.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO predictions "
+                "(model_id, text_hash, label, confidence, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (model_id, text_hash(text), result["label"], result["confidence"], now)
+                    for text, result in zip(texts, results)
+                ],
+            )
+            self._write_touched(conn)
+
+        with self._lock:
+            self._writes_since_compact += len(texts)
+            due = self._writes_since_compact >= self.compact_interval
+            if due:
+                self._writes_since_compact = 0
+        if due:
+            self.compact()
+
+    def compact(self) -> int:
+        """
+        Delete least recently accessed rows until the size bound holds.
+        
+        Returns:
+            Number of rows removed.
+        """
+        removed = 0
+        with self._transaction() as conn:
+            # Rows hit since they were last refreshed must not look idle
+            self._write_touched(conn)
+            (count,) = conn.execute("SELECT COUNT(*) FROM predictions").fetchone()
+            excess = count - self.max_rows
+            if excess > 0:
+                removed = conn.execute(
+                    "DELETE FROM predictions WHERE (model_id, text_hash) IN ("
+                    "SELECT model_id, text_hash FROM predictions ORDER BY accessed_at LIMIT ?)",
+                    (excess,),
+                ).rowcount
+
+        if removed:
+            with self._lock:
+                self.compactions += 1
+        return removed
+
+    def stats(self) -> dict:
+        """Hit/miss counters and current size."""
+        (rows,) = self._connection().execute("SELECT COUNT(*) FROM predictions").fetchone()
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "compactions": self.compactions,
+                "rows": rows,
+                "max_rows": self.max_rows,
+                "path": str(self.path),
+            }
@@ -0,0 +1,134 @@
+"""Bounded executor for inference work with load shedding."""
+import asyncio
+import contextvars
+import math
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable
+
+from .metrics import queue_wait
+from .profiling import profiler, record
+
+
+class QueueFullError(Exception):
+    """Raised when inference work is rejected because the queue is full."""
+
+    def __init__(self, retry_after: int):
+        """
+        Initialize the error.
+        
+        Args:
+            retry_after: Suggested number of seconds before retrying.
+        """
+        super().__init__(f"Inference queue is full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class InferenceExecutor:
+    """
+    Fixed-size thread pool for inference with a bounded queue.
+    
+    At most ``max_workers`` jobs run at once and at most ``max_queue`` more may
+    wait. Anything beyond that is rejected immediately with QueueFullError,
+    so a traffic spike fails fast instead of piling up threads that all
+    compete for TensorFlow's intra-op pool.
+    """
+
+    def __init__(self, max_workers: int = 2, max_queue: int = 64):
+        """
+        Initialize the executor.
+        
+        Args:
+            max_workers: Number of inference threads.
+            max_queue: Maximum number of jobs waiting for a thread.
+        """
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="inference")
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self.completed = 0
+        self.rejected = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._service_total = 0.0
+
+    def submit(self, fn: Callable[..., Any], *args: Any) -> Future:
+        """
+        Queue a job, or reject it if the queue is full.
+        
+        Args:
+            fn: Function to run on an inference thread.
+            *args: Arguments for ``fn``.
+        
+        Returns:
+            Future resolving to the function's return value.
+        
+        Raises:
+            QueueFullError: If ``max_queue`` jobs are already waiting.
+        """
+        with self._lock:
+            if self._queued >= self.max_queue:
+                self.rejected += 1
+                raise QueueFullError(self._retry_after())
+            self._queued += 1
+        # Run in the caller's context so per-request debug timings follow the job
+        context = contextvars.copy_context()
+        future = self._pool.submit(context.run, self._execute, time.monotonic(), fn, *args)
+        future.add_done_callback(self._release_cancelled)
+        return future
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Run a job on the executor and await its result from async code."""
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+    def _release_cancelled(self, future: Future) -> None:
+        # A job cancelled while queued (its awaiting request went away) never
+        # reaches _execute, so its queue slot is given back here
+        if future.cancelled():
+            with self._lock:
+                self._queued -= 1
+
+    def _execute(self, queued_at: float, fn: Callable[..., Any], *args: Any) -> Any:
+        started_at = time.monotonic()
+        wait = started_at - queued_at
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+            self._wait_total += wait
+            self._wait_max = max(self._wait_max, wait)
+        queue_wait.observe(wait, queue="executor")
+        record("queue_wait", wait)
+        try:
+            return profiler.run(fn, *args)
+        finally:
+            with self._lock:
+                self._running -= 1
+                self.completed += 1
+                self._service_total += time.monotonic() - started_at
+
+    def _retry_after(self) -> int:
+        # Rough time to drain the current queue at the observed service rate
+        avg_service = self._service_total / self.completed if self.completed else 1.0
+        return max(1, math.ceil(self._queued * avg_service / self.max_workers))
+
+    def stats(self) -> dict:
+        """Queue depth, wait times and rejection counters."""
+        with self._lock:
+            started = self.completed + self._running
+            return {
+                "workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "queued": self._queued,
+                "running": self._running,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "avg_wait_ms": self._wait_total / started * 1000 if started else 0.0,
+                "max_wait_ms": self._wait_max * 1000,
+            }
+
+    def shutdown(self) -> None:
+        """Wait for running jobs and stop the worker threads."""
+        self._pool.shutdown(wait=True)
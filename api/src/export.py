@@ -0,0 +1,182 @@
+"""
+Export the fine-tuned model to ONNX and a dynamically INT8-quantized ONNX variant.
+
+Run from the ``api/`` directory:
+
+    python -m src.export --model-dir ../models/final_model --output-dir ../models/final_model_onnx
+
+The exported artifacts are checked for accuracy parity against the TF model
+before the command succeeds.
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from .backends import ONNX_FILENAME, ONNX_INT8_FILENAME, InferenceBackend, OnnxBackend, TFBackend
+from .config import config
+
+# Used for the parity check when no --texts file is given
+PARITY_TEXTS = [
+    "Absolutely loved this product! Best purchase I've ever made.",
+    "Terrible experience. The item broke after one day. Never buying again.",
+    "It's okay, nothing special. Does what it's supposed to do.",
+    "Amazing quality and fast shipping! Highly recommend to everyone!",
+    "Complete waste of money. Customer service was rude and unhelpful.",
+    "The product arrived on time. It works fine.",
+    "This exceeded all my expectations! Will definitely buy again!",
+    "Disappointed. The description was misleading and quality is poor.",
+    "Average product. Not bad but not great either.",
+    "Runs a little small, but the fabric is lovely and it washes well.",
+]
+
+
+def export_onnx(classifier, output_path: Path, opset: int = 17) -> Path:
+    """
+    Convert a TF sequence classifier to ONNX with dynamic batch and sequence axes.
+    
+    Weights are stored in an external ``.data`` file next to the model.
+    
+    Args:
+        classifier: Loaded ``TFRobertaForSequenceClassification`` model.
+        output_path: Where to write the ``.onnx`` file.
+        opset: ONNX opset version.
+    
+    Returns:
+        Path of the written model.
+    """
+    import tensorflow as tf
+    import tf2onnx
+
+    spec = (
+        tf.TensorSpec((None, None), tf.int32, name="input_ids"),
+        tf.TensorSpec((None, None), tf.int32, name="attention_mask"),
+    )
+
+    @tf.function(input_signature=spec)
+    def forward(input_ids, attention_mask):
+        return classifier(input_ids=input_ids, attention_mask=attention_mask, training=False).logits
+
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    model_proto, _ = tf2onnx.convert.from_function(forward, input_signature=spec, opset=opset)
+    _save_with_external_data(model_proto, output_path)
+    return output_path
+
+
+def _save_with_external_data(model_proto, output_path: Path) -> None:
+    # Weights go to a side file so serving workers can memory-map and share them
+    import onnx
+
+    onnx.save_model(
+        model_proto,
+        str(output_path),
+        save_as_external_data=True,
+        all_tensors_to_one_file=True,
+        location=f"{output_path.name}.data",
+        size_threshold=1024,
+    )
+
+
+def quantize_int8(onnx_path: Path, output_path: Path) -> Path:
+    """
+    Dynamically quantize an ONNX model's weights to INT8.
+    
+    Args:
+        onnx_path: Float ONNX model.
+        output_path: Where to write the quantized model.
+    
+    Returns:
+        Path of the written model.
+    """
+    import onnx
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantize_dynamic(str(onnx_path), str(output_path), weight_type=QuantType.QInt8)
+    _save_with_external_data(onnx.load(str(output_path)), output_path)
+    return output_path
+
+
+def check_parity(reference: InferenceBackend, candidate: InferenceBackend, texts: list[str], tokenizer) -> dict:
+    """
+    Compare a candidate backend's predictions against a reference backend.
+    
+    Args:
+        reference: Backend treated as ground truth (normally TF).
+        candidate: Backend being validated.
+        texts: Texts to score with both.
+        tokenizer: Tokenizer shared by both backends.
+    
+    Returns:
+        Dict with label agreement rate and probability differences.
+    """
+    inputs = tokenizer(
+        texts,
+        max_length=config.max_len,
+        padding="max_length",
+        truncation=True,
+        return_tensors="np",
+    )
+    expected = reference(inputs["input_ids"], inputs["attention_mask"])
+    actual = candidate(inputs["input_ids"], inputs["attention_mask"])
+    diff = np.abs(expected - actual)
+
+    return {
+        "backend": candidate.name,
+        "texts": len(texts),
+        "label_agreement": float((expected.argmax(axis=-1) == actual.argmax(axis=-1)).mean()),
+        "max_abs_diff": float(diff.max()),
+        "mean_abs_diff": float(diff.mean()),
+    }
+
+
+def _read_texts(path: Path) -> list[str]:
+    with path.open() as f:
+        return [json.loads(line)["text"] for line in f if line.strip()]
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Export the fine-tuned model to ONNX and INT8 ONNX.")
+    parser.add_argument("--model-dir", default=config.finetuned_model_path, help="Saved TF model directory")
+    parser.add_argument("--output-dir", default=config.onnx_model_dir, help="Directory for ONNX artifacts")
+    parser.add_argument("--opset", type=int, default=17, help="ONNX opset version")
+    parser.add_argument("--texts", type=Path, help='JSONL file of {"text": ...} records for the parity check')
+    parser.add_argument(
+        "--min-agreement",
+        type=float,
+        default=0.98,
+        help="Fail if label agreement with the TF model drops below this",
+    )
+    args = parser.parse_args(argv)
+
+    from transformers import RobertaTokenizerFast, TFRobertaForSequenceClassification
+
+    output_dir = Path(args.output_dir)
+    lengths = (config.max_len,)
+    tokenizer = RobertaTokenizerFast.from_pretrained(config.model_name)
+    classifier = TFRobertaForSequenceClassification.from_pretrained(args.model_dir)
+
+    onnx_path = export_onnx(classifier, output_dir / ONNX_FILENAME, opset=args.opset)
+    print(f"Wrote {onnx_path}")
+    int8_path = quantize_int8(onnx_path, output_dir / ONNX_INT8_FILENAME)
+    print(f"Wrote {int8_path}")
+
+    texts = _read_texts(args.texts) if args.texts else PARITY_TEXTS
+    reference = TFBackend(classifier, lengths)
+    candidates = [OnnxBackend(onnx_path, lengths), OnnxBackend(int8_path, lengths, name="onnx-int8")]
+
+    ok = True
+    for candidate in candidates:
+        report = check_parity(reference, candidate, texts, tokenizer)
+        print(json.dumps(report))
+        ok = ok and report["label_agreement"] >= args.min_agreement
+
+    if not ok:
+        print(f"Label agreement below {args.min_agreement:.0%}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,49 @@
+"""Process memory reporting."""
+import os
+import resource
+import sys
+from pathlib import Path
+
+# Fields of /proc/<pid>/smaps_rollup reported, in kB
+_SMAPS_FIELDS = {
+    "Rss": "rss",
+    "Pss": "pss",
+    "Shared_Clean": "shared_clean",
+    "Shared_Dirty": "shared_dirty",
+    "Private_Clean": "private_clean",
+    "Private_Dirty": "private_dirty",
+}
+
+
+def memory_usage(pid: int | None = None) -> dict:
+    """
+    Report the memory footprint of a process in bytes.
+    
+    On Linux this reads ``/proc/<pid>/smaps_rollup``, whose PSS (proportional
+    set size) splits shared pages evenly between the processes mapping them,
+    so summing PSS over workers gives their real combined footprint. Elsewhere
+    only the peak RSS of the current process is available.
+    
+    Args:
+        pid: Process to inspect (defaults to the current process).
+    
+    Returns:
+        Dict with 'pid', 'rss' and, where available, 'pss', 'shared_*'
+        and 'private_*' byte counts.
+    """
+    pid = pid or os.getpid()
+    rollup = Path(f"/proc/{pid}/smaps_rollup")
+    if rollup.exists():
+        usage = {"pid": pid}
+        for line in rollup.read_text().splitlines()[1:]:
+            key, _, value = line.partition(":")
+            if key in _SMAPS_FIELDS:
+                usage[_SMAPS_FIELDS[key]] = int(value.split()[0]) * 1024
+        usage["shared"] = usage.get("shared_clean", 0) + usage.get("shared_dirty", 0)
+        return usage
+
+    if pid != os.getpid():
+        raise ProcessLookupError(f"Cannot read memory usage of process {pid}")
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kB everywhere else
+    return {"pid": pid, "rss": max_rss if sys.platform == "darwin" else max_rss * 1024}
@@ -0,0 +1,276 @@
+"""Prometheus-style metrics rendered in the text exposition format."""
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterable, Iterator
+
+# Seconds; spans sub-millisecond postprocessing up to slow cold forward passes
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+SEQUENCE_LENGTH_BUCKETS = (8, 16, 32, 64, 128, 256, 512)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+class Metric:
+    """
+    A named metric with a fixed set of label names.
+
+    Values are kept per combination of label values, passed as keyword
+    arguments (``counter.inc(model="finetuned")``).
+    """
+
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        """
+        Initialize the metric.
+
+        Args:
+            name: Metric name, e.g. ``sentiment_requests_total``.
+            documentation: One-line help text.
+            labelnames: Names of the labels every sample carries.
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: dict[tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict[str, object]) -> tuple[str, ...]:
+        if len(labels) != len(self.labelnames) or any(name not in labels for name in self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> Iterator[tuple[str, dict[str, str], float]]:
+        """Yield ``(sample name, labels, value)`` for every label combination."""
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield self.name, dict(zip(self.labelnames, key)), value
+
+    def render(self) -> list[str]:
+        """Lines of this metric in the text exposition format."""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        for name, labels, value in self.samples():
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return lines
+
+
+class Counter(Metric):
+    """Monotonically increasing count."""
+
+    type = "counter"
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        """Add ``amount`` to the counter for the given labels."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def set_total(self, value: float, **labels) -> None:
+        """Report a total counted elsewhere (for collectors mirroring existing counters)."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+
+class Gauge(Metric):
+    """Value that can go up and down."""
+
+    type = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        """Set the gauge for the given labels."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+
+class Histogram(Metric):
+    """Distribution of observed values over fixed buckets."""
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ):
+        """
+        Initialize the histogram.
+
+        Args:
+            name: Metric name, e.g. ``sentiment_stage_duration_seconds``.
+            documentation: One-line help text.
+            labelnames: Names of the labels every sample carries.
+            buckets: Upper bounds of the buckets, in increasing order.
+        """
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        """Record one observation."""
+        self.observe_many((value,), **labels)
+
+    def observe_many(self, values: Iterable[float], **labels) -> None:
+        """Record several observations under one lock acquisition."""
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket counts (the last one is +Inf), sum, count
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            counts = state[0]
+            for value in values:
+                counts[bisect.bisect_left(self.buckets, value)] += 1
+                state[1] += value
+                state[2] += 1
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """Observe the wall-clock duration of the ``with`` block in seconds."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self) -> Iterator[tuple[str, dict[str, str], float]]:
+        """Yield cumulative bucket counts, then the sum and count, per label combination."""
+        with self._lock:
+            items = [(key, (list(counts), total, count)) for key, (counts, total, count) in self._values.items()]
+        for key, (counts, total, count) in items:
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, math.inf), counts):
+                cumulative += bucket_count
+                yield f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, cumulative
+            yield f"{self.name}_sum", labels, total
+            yield f"{self.name}_count", labels, count
+
+
+class MetricsRegistry:
+    """
+    Set of metrics rendered together at ``/metrics``.
+
+    Besides metrics updated as events happen, collectors can build metrics
+    from state that already exists elsewhere (cache counters, memory use) at
+    scrape time.
+    """
+
+    def __init__(self):
+        """Initialize an empty registry."""
+        self._metrics: list[Metric] = []
+        self._collectors: list[Callable[[], Iterable[Metric]]] = []
+
+    def register(self, metric: Metric) -> Metric:
+        """Add a metric and return it."""
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector: Callable[[], Iterable[Metric]]) -> None:
+        """Add a function returning freshly built metrics on every scrape."""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        metrics = list(self._metrics)
+        for collector in self._collectors:
+            metrics.extend(collector())
+        lines = [line for metric in metrics for line in metric.render()]
+        return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording request latency per endpoint.
+
+    Endpoints are labelled by their route template (``/admin/models/{name}/versions``)
+    rather than the raw path, so path parameters and unknown URLs don't
+    create a new time series each.
+    """
+
+    def __init__(self, app):
+        """Wrap an ASGI application."""
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            request_duration.observe(
+                time.perf_counter() - started,
+                endpoint=getattr(route, "path", "unmatched"),
+                method=scope["method"],
+                status=status,
+            )
+
+
+metrics = MetricsRegistry()
+
+request_duration = metrics.register(Histogram(
+    "sentiment_request_duration_seconds",
+    "HTTP request latency, until the response body has been sent.",
+    ("endpoint", "method", "status"),
+))
+queue_wait = metrics.register(Histogram(
+    "sentiment_queue_wait_seconds",
+    "Time requests spend queued before inference starts.",
+    ("queue",),
+))
+stage_duration = metrics.register(Histogram(
+    "sentiment_stage_duration_seconds",
+    "Time spent per inference stage (tokenize, forward, postprocess).",
+    ("model", "stage"),
+))
+batch_size = metrics.register(Histogram(
+    "sentiment_batch_size",
+    "Texts per forward pass.",
+    ("model",),
+    buckets=BATCH_SIZE_BUCKETS,
+))
+sequence_length = metrics.register(Histogram(
+    "sentiment_sequence_length",
+    "Token count per text before padding.",
+    ("model",),
+    buckets=SEQUENCE_LENGTH_BUCKETS,
+))
+padded_length = metrics.register(Histogram(
+    "sentiment_padded_length",
+    "Sequence length forward passes are padded to.",
+    ("model",),
+    buckets=SEQUENCE_LENGTH_BUCKETS,
+))
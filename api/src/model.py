@@ -1,54 +1,451 @@
 """Model loading and inference for sentiment analysis."""
-import tensorflow as tf
-from transformers import RobertaTokenizerFast, TFRobertaForSequenceClassification
+import importlib
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
 from pathlib import Path
 
+import numpy as np
+
+from .backends import ONNX_FILENAME, ONNX_INT8_FILENAME, InferenceBackend, TFBackend, load_backend
+from .cache import PredictionCache, fingerprint_model, normalize_text
 from .config import config
+from .disk_cache import DiskPredictionCache
+from .metrics import batch_size, padded_length, sequence_length
+from .profiling import stage
+from .registry import LoadedModel, ModelRegistry, UnknownModelError
 
-tokenizer: RobertaTokenizerFast | None = None
-model: TFRobertaForSequenceClassification | None = None
-pretrained_model: TFRobertaForSequenceClassification | None = None
+# Names requests can be routed to
+MODEL_NAMES = ("finetuned", "pretrained")
 
+prediction_cache = PredictionCache(
+    max_entries=config.cache_max_entries,
+    ttl_seconds=config.cache_ttl_seconds,
+    max_bytes=config.cache_max_bytes,
+)
 
-def load_model() -> None:
-    """Load tokenizer and fine-tuned model into memory."""
-    global tokenizer, model
-    
-    tokenizer = RobertaTokenizerFast.from_pretrained(config.model_name)
-    model = TFRobertaForSequenceClassification.from_pretrained(config.finetuned_model_path)
+# Optional persistent tier below the in-process cache
+disk_cache: DiskPredictionCache | None = (
+    DiskPredictionCache(config.disk_cache_path, max_rows=config.disk_cache_max_rows)
+    if config.disk_cache_path
+    else None
+)
 
+# Runs the other models of a comparison while the calling thread runs the first
+_compare_pool = ThreadPoolExecutor(max_workers=config.inference_workers, thread_name_prefix="compare")
 
-def load_pretrained_model() -> None:
-    """Load pretrained model (before fine-tuning) into memory."""
-    global tokenizer, pretrained_model
+
+def _artifact_path(path: str | None = None) -> Path:
+    """File or directory the configured fine-tuned backend loads its weights from."""
+    if config.backend == "onnx":
+        return Path(path or config.onnx_model_dir) / ONNX_FILENAME
+    if config.backend == "onnx-int8":
+        return Path(path or config.onnx_model_dir) / ONNX_INT8_FILENAME
+    return Path(path or config.finetuned_model_path)
+
+
+def _sequence_buckets() -> tuple[int, ...]:
+    """Configured sequence-length buckets, capped at and always including max_len."""
+    return tuple(sorted({*(b for b in config.seq_len_buckets if b < config.max_len), config.max_len}))
+
+
+def import_runtime() -> None:
+    """Import the heavy ML libraries needed by the configured backend."""
+    importlib.import_module("transformers")
+    if config.backend == "tf":
+        importlib.import_module("tensorflow")
+    else:
+        importlib.import_module("onnxruntime")
+
+
+def _load_tokenizer():
+    # transformers takes seconds to import, so it is only imported when loading
+    from transformers import RobertaTokenizerFast
     
-    if tokenizer is None:
-        tokenizer = RobertaTokenizerFast.from_pretrained(config.model_name)
+    return RobertaTokenizerFast.from_pretrained(config.model_name)
+
+
+def _load_finetuned(path: str | None = None) -> LoadedModel:
+    """
+    Load the fine-tuned model on the configured backend.
     
-    # Check if pretrained model exists locally, otherwise use base model
+    Args:
+        path: Model directory (ONNX directory for the ONNX backends) to load
+            instead of the configured one.
+    """
+    backend = load_backend(
+        config.backend,
+        path or config.finetuned_model_path,
+        path or config.onnx_model_dir,
+        _sequence_buckets(),
+        intra_op_threads=config.onnx_intra_op_threads,
+        share_weights=config.onnx_share_weights,
+    )
+    fingerprint = fingerprint_model(_artifact_path(path))
+    return LoadedModel(backend, f"{backend.name}:{fingerprint}", fingerprint)
+
+
+def _pretrained_path(path: str | None = None) -> Path | None:
+    """Local directory of the pretrained model, or None to use the hub model."""
     # Try multiple possible paths (for Docker and local development)
     possible_paths = [
+        *([Path(path)] if path else []),  # Explicitly requested version
         Path(config.pretrained_model_path),  # From config
         Path("../models/pretrained_model"),  # If running from api/ directory
         Path(config.finetuned_model_path).parent / "pretrained_model",  # Relative to finetuned_model
     ]
+    for candidate in possible_paths:
+        if candidate.exists() and (candidate / "config.json").exists():
+            return candidate
+    return None
+
+
+def _default_version(model_name: str, path: str | None = None) -> str:
+    """Version label a model loaded from ``path`` gets by default: its weights fingerprint."""
+    if model_name == "finetuned":
+        return fingerprint_model(_artifact_path(path))
+    return fingerprint_model(_pretrained_path(path) or config.model_name)
+
+
+def _load_pretrained(path: str | None = None) -> LoadedModel:
+    """
+    Load pretrained model (before fine-tuning) and warm it up.
     
-    pretrained_path = None
-    for path in possible_paths:
-        if path.exists() and (path / "config.json").exists():
-            pretrained_path = path
-            break
+    Args:
+        path: Model directory to load instead of searching the default locations.
+    """
+    from transformers import TFRobertaForSequenceClassification
     
+    # Check if pretrained model exists locally, otherwise use base model
+    pretrained_path = _pretrained_path(path)
     if pretrained_path:
-        pretrained_model = TFRobertaForSequenceClassification.from_pretrained(
+        classifier = TFRobertaForSequenceClassification.from_pretrained(
             str(pretrained_path)
         )
+        model_id = fingerprint_model(pretrained_path)
     else:
         # Fallback to base model from HuggingFace
-        pretrained_model = TFRobertaForSequenceClassification.from_pretrained(
+        classifier = TFRobertaForSequenceClassification.from_pretrained(
             config.model_name,
             num_labels=len(config.labels)
         )
+        model_id = fingerprint_model(config.model_name)
+    
+    backend = TFBackend(classifier, _sequence_buckets())
+    backend.warmup()
+    return LoadedModel(backend, f"{backend.name}:{model_id}", model_id)
+
+
+# Loaders by model name; each takes an optional path to load a new version from
+MODEL_LOADERS = {
+    "finetuned": _load_finetuned,
+    "pretrained": _load_pretrained,
+}
+
+registry = ModelRegistry()
+registry.register("tokenizer", _load_tokenizer)
+for _name, _loader in MODEL_LOADERS.items():
+    registry.register(_name, _loader)
+
+
+def load_tokenizer() -> None:
+    """Load the tokenizer shared by all models, unless it is already loaded."""
+    registry.get("tokenizer")
+
+
+def load_model() -> None:
+    """Load tokenizer and fine-tuned model into memory on the configured backend."""
+    registry.get("tokenizer")
+    registry.get("finetuned")
+
+
+def load_pretrained_model() -> None:
+    """Load pretrained model (before fine-tuning) into memory."""
+    registry.get("tokenizer")
+    registry.get("pretrained")
+
+
+def load_background_models() -> None:
+    """Start loading ``config.background_models`` on background threads."""
+    for name in config.background_models:
+        registry.load_async(name)
+
+
+def warmup() -> None:
+    """Run the fine-tuned model once for every sequence bucket."""
+    if not registry.is_loaded("finetuned"):
+        raise RuntimeError("Model not loaded. Call load_model() first.")
+    
+    registry.get("finetuned").backend.warmup()
+
+
+def load_version(
+    model_name: str,
+    path: str | None = None,
+    version: str | None = None,
+    activate: bool = True,
+) -> LoadedModel:
+    """
+    Load and warm up a new version of a model next to the one serving traffic.
+    
+    Requests keep going to the current version while the new one loads. On
+    activation traffic switches atomically; the old version finishes the
+    requests it already has, is freed, and its cached predictions are dropped.
+    
+    Args:
+        model_name: One of ``MODEL_NAMES``.
+        path: Directory to load the new version from; defaults to the configured
+            one, which picks up a model redeployed in place.
+        version: Label to pin the version by; defaults to its weights fingerprint.
+        activate: Whether to route traffic to the new version once it is warm.
+    
+    Returns:
+        The newly loaded version.
+    """
+    entry = registry.entry(model_name)
+    if path is not None and not Path(path).exists():
+        raise FileNotFoundError(f"Model path {path!r} does not exist")
+    
+    def load() -> LoadedModel:
+        loaded = MODEL_LOADERS[model_name](path)
+        loaded.backend.warmup()
+        return loaded
+    
+    registry.get("tokenizer")
+    # Knowing the label up front lets a duplicate be refused before paying for the load
+    loaded = entry.stage(load, version=version or _default_version(model_name, path), activate=False)
+    if activate:
+        activate_version(model_name, loaded.version)
+    return loaded
+
+
+def activate_version(model_name: str, version: str) -> None:
+    """
+    Route a model's traffic to an already loaded version.
+    
+    Args:
+        model_name: One of ``MODEL_NAMES``.
+        version: Loaded version to activate.
+    """
+    entry = registry.entry(model_name)
+    previous = entry.activate(version)
+    if previous is not None and previous.model_id != entry.value.model_id:
+        prediction_cache.invalidate_model(previous.model_id)
+
+
+def unload_version(model_name: str, version: str) -> None:
+    """
+    Free a loaded version that isn't serving default traffic.
+    
+    Args:
+        model_name: One of ``MODEL_NAMES``.
+        version: Inactive version to unload.
+    """
+    registry.entry(model_name).unload(version)
+
+
+def _encode(tokenizer, texts: list[str], model_name: str) -> tuple[list[list[int]], list[list[int]]]:
+    """Tokenize texts without padding, returning input ids and attention masks."""
+    with stage(model_name, "tokenize"):
+        encodings = tokenizer(texts, max_length=config.max_len, truncation=True)
+    sequence_length.observe_many(map(len, encodings["input_ids"]), model=model_name)
+    return encodings["input_ids"], encodings["attention_mask"]
+
+
+def _classify(
+    tokenizer,
+    classifier: InferenceBackend,
+    input_ids: list[list[int]],
+    attention_mask: list[list[int]],
+    model_name: str,
+) -> np.ndarray:
+    """
+    Run a classifier over tokenized texts in length-sorted buckets with dynamic padding.
+    
+    Inputs are sorted by token length and split into buckets of
+    ``config.inference_batch_size``. Each bucket is padded only up to the
+    backend's bucket length that fits its longest member, so short reviews
+    don't pay for ``config.max_len``.
+    
+    Args:
+        tokenizer: Tokenizer used to pad the buckets.
+        classifier: Inference backend to run.
+        input_ids: Unpadded input ids per text.
+        attention_mask: Unpadded attention masks per text.
+        model_name: Model label for metrics.
+    
+    Returns:
+        Array of label probabilities, one row per text in input order.
+    """
+    order = sorted(range(len(input_ids)), key=lambda i: len(input_ids[i]))
+    probs = np.empty((len(input_ids), len(config.labels)), dtype=np.float32)
+    
+    for start in range(0, len(order), config.inference_batch_size):
+        bucket = order[start:start + config.inference_batch_size]
+        length = classifier.bucket_length(len(input_ids[bucket[-1]]))
+        with stage(model_name, "pad"):
+            inputs = tokenizer.pad(
+                [{"input_ids": input_ids[i], "attention_mask": attention_mask[i]} for i in bucket],
+                padding="max_length",
+                max_length=length,
+                return_tensors="np",
+            )
+        with stage(model_name, "forward"):
+            probs[bucket] = classifier(inputs["input_ids"], inputs["attention_mask"])
+        batch_size.observe(len(bucket), model=model_name)
+        padded_length.observe(length, model=model_name)
+    
+    return probs
+
+
+def _to_results(probs: np.ndarray, model_name: str, scores: bool = False) -> list[dict]:
+    """Turn label probabilities into result dicts, optionally with the full distribution."""
+    with stage(model_name, "postprocess"):
+        results = []
+        for row, idx in zip(probs, probs.argmax(axis=-1)):
+            result = {"label": config.labels[idx], "confidence": float(row[idx])}
+            if scores:
+                result["scores"] = {label: float(p) for label, p in zip(config.labels, row)}
+            results.append(result)
+    return results
+
+
+def _predict_batch(tokenizer, classifier: InferenceBackend, texts: list[str], model_name: str) -> list[dict]:
+    """
+    Tokenize and classify texts.
+    
+    Args:
+        tokenizer: Tokenizer producing the classifier's input ids.
+        classifier: Inference backend to run.
+        texts: Input texts to classify.
+        model_name: Model label for metrics.
+    
+    Returns:
+        List of dicts with 'label' and 'confidence' keys, in input order.
+    """
+    input_ids, attention_mask = _encode(tokenizer, texts, model_name)
+    probs = _classify(tokenizer, classifier, input_ids, attention_mask, model_name)
+    return _to_results(probs, model_name)
+
+
+def _cached_predict(model_name: str, loaded: LoadedModel, texts: list[str]) -> list[dict]:
+    """
+    Serve predictions from the cache tiers, running the classifier only on misses.
+    
+    Lookups go to the in-process cache first, then to the disk cache if one
+    is configured. Disk hits are promoted into memory, and fresh predictions
+    are written to both tiers.
+    
+    Args:
+        model_name: Name the model is registered under.
+        loaded: Model to run on cache misses; its fingerprint is the cache namespace.
+        texts: Input texts to classify.
+    
+    Returns:
+        List of dicts with 'label' and 'confidence' keys, in input order.
+    """
+    classifier_id = loaded.model_id
+    texts = [normalize_text(text) for text in texts]
+    with stage(model_name, "cache_lookup"):
+        results = prediction_cache.get_many(classifier_id, texts)
+    
+    # Deduplicate misses so repeated texts within a batch run only once
+    missing = list(dict.fromkeys(text for text, result in zip(texts, results) if result is None))
+    if not missing:
+        return results
+    
+    found: dict[str, dict] = {}
+    if disk_cache is not None:
+        with stage(model_name, "disk_cache_lookup"):
+            stored = disk_cache.get_many(classifier_id, missing)
+        found = {text: result for text, result in zip(missing, stored) if result is not None}
+        if found:
+            prediction_cache.put_many(classifier_id, list(found), list(found.values()))
+        missing = [text for text in missing if text not in found]
+    
+    if missing:
+        fresh = _predict_batch(registry.get("tokenizer"), loaded.backend, missing, model_name)
+        prediction_cache.put_many(classifier_id, missing, fresh)
+        if disk_cache is not None:
+            disk_cache.put_many(classifier_id, missing, fresh)
+        found.update(zip(missing, fresh))
+    
+    results = [result if result is not None else dict(found[text]) for text, result in zip(texts, results)]
+    
+    return results
+
+
+def predict_batch(texts: list[str], model_name: str = "finetuned", version: str | None = None) -> list[dict]:
+    """
+    Predict sentiment for several texts using the named model.
+    
+    The model is loaded on first use if it isn't loaded yet.
+    
+    Args:
+        texts: Input texts to classify.
+        model_name: One of ``MODEL_NAMES``.
+        version: Loaded version to pin, or None for the active version.
+    
+    Returns:
+        List of dicts with 'label' and 'confidence' keys, in input order.
+    """
+    if model_name not in MODEL_NAMES:
+        raise UnknownModelError(f"Unknown model {model_name!r}. Available: {', '.join(MODEL_NAMES)}")
+    
+    if not texts:
+        return []
+    
+    with registry.entry(model_name).acquire(version) as loaded:
+        return _cached_predict(model_name, loaded, texts)
+
+
+def compare_batch(texts: list[str]) -> list[dict]:
+    """
+    Score texts with every model, tokenizing them only once.
+    
+    The models share the tokenizer, so the encodings are computed once and
+    fed to each model, with the models running concurrently. Results carry the
+    full label distribution and bypass the prediction cache, which only keeps
+    the top label.
+    
+    Args:
+        texts: Input texts to classify.
+    
+    Returns:
+        One dict per text, in input order, mapping each of ``MODEL_NAMES`` to
+        a dict with 'label', 'confidence' and 'scores' keys.
+    """
+    if not texts:
+        return []
+    
+    tokenizer = registry.get("tokenizer")
+    input_ids, attention_mask = _encode(tokenizer, [normalize_text(text) for text in texts], "compare")
+    
+    with ExitStack() as stack:
+        models = {name: stack.enter_context(registry.entry(name).acquire()) for name in MODEL_NAMES}
+        first, *rest = MODEL_NAMES
+        futures = {
+            name: _compare_pool.submit(_classify, tokenizer, models[name].backend, input_ids, attention_mask, name)
+            for name in rest
+        }
+        probs = {first: _classify(tokenizer, models[first].backend, input_ids, attention_mask, first)}
+        probs.update((name, future.result()) for name, future in futures.items())
+    
+    results = {name: _to_results(probs[name], name, scores=True) for name in MODEL_NAMES}
+    return [{name: results[name][i] for name in MODEL_NAMES} for i in range(len(texts))]
+
+
+def compare(text: str) -> dict:
+    """
+    Score a single text with every model.
+    
+    Args:
+        text: Input text to classify.
+    
+    Returns:
+        Dict mapping each of ``MODEL_NAMES`` to a dict with 'label',
+        'confidence' and 'scores' keys.
+    """
+    return compare_batch([text])[0]
 
 
 def predict_finetuned(text: str) -> dict:
@@ -61,25 +458,20 @@ def predict_finetuned(text: str) -> dict:
     Returns:
         Dict with 'label' and 'confidence' keys.
     """
-    if tokenizer is None or model is None:
-        raise RuntimeError("Model not loaded. Call load_model() first.")
-    
-    inputs = tokenizer(
-        text,
-        max_length=config.max_len,
-        padding="max_length",
-        truncation=True,
-        return_tensors="tf",
-    )
+    return predict_finetuned_batch([text])[0]
+
+
+def predict_finetuned_batch(texts: list[str]) -> list[dict]:
+    """
+    Predict sentiment for several texts using fine-tuned model.
     
-    logits = model(inputs).logits
-    probs = tf.nn.softmax(logits, axis=-1).numpy()[0]
-    pred_idx = probs.argmax()
+    Args:
+        texts: Input texts to classify.
     
-    return {
-        "label": config.labels[pred_idx],
-        "confidence": float(probs[pred_idx]),
-    }
+    Returns:
+        List of dicts with 'label' and 'confidence' keys, in input order.
+    """
+    return predict_batch(texts, "finetuned")
 
 
 def predict_pretrained(text: str) -> dict:
@@ -92,27 +484,17 @@ def predict_pretrained(text: str) -> dict:
     Returns:
         Dict with 'label' and 'confidence' keys.
     """
-    global pretrained_model
-    
-    if tokenizer is None:
-        raise RuntimeError("Tokenizer not loaded. Call load_model() first.")
-    
-    if pretrained_model is None:
-        load_pretrained_model()
-    
-    inputs = tokenizer(
-        text,
-        max_length=config.max_len,
-        padding="max_length",
-        truncation=True,
-        return_tensors="tf",
-    )
+    return predict_pretrained_batch([text])[0]
+
+
+def predict_pretrained_batch(texts: list[str]) -> list[dict]:
+    """
+    Predict sentiment for several texts using pretrained model.
     
-    logits = pretrained_model(inputs).logits
-    probs = tf.nn.softmax(logits, axis=-1).numpy()[0]
-    pred_idx = probs.argmax()
+    Args:
+        texts: Input texts to classify.
     
-    return {
-        "label": config.labels[pred_idx],
-        "confidence": float(probs[pred_idx]),
-    }
\ No newline at end of file
+    Returns:
+        List of dicts with 'label' and 'confidence' keys, in input order.
+    """
+    return predict_batch(texts, "pretrained")
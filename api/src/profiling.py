@@ -0,0 +1,211 @@
+"""Per-request stage timings and on-demand profiling of the inference path."""
+import cProfile
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+from .metrics import stage_duration
+
+_current_timings: ContextVar["RequestTimings | None"] = ContextVar("request_timings", default=None)
+
+
+class RequestTimings:
+    """
+    Stage-by-stage time spent on one request, for debug responses.
+
+    Stages that run several times for one request (one forward pass per
+    length bucket) are summed.
+    """
+
+    def __init__(self):
+        """Initialize an empty breakdown."""
+        self.stages: dict[str, float] = {}
+        self.batch_size: int | None = None
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, seconds: float) -> None:
+        """Add time spent in a stage."""
+        with self._lock:
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def merge(self, other: "RequestTimings") -> None:
+        """Add every stage recorded by another breakdown (e.g. a shared batch)."""
+        for stage, seconds in other.stages.items():
+            self.add(stage, seconds)
+        if other.batch_size is not None:
+            self.batch_size = other.batch_size
+
+    def as_dict(self) -> dict[str, float]:
+        """Stage times in milliseconds, keyed ``<stage>_ms``, plus the batch size if batched."""
+        with self._lock:
+            result = {f"{stage}_ms": seconds * 1000 for stage, seconds in self.stages.items()}
+        if self.batch_size is not None:
+            result["batch_size"] = self.batch_size
+        return result
+
+
+def current_timings() -> RequestTimings | None:
+    """Breakdown being collected for the current request, if debug timings were requested."""
+    return _current_timings.get()
+
+
+@contextmanager
+def collect_timings(timings: RequestTimings | None) -> Iterator[None]:
+    """Record stages run inside the ``with`` block (and work it hands off) into ``timings``."""
+    token = _current_timings.set(timings)
+    try:
+        yield
+    finally:
+        _current_timings.reset(token)
+
+
+def record(stage: str, seconds: float) -> None:
+    """Add time to the current request's breakdown, if one is being collected."""
+    timings = _current_timings.get()
+    if timings is not None:
+        timings.add(stage, seconds)
+
+
+@contextmanager
+def stage(model: str, name: str) -> Iterator[None]:
+    """
+    Time an inference stage into the stage latency metric and the request breakdown.
+
+    Args:
+        model: Model label for the metric.
+        name: Stage name, e.g. ``tokenize`` or ``forward``.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        stage_duration.observe(elapsed, model=model, stage=name)
+        record(name, elapsed)
+
+
+class ProfilerBusyError(RuntimeError):
+    """Raised when a capture is requested while another one is running."""
+
+
+class ProfileCapture:
+    """
+    cProfile capture of the inference threads for a fixed time window.
+
+    cProfile only sees the thread that enables it, so the batcher and the
+    inference executor run their jobs through ``run()``. While a capture is
+    active each of those threads profiles into its own ``cProfile.Profile``,
+    and the profiles are merged when the capture ends. Outside a capture
+    ``run()`` is a plain function call.
+    """
+
+    def __init__(self):
+        """Initialize an idle capture."""
+        self._profiles: list[cProfile.Profile] | None = None
+        self._capture_id = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    @property
+    def active(self) -> bool:
+        """Whether a capture is running."""
+        return self._profiles is not None
+
+    def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Call ``fn``, profiling it if a capture is running."""
+        if self._profiles is None:
+            return fn(*args)
+        return self._thread_profile().runcall(fn, *args)
+
+    def _thread_profile(self) -> cProfile.Profile:
+        with self._lock:
+            if getattr(self._local, "capture_id", None) != self._capture_id:
+                self._local.capture_id = self._capture_id
+                self._local.profile = cProfile.Profile()
+                if self._profiles is not None:
+                    self._profiles.append(self._local.profile)
+            return self._local.profile
+
+    def start(self) -> None:
+        """
+        Start capturing.
+
+        Raises:
+            ProfilerBusyError: If a capture is already running.
+        """
+        with self._lock:
+            if self._profiles is not None:
+                raise ProfilerBusyError("A profile capture is already running")
+            self._capture_id += 1
+            self._profiles = []
+
+    def stop(self, path: str | Path) -> dict:
+        """
+        Stop capturing and write the merged profile.
+
+        Args:
+            path: ``.prof`` file to write, readable with ``pstats`` or snakeviz.
+
+        Returns:
+            Dict with the file path, number of profiled calls and the top
+            functions by cumulative time.
+        """
+        with self._lock:
+            profiles, self._profiles = self._profiles or [], None
+
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if not profiles:
+            return {"path": None, "profiled_threads": 0, "top": []}
+
+        stats = pstats.Stats(profiles[0])
+        for profile in profiles[1:]:
+            stats.add(profile)
+        stats.dump_stats(path)
+
+        top = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:20]
+        return {
+            "path": str(path),
+            "profiled_threads": len(profiles),
+            "top": [
+                {
+                    "function": f"{filename}:{line}({name})",
+                    "calls": calls,
+                    "cumulative_ms": cumulative * 1000,
+                    "own_ms": own * 1000,
+                }
+                for (filename, line, name), (_, calls, own, cumulative, _) in top
+            ],
+        }
+
+
+profiler = ProfileCapture()
+
+# TensorFlow's profiler is process-wide and fails if started twice
+_tf_profile_lock = threading.Lock()
+
+
+@contextmanager
+def tf_profile(logdir: str | Path) -> Iterator[None]:
+    """
+    Capture a TensorFlow profiler trace (viewable in TensorBoard) into ``logdir``.
+
+    Raises:
+        ProfilerBusyError: If a TensorFlow capture is already running.
+    """
+    if not _tf_profile_lock.acquire(blocking=False):
+        raise ProfilerBusyError("A TensorFlow profile capture is already running")
+    try:
+        import tensorflow as tf
+
+        tf.profiler.experimental.start(str(logdir))
+        try:
+            yield
+        finally:
+            tf.profiler.experimental.stop()
+    finally:
+        _tf_profile_lock.release()
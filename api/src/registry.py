@@ -0,0 +1,295 @@
+"""Thread-safe registry of lazily or eagerly loaded models."""
+import dataclasses
+import gc
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Iterator
+
+from .backends import InferenceBackend
+
+
+@dataclass(frozen=True)
+class LoadedModel:
+    """A ready-to-use model and the fingerprint identifying its weights."""
+
+    backend: InferenceBackend
+    model_id: str
+    version: str
+
+
+class UnknownModelError(KeyError):
+    """Raised for a model name or version that isn't registered."""
+
+    def __str__(self) -> str:
+        return self.args[0]
+
+
+class ModelEntry:
+    """
+    One named resource in the registry and its load state.
+    
+    Loading is single-flight: concurrent callers of ``get()`` wait for the one
+    load in progress instead of each loading their own copy.
+    
+    Models (``LoadedModel`` values) can hold several versions side by side.
+    ``stage()`` loads a new version next to the active one and ``activate()``
+    switches traffic to it atomically. The previous version is retired and
+    freed once the requests still using it (see ``acquire()``) have finished.
+    """
+
+    def __init__(self, name: str, loader: Callable[[], Any]):
+        """
+        Initialize an unloaded entry.
+        
+        Args:
+            name: Name the entry is registered under.
+            loader: Function that loads and returns the resource.
+        """
+        self.name = name
+        self.loader = loader
+        self.state = "unloaded"
+        self.load_seconds: float | None = None
+        self.error: str | None = None
+        self.value: Any = None
+        self.versions: dict[str, LoadedModel] = {}
+        self._in_flight: dict[str, int] = {}
+        self._retiring: set[str] = set()
+        self._lock = threading.Lock()
+        self._state_lock = threading.Lock()
+        self._stage_lock = threading.Lock()
+
+    def get(self) -> Any:
+        """Return the loaded resource, loading it first if necessary."""
+        value = self.value
+        if value is not None:
+            return value
+
+        with self._lock:
+            if self.value is None:
+                self._load()
+            return self.value
+
+    def _load(self) -> None:
+        self.state = "loading"
+        self.error = None
+        started = time.perf_counter()
+        try:
+            self.value = self.loader()
+        except Exception as exc:
+            self.state = "failed"
+            self.error = str(exc)
+            raise
+        finally:
+            self.load_seconds = time.perf_counter() - started
+        if isinstance(self.value, LoadedModel):
+            with self._state_lock:
+                self.versions[self.value.version] = self.value
+        self.state = "ready"
+
+    @contextmanager
+    def acquire(self, version: str | None = None) -> Iterator[LoadedModel]:
+        """
+        Use a model version for the duration of a request.
+        
+        A version retired while in use stays loaded until every request that
+        acquired it has exited the context.
+        
+        Args:
+            version: Version to pin, or None for the active version.
+        
+        Yields:
+            The requested LoadedModel.
+        """
+        if version is None:
+            self.get()
+        with self._state_lock:
+            if version is None:
+                loaded = self.value
+            else:
+                loaded = self.versions.get(version)
+                if loaded is None or version in self._retiring:
+                    raise UnknownModelError(
+                        f"Unknown version {version!r} of model {self.name!r}. "
+                        f"Available: {', '.join(self._available())}"
+                    )
+            self._in_flight[loaded.version] = self._in_flight.get(loaded.version, 0) + 1
+        try:
+            yield loaded
+        finally:
+            with self._state_lock:
+                self._in_flight[loaded.version] -= 1
+                freed = self._release(loaded.version)
+            if freed:
+                gc.collect()
+
+    def stage(self, loader: Callable[[], LoadedModel], version: str | None = None, activate: bool = True) -> LoadedModel:
+        """
+        Load a new version next to the active one, optionally switching to it.
+        
+        Only one version is staged at a time; concurrent calls wait their turn.
+        
+        Args:
+            loader: Function that loads, warms up and returns the new version.
+            version: Label for the new version; defaults to the loader's.
+            activate: Whether to route traffic to the new version once loaded.
+        
+        Returns:
+            The newly loaded version.
+        """
+        with self._stage_lock:
+            if version is not None:
+                # Refuse a duplicate label before spending seconds on the load
+                with self._state_lock:
+                    self._check_new_version(version)
+            started = time.perf_counter()
+            loaded = loader()
+            if version is not None:
+                loaded = dataclasses.replace(loaded, version=version)
+            with self._state_lock:
+                self._check_new_version(loaded.version)
+                self.versions[loaded.version] = loaded
+            self.load_seconds = time.perf_counter() - started
+            if activate:
+                self.activate(loaded.version)
+            return loaded
+
+    def _check_new_version(self, version: str) -> None:
+        if version in self.versions:
+            raise ValueError(f"Version {version!r} of model {self.name!r} is already loaded")
+
+    def activate(self, version: str) -> LoadedModel | None:
+        """
+        Atomically route traffic to a loaded version and retire the previous one.
+        
+        Args:
+            version: Version to activate.
+        
+        Returns:
+            The previously active version, if another one was active.
+        """
+        with self._lock, self._state_lock:
+            loaded = self.versions.get(version)
+            if loaded is None or version in self._retiring:
+                raise UnknownModelError(
+                    f"Unknown version {version!r} of model {self.name!r}. "
+                    f"Available: {', '.join(self._available())}"
+                )
+            previous, self.value = self.value, loaded
+            self.state = "ready"
+            self.error = None
+            if previous is None or previous.version == version:
+                return None
+            self._retiring.add(previous.version)
+            freed = self._release(previous.version)
+        if freed:
+            gc.collect()
+        return previous
+
+    def unload(self, version: str) -> None:
+        """
+        Retire a loaded version that isn't active.
+        
+        Args:
+            version: Version to unload.
+        """
+        with self._state_lock:
+            if version not in self.versions or version in self._retiring:
+                raise UnknownModelError(f"Unknown version {version!r} of model {self.name!r}")
+            if self.value is not None and self.value.version == version:
+                raise ValueError(f"Version {version!r} of model {self.name!r} is active and can't be unloaded")
+            self._retiring.add(version)
+            freed = self._release(version)
+        if freed:
+            gc.collect()
+
+    def _available(self) -> list[str]:
+        return [version for version in self.versions if version not in self._retiring]
+
+    def _release(self, version: str) -> bool:
+        # Drop a retiring version once it has drained; caller holds _state_lock
+        if version in self._retiring and not self._in_flight.get(version):
+            self._retiring.discard(version)
+            self._in_flight.pop(version, None)
+            del self.versions[version]
+            return True
+        return False
+
+    def status(self) -> dict:
+        """Load state, load time in seconds, last error and loaded versions."""
+        status = {"state": self.state, "load_seconds": self.load_seconds, "error": self.error}
+        if isinstance(self.value, LoadedModel):
+            status["model_id"] = self.value.model_id
+            status["backend"] = self.value.backend.name
+            status["active_version"] = self.value.version
+            with self._state_lock:
+                status["versions"] = {
+                    version: {
+                        "model_id": loaded.model_id,
+                        "in_flight": self._in_flight.get(version, 0),
+                        "retiring": version in self._retiring,
+                    }
+                    for version, loaded in self.versions.items()
+                }
+        return status
+
+
+class ModelRegistry:
+    """
+    Named models (and shared resources such as the tokenizer), loaded on demand.
+    
+    Entries load the first time they are requested, or eagerly in the
+    background via ``load_async()``. A failed load is retried on the next request.
+    """
+
+    def __init__(self):
+        """Initialize an empty registry."""
+        self._entries: dict[str, ModelEntry] = {}
+
+    def register(self, name: str, loader: Callable[[], Any]) -> None:
+        """
+        Register a loader under a name.
+        
+        Args:
+            name: Name to route requests by.
+            loader: Function that loads and returns the resource.
+        """
+        self._entries[name] = ModelEntry(name, loader)
+
+    def entry(self, name: str) -> ModelEntry:
+        """Look up an entry, raising UnknownModelError for unknown names."""
+        try:
+            return self._entries[name]
+        except KeyError:
+            raise UnknownModelError(f"Unknown model {name!r}. Available: {', '.join(self._entries)}") from None
+
+    def get(self, name: str) -> Any:
+        """Return the named resource, loading it first if necessary."""
+        return self.entry(name).get()
+
+    def is_loaded(self, name: str) -> bool:
+        """Whether the named resource has finished loading."""
+        return self.entry(name).value is not None
+
+    def load_async(self, name: str) -> threading.Thread:
+        """
+        Start loading the named resource on a background thread.
+        
+        Errors are recorded on the entry and reported by ``status()``.
+        """
+        entry = self.entry(name)
+
+        def load():
+            try:
+                entry.get()
+            except Exception:
+                pass
+
+        thread = threading.Thread(target=load, name=f"load-{name}", daemon=True)
+        thread.start()
+        return thread
+
+    def status(self) -> dict:
+        """Load state of every entry, by name."""
+        return {name: entry.status() for name, entry in self._entries.items()}
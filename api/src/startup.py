@@ -0,0 +1,105 @@
+"""Background startup with per-phase timings for readiness probes."""
+import logging
+import threading
+import time
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+
+class Startup:
+    """
+    Run the service's startup phases on a background thread.
+    
+    The web server can accept connections (and answer liveness probes) while
+    heavy imports and model loading are still running. ``ready`` only turns
+    true once every phase has finished successfully.
+    
+    A failing phase is retried with exponential backoff, since a model file
+    still being copied or a briefly unreachable hub often fixes itself. Once
+    the retries run out ``failed`` turns true, so the liveness probe can
+    report the process as dead and get it restarted.
+    """
+
+    def __init__(self, retries: int = 3, backoff_seconds: float = 5.0):
+        """
+        Initialize an empty, not yet started startup sequence.
+        
+        Args:
+            retries: Times a failing phase is retried before startup fails.
+            backoff_seconds: Delay before the first retry; doubled for each
+                further retry.
+        """
+        self.retries = retries
+        self.backoff_seconds = backoff_seconds
+        self.state = "pending"
+        self.phase: str | None = None
+        self.timings: dict[str, float] = {}
+        self.error: str | None = None
+        self._thread: threading.Thread | None = None
+
+    @property
+    def ready(self) -> bool:
+        """Whether every startup phase has completed."""
+        return self.state == "ready"
+
+    @property
+    def failed(self) -> bool:
+        """Whether a phase failed for good, after its retries."""
+        return self.state == "failed"
+
+    def start(self, phases: list[tuple[str, Callable[[], None]]]) -> None:
+        """
+        Run the phases in order on a background thread.
+        
+        Args:
+            phases: (name, function) pairs; a phase that still fails after
+                its retries stops the sequence.
+        """
+        self.state = "starting"
+        self._thread = threading.Thread(target=self._run, args=(phases,), name="startup", daemon=True)
+        self._thread.start()
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """Block until startup has finished; returns whether it succeeded."""
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self.ready
+
+    def _run(self, phases: list[tuple[str, Callable[[], None]]]) -> None:
+        started = time.perf_counter()
+        for name, phase in phases:
+            self.phase = name
+            phase_started = time.perf_counter()
+            try:
+                self._run_phase(name, phase)
+            except Exception:
+                self.state = "failed"
+                return
+            finally:
+                self.timings[name] = time.perf_counter() - phase_started
+        self.timings["total"] = time.perf_counter() - started
+        self.phase = None
+        self.state = "ready"
+
+    def _run_phase(self, name: str, phase: Callable[[], None]) -> None:
+        for attempt in range(self.retries + 1):
+            try:
+                phase()
+                self.error = None
+                return
+            except Exception as exc:
+                logger.exception("Startup phase %r failed (attempt %d of %d)", name, attempt + 1, self.retries + 1)
+                self.error = f"{name}: {exc}"
+                if attempt == self.retries:
+                    raise
+                time.sleep(self.backoff_seconds * 2 ** attempt)
+
+    def status(self) -> dict:
+        """Current state, the running phase, phase timings in seconds and any error."""
+        return {
+            "status": self.state,
+            "phase": self.phase,
+            "timings": dict(self.timings),
+            "error": self.error,
+        }
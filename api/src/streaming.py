@@ -0,0 +1,229 @@
+"""Incremental NDJSON scoring for streamed request bodies."""
+import asyncio
+import json
+from typing import AsyncIterator, Awaitable, Callable
+
+from starlette.requests import ClientDisconnect
+from starlette.responses import StreamingResponse
+
+from .executor import QueueFullError
+
+
+class LineTooLongError(ValueError):
+    """Raised when a streamed line exceeds the configured maximum size."""
+
+
+async def iter_lines(chunks: AsyncIterator[bytes], max_line_bytes: int) -> AsyncIterator[bytes]:
+    """
+    Split a stream of byte chunks into lines without buffering the whole body.
+    
+    Args:
+        chunks: Raw body chunks as they arrive.
+        max_line_bytes: Longest accepted line; longer lines raise LineTooLongError.
+    
+    Yields:
+        Lines without their trailing newline.
+    """
+    # Pieces of the current line, joined once it ends, so long lines cost linear time
+    pieces: list[bytes] = []
+    size = 0
+    async for chunk in chunks:
+        start = 0
+        while True:
+            end = chunk.find(b"\n", start)
+            piece = chunk[start:] if end == -1 else chunk[start:end]
+            size += len(piece)
+            if size > max_line_bytes:
+                raise LineTooLongError(f"Line exceeds {max_line_bytes} bytes")
+            if piece:
+                pieces.append(piece)
+            if end == -1:
+                break
+            yield b"".join(pieces)
+            pieces, size = [], 0
+            start = end + 1
+    if pieces:
+        yield b"".join(pieces)
+
+
+async def read_body(receive: Callable[[], Awaitable[dict]], done: asyncio.Event) -> AsyncIterator[bytes]:
+    """
+    Read a request body from ASGI ``receive``, setting ``done`` as soon as its last chunk arrives.
+    
+    Unlike Request.stream(), this signals the end of the body when the last
+    chunk is received rather than when the consumer asks for more, so
+    BodyStreamingResponse can start listening for a disconnect while earlier
+    chunks are still being scored.
+    
+    Raises:
+        ClientDisconnect: If the client goes away before the body ends.
+    """
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            raise ClientDisconnect()
+        if not message.get("more_body", False):
+            done.set()
+            if message.get("body"):
+                yield message["body"]
+            return
+        if message.get("body"):
+            yield message["body"]
+
+
+class BodyStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse for generators that are still reading the request body.
+    
+    On ASGI servers older than spec 2.4, StreamingResponse watches ``receive``
+    for a disconnect while streaming, which swallows body chunks meant for the
+    generator. This variant only reads ``receive`` once ``body_read`` is set
+    (see read_body()). From then on, an ``http.disconnect`` cancels the
+    generator so no more records are scored for a client that has gone. Until
+    then, a disconnect surfaces through the body stream or a failed ``send``.
+    """
+
+    def __init__(self, content, *args, body_read: asyncio.Event | None = None, **kwargs):
+        """
+        Initialize the response.
+        
+        Args:
+            content: Async iterator producing the response body.
+            body_read: Set once the request body has been read to the end.
+            *args, **kwargs: Passed to StreamingResponse.
+        """
+        super().__init__(content, *args, **kwargs)
+        self.body_read = body_read
+
+    async def _wait_for_disconnect(self, receive) -> None:
+        if self.body_read is None:
+            await asyncio.Future()
+        await self.body_read.wait()
+        while (await receive())["type"] != "http.disconnect":
+            pass
+
+    async def __call__(self, scope, receive, send) -> None:
+        stream = asyncio.ensure_future(self.stream_response(send))
+        disconnect = asyncio.ensure_future(self._wait_for_disconnect(receive))
+        try:
+            await asyncio.wait((stream, disconnect), return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            stream.cancel()
+            disconnect.cancel()
+            # Let the generator's cleanup (cancelling its inference tasks) run before returning
+            await asyncio.gather(stream, disconnect, return_exceptions=True)
+        if stream.cancelled():
+            return
+        if isinstance(stream.exception(), OSError):
+            raise ClientDisconnect()
+        stream.result()
+        if self.background is not None:
+            await self.background()
+
+
+def _parse(line: bytes) -> str:
+    record = json.loads(line)
+    if not isinstance(record, dict) or not isinstance(record.get("text"), str):
+        raise ValueError('Expected an object with a string "text" field')
+    return record["text"]
+
+
+async def _run_with_retry(
+    run: Callable[..., Awaitable], predict_batch: Callable, texts: list[str], max_retries: int
+) -> list[dict]:
+    if not texts:
+        return []
+    # Bulk streams wait out a full queue for a while instead of failing halfway through,
+    # then report the chunk as failed rather than waiting forever
+    for attempt in range(max_retries + 1):
+        try:
+            return await run(predict_batch, texts)
+        except QueueFullError as exc:
+            if attempt == max_retries:
+                return [{"error": str(exc)}] * len(texts)
+            await asyncio.sleep(exc.retry_after)
+
+
+async def score_ndjson(
+    chunks: AsyncIterator[bytes],
+    predict_batch: Callable[[list[str]], list[dict]],
+    run: Callable[..., Awaitable],
+    chunk_size: int = 64,
+    max_line_bytes: int = 1024 * 1024,
+    max_retries: int = 5,
+) -> AsyncIterator[bytes]:
+    """
+    Score an NDJSON stream of ``{"text": ...}`` records chunk by chunk.
+    
+    Records are grouped into chunks of ``chunk_size`` and scored while the next
+    chunk is being read, so at most two chunks are held in memory regardless
+    of the stream's length. Each output line carries the record's zero-based
+    ``index``, plus either the prediction or an ``error`` for malformed records
+    and for chunks still rejected by a full queue after ``max_retries`` retries.
+    Scoring stops as soon as the generator is closed (e.g. the client left).
+    
+    Args:
+        chunks: Raw request body chunks.
+        predict_batch: Batch prediction function to apply.
+        run: Coroutine function that runs ``predict_batch`` off the event loop.
+        chunk_size: Records per inference call.
+        max_line_bytes: Longest accepted input line.
+        max_retries: Retries of a chunk rejected because the queue is full.
+    
+    Yields:
+        NDJSON-encoded result lines, in input order.
+    """
+    pending: tuple[list[tuple[int, str | None, str | None]], asyncio.Future] | None = None
+
+    async def flush(batch, task) -> list[bytes]:
+        results = iter(await task)
+        lines = []
+        for index, text, error in batch:
+            if error is not None:
+                lines.append({"index": index, "error": error})
+            else:
+                lines.append({"index": index, **next(results)})
+        return [json.dumps(line).encode() + b"\n" for line in lines]
+
+    def start(batch) -> asyncio.Future:
+        texts = [text for _, text, error in batch if error is None]
+        task = asyncio.ensure_future(_run_with_retry(run, predict_batch, texts, max_retries))
+        # Only in-flight tasks are tracked, so finished chunks' results can be freed
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+        return task
+
+    tasks: set[asyncio.Future] = set()
+    batch: list[tuple[int, str | None, str | None]] = []
+    index = 0
+    try:
+        try:
+            async for line in iter_lines(chunks, max_line_bytes):
+                if not line.strip():
+                    continue
+                try:
+                    batch.append((index, _parse(line), None))
+                except ValueError as exc:
+                    batch.append((index, None, str(exc)))
+                index += 1
+
+                if len(batch) >= chunk_size:
+                    task = start(batch)
+                    if pending is not None:
+                        for out in await flush(*pending):
+                            yield out
+                    pending, batch = (batch, task), []
+        except LineTooLongError as exc:
+            # Report the oversized line and stop reading, after flushing what we have
+            batch.append((index, None, str(exc)))
+
+        task = start(batch)
+        if pending is not None:
+            for out in await flush(*pending):
+                yield out
+        for out in await flush(batch, task):
+            yield out
+    finally:
+        # The client may have gone mid-stream; don't keep scoring for nobody
+        for task in list(tasks):
+            task.cancel()
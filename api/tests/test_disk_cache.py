@@ -0,0 +1,45 @@
+import sqlite3
+
+from src.cache import text_hash
+from src.disk_cache import DiskPredictionCache
+
+
+def _accessed_at(path, text: str) -> float:
+    with sqlite3.connect(path) as conn:
+        (accessed_at,) = conn.execute(
+            "SELECT accessed_at FROM predictions WHERE text_hash = ?", (text_hash(text),)
+        ).fetchone()
+    return accessed_at
+
+
+def test_hits_are_served_while_another_worker_holds_the_write_lock(tmp_path):
+    path = tmp_path / "cache.db"
+    cache = DiskPredictionCache(path, touch_interval=0)
+    cache.put_many("m1", ["good"], [{"label": "positive", "confidence": 0.9}])
+
+    writer = sqlite3.connect(path, isolation_level=None)
+    writer.execute("BEGIN IMMEDIATE")
+    try:
+        cache._connection().execute("PRAGMA busy_timeout = 100")
+        assert cache.get_many("m1", ["good", "other"]) == [{"label": "positive", "confidence": 0.9}, None]
+    finally:
+        writer.execute("ROLLBACK")
+        writer.close()
+
+
+def test_access_times_are_refreshed_only_when_stale_and_with_the_next_write(tmp_path):
+    path = tmp_path / "cache.db"
+    cache = DiskPredictionCache(path, touch_interval=3600)
+    cache.put_many("m1", ["good"], [{"label": "positive", "confidence": 0.9}])
+    written = _accessed_at(path, "good")
+
+    cache.get_many("m1", ["good"])
+    assert cache._touched == {}
+
+    cache.touch_interval = 0
+    cache.get_many("m1", ["good"])
+    assert _accessed_at(path, "good") == written
+
+    cache.put_many("m1", ["bad"], [{"label": "negative", "confidence": 0.8}])
+    assert _accessed_at(path, "good") > written
+    assert cache._touched == {}
@@ -0,0 +1,38 @@
+import asyncio
+import threading
+
+import pytest
+
+from src.executor import InferenceExecutor, QueueFullError
+
+
+def test_cancelled_queued_job_releases_its_slot():
+    executor = InferenceExecutor(max_workers=1, max_queue=2)
+    release = threading.Event()
+
+    async def scenario():
+        blocker = asyncio.ensure_future(executor.run(release.wait))
+        await asyncio.sleep(0.05)
+        waiters = [asyncio.ensure_future(executor.run(lambda: "late")) for _ in range(2)]
+        await asyncio.sleep(0)
+        assert executor.stats()["queued"] == 2
+        with pytest.raises(QueueFullError):
+            executor.submit(lambda: None)
+
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        assert executor.stats()["queued"] == 0
+
+        release.set()
+        await blocker
+        assert await executor.run(lambda: "ok") == "ok"
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        release.set()
+        executor.shutdown()
+    stats = executor.stats()
+    assert stats["queued"] == 0
+    assert stats["running"] == 0
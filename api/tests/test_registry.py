@@ -0,0 +1,114 @@
+import dataclasses
+import gc
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+from src.backends import InferenceBackend
+from src.registry import LoadedModel, ModelEntry
+
+
+class FakeBackend(InferenceBackend):
+    name = "fake"
+
+    def __init__(self):
+        super().__init__((16,))
+
+    def __call__(self, input_ids, attention_mask):
+        return np.full((len(input_ids), 3), 1 / 3, dtype=np.float32)
+
+
+def _loader(version: str, calls: list | None = None, delay: float = 0.0):
+    def load():
+        if calls is not None:
+            calls.append(version)
+        time.sleep(delay)
+        return LoadedModel(FakeBackend(), f"fake:{version}", version)
+    return load
+
+
+def test_concurrent_gets_load_only_once():
+    calls = []
+    entry = ModelEntry("finetuned", _loader("v1", calls, delay=0.2))
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        loaded = list(pool.map(lambda _: entry.get(), range(8)))
+
+    assert calls == ["v1"]
+    assert all(model is loaded[0] for model in loaded)
+    assert entry.status()["state"] == "ready"
+
+
+def test_retired_version_stays_loaded_until_its_requests_finish():
+    entry = ModelEntry("finetuned", _loader("v1"))
+    acquired = threading.Event()
+    finish = threading.Event()
+
+    def request():
+        with entry.acquire() as model:
+            acquired.set()
+            finish.wait(5)
+            return model.version
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        in_flight = pool.submit(request)
+        assert acquired.wait(5)
+        v1 = weakref.ref(entry.versions["v1"].backend)
+
+        staged = entry.stage(_loader("v2"))
+        assert staged.version == "v2"
+        assert entry.value.version == "v2"
+        # v1 is retired but still held by the request in flight
+        assert entry.status()["versions"]["v1"] == {"model_id": "fake:v1", "in_flight": 1, "retiring": True}
+
+        finish.set()
+        assert in_flight.result() == "v1"
+
+    gc.collect()
+    assert set(entry.versions) == {"v2"}
+    assert v1() is None
+
+
+def test_hot_swap_through_the_admin_api(monkeypatch):
+    import main
+    from src import model
+    from src.cache import PredictionCache
+    from src.registry import ModelRegistry
+
+    loads = iter(range(1, 100))
+
+    def load_fake(path=None):
+        n = next(loads)
+        return LoadedModel(FakeBackend(), f"fake:{n}", f"v{n}")
+
+    registry = ModelRegistry()
+    registry.register("tokenizer", object)
+    registry.register("finetuned", load_fake)
+    cache = PredictionCache(max_entries=100)
+    for module in (main, model):
+        monkeypatch.setattr(module, "registry", registry)
+    monkeypatch.setattr(model, "prediction_cache", cache)
+    monkeypatch.setitem(model.MODEL_LOADERS, "finetuned", load_fake)
+    monkeypatch.setattr(main, "config", dataclasses.replace(main.config, admin_token="secret"))
+    monkeypatch.setitem(main.app.dependency_overrides, main.require_ready, lambda: None)
+
+    v1 = weakref.ref(registry.get("finetuned").backend)
+    cache.put_many("fake:1", ["good"], [{"label": "positive", "confidence": 0.9}])
+    client = TestClient(main.app, headers={"Authorization": "Bearer secret"})
+
+    response = client.post("/admin/models/finetuned/versions", json={"version": "v2"})
+    assert response.status_code == 200
+    assert response.json()["active_version"] == "v2"
+    assert set(response.json()["versions"]) == {"v2"}
+    gc.collect()
+    assert v1() is None
+    assert cache.get_many("fake:1", ["good"]) == [None]
+
+    assert client.post("/predict", json={"text": "good", "version": "v1"}).status_code == 404
+    assert client.post("/admin/models/finetuned/versions", json={"version": "v2"}).status_code == 409
+    assert client.delete("/admin/models/finetuned/versions/v2").status_code == 409
+    assert registry.entry("finetuned").value.version == "v2"
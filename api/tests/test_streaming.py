@@ -0,0 +1,96 @@
+import asyncio
+import json
+import weakref
+
+import pytest
+
+from src.executor import QueueFullError
+from src.streaming import LineTooLongError, iter_lines, score_ndjson
+
+
+async def _chunks(*chunks: bytes):
+    for chunk in chunks:
+        yield chunk
+
+
+async def _collect(iterator) -> list:
+    return [item async for item in iterator]
+
+
+def test_iter_lines_splits_across_chunk_boundaries():
+    lines = asyncio.run(_collect(iter_lines(_chunks(b"ab", b"c\nd", b"", b"\n\nef"), max_line_bytes=10)))
+    assert lines == [b"abc", b"d", b"", b"ef"]
+
+
+def test_iter_lines_rejects_long_line_inside_one_chunk():
+    with pytest.raises(LineTooLongError):
+        asyncio.run(_collect(iter_lines(_chunks(b"x" * 11 + b"\nok\n"), max_line_bytes=10)))
+
+
+def test_full_queue_is_retried_a_bounded_number_of_times():
+    calls = 0
+
+    async def run(fn, texts):
+        nonlocal calls
+        calls += 1
+        raise QueueFullError(retry_after=0)
+
+    body = _chunks(b'{"text": "a"}\n{"text": "b"}\n')
+    lines = asyncio.run(_collect(score_ndjson(body, None, run, max_retries=2)))
+    assert calls == 3
+    assert [json.loads(line)["index"] for line in lines] == [0, 1]
+    assert all("full" in json.loads(line)["error"] for line in lines)
+
+
+def test_closing_the_stream_cancels_pending_inference():
+    started = []
+
+    async def run(fn, texts):
+        started.append(texts)
+        await asyncio.sleep(3600)
+
+    async def scenario():
+        body = _chunks(*(b'{"text": "a"}\n' for _ in range(4)))
+        stream = score_ndjson(body, None, run, chunk_size=1)
+        reader = asyncio.ensure_future(stream.__anext__())
+        await asyncio.sleep(0.01)
+        reader.cancel()
+        await asyncio.gather(reader, return_exceptions=True)
+        await stream.aclose()
+        await asyncio.sleep(0)
+        return [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+
+    assert asyncio.run(scenario()) == []
+    assert started
+
+
+def test_long_stream_keeps_a_bounded_number_of_chunks_alive():
+    class Result(dict):
+        pass
+
+    live = 0
+    peak = 0
+
+    def freed():
+        nonlocal live
+        live -= 1
+
+    async def run(fn, texts):
+        nonlocal live, peak
+        peak = max(peak, live)
+        results = [Result(label="positive") for _ in texts]
+        for result in results:
+            weakref.finalize(result, freed)
+        live += len(results)
+        return results
+
+    async def scenario():
+        body = _chunks(*(b'{"text": "a"}\n' for _ in range(2000)))
+        count = 0
+        async for _ in score_ndjson(body, None, run, chunk_size=8):
+            count += 1
+        return count
+
+    assert asyncio.run(scenario()) == 2000
+    # The chunk being flushed and the one being scored, not every chunk so far
+    assert peak <= 3 * 8
@@ -1,35 +1,45 @@
 """API client for sentiment analysis predictions."""
 import os
-import requests
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
+import threading
 from typing import Optional
+from app.client import SentimentClient
 
-# Create a session with retry strategy
-_session = None
-
-
-def get_session():
-    """Get or create a requests session with retry strategy."""
-    global _session
-    if _session is None:
-        _session = requests.Session()
-        retry_strategy = Retry(
-            total=3,
-            backoff_factor=0.3,
-            status_forcelist=[429, 500, 502, 503, 504],
-        )
-        adapter = HTTPAdapter(max_retries=retry_strategy)
-        _session.mount("http://", adapter)
-        _session.mount("https://", adapter)
-    return _session
+# One pooled client per API URL, shared by every session of the dashboard
+_clients: dict[str, SentimentClient] = {}
+_clients_lock = threading.Lock()
 
 
 def get_api_url() -> str:
-    """Get API URL from environment variable or default to localhost."""
+    """
+    Get API URL from environment variable or default to localhost.
+    
+    API_URL may list several replicas separated by commas; the client
+    spreads requests across them.
+    """
     return os.getenv("API_URL", "http://localhost:8000")
 
 
+def get_client(api_url: Optional[str] = None) -> SentimentClient:
+    """
+    Get or create the pooled client for an API URL.
+    
+    Args:
+        api_url: Optional API URL override.
+    
+    Returns:
+        Client with a small prediction cache, so re-analyzing a review
+        doesn't repeat the request.
+    """
+    if api_url is None:
+        api_url = get_api_url()
+    
+    with _clients_lock:
+        client = _clients.get(api_url)
+        if client is None:
+            client = _clients[api_url] = SentimentClient(api_url, cache_size=4096, cache_ttl=300)
+        return client
+
+
 def predict_sentiment(text: str, api_url: Optional[str] = None) -> dict:
     """
     Predict sentiment using the API.
@@ -44,17 +54,7 @@ def predict_sentiment(text: str, api_url: Optional[str] = None) -> dict:
     Raises:
         requests.RequestException: If API request fails.
     """
-    if api_url is None:
-        api_url = get_api_url()
-    
-    session = get_session()
-    response = session.post(
-        f"{api_url}/predict",
-        json={"text": text},
-        timeout=30
-    )
-    response.raise_for_status()
-    return response.json()
+    return get_client(api_url).predict(text)
 
 
 def predict_pretrained(text: str, api_url: Optional[str] = None) -> dict:
@@ -71,22 +71,7 @@ def predict_pretrained(text: str, api_url: Optional[str] = None) -> dict:
     Raises:
         requests.RequestException: If API request fails.
     """
-    if api_url is None:
-        api_url = get_api_url()
-    
-    # Try the pretrained endpoint, fallback to main predict if not available
-    try:
-        session = get_session()
-        response = session.post(
-            f"{api_url}/predict/pretrained",
-            json={"text": text},
-            timeout=30
-        )
-        response.raise_for_status()
-        return response.json()
-    except requests.RequestException:
-        # Fallback to main predict endpoint if pretrained endpoint doesn't exist
-        return predict_sentiment(text, api_url)
+    return get_client(api_url).predict(text, "pretrained")
 
 
 def predict_finetuned(text: str, api_url: Optional[str] = None) -> dict:
@@ -103,22 +88,60 @@ def predict_finetuned(text: str, api_url: Optional[str] = None) -> dict:
     Raises:
         requests.RequestException: If API request fails.
     """
-    if api_url is None:
-        api_url = get_api_url()
+    return get_client(api_url).predict(text, "finetuned")
+
+
+def predict_batch(texts: list[str], api_url: Optional[str] = None, model: str = "finetuned") -> list[dict]:
+    """
+    Predict sentiment for several texts through batch requests.
+    
+    Args:
+        texts: Input texts to classify.
+        api_url: Optional API URL override.
+        model: Either "finetuned" or "pretrained".
+    
+    Returns:
+        List of dicts with 'label' and 'confidence' keys, in input order.
     
-    # Try the finetuned endpoint, fallback to main predict if not available
-    try:
-        session = get_session()
-        response = session.post(
-            f"{api_url}/predict/finetuned",
-            json={"text": text},
-            timeout=30
-        )
-        response.raise_for_status()
-        return response.json()
-    except requests.RequestException:
-        # Fallback to main predict endpoint if finetuned endpoint doesn't exist
-        return predict_sentiment(text, api_url)
+    Raises:
+        requests.RequestException: If API request fails.
+    """
+    return get_client(api_url).predict_many(texts, model)
+
+
+def compare_models(text: str, api_url: Optional[str] = None) -> dict:
+    """
+    Score text with both the fine-tuned and pretrained models in one request.
+    
+    Args:
+        text: Input text to classify.
+        api_url: Optional API URL override.
+    
+    Returns:
+        Dict with 'finetuned' and 'pretrained' keys, each with 'label',
+        'confidence' and 'scores' (probability per label) keys.
+    
+    Raises:
+        requests.RequestException: If API request fails.
+    """
+    return get_client(api_url).compare(text)
+
+
+def compare_models_batch(texts: list[str], api_url: Optional[str] = None) -> list[dict]:
+    """
+    Score several texts with both models through batch requests.
+    
+    Args:
+        texts: Input texts to classify.
+        api_url: Optional API URL override.
+    
+    Returns:
+        List of dicts shaped like compare_models() results, in input order.
+    
+    Raises:
+        requests.RequestException: If API request fails.
+    """
+    return get_client(api_url).compare_many(texts)
 
 
 def health_check(api_url: Optional[str] = None) -> bool:
@@ -131,13 +154,4 @@ def health_check(api_url: Optional[str] = None) -> bool:
     Returns:
         True if API is healthy, False otherwise.
     """
-    if api_url is None:
-        api_url = get_api_url()
-    
-    try:
-        session = get_session()
-        response = session.get(f"{api_url}/health", timeout=5)
-        return response.status_code == 200
-    except requests.RequestException:
-        return False
-
+    return get_client(api_url).health()
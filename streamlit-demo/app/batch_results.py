@@ -0,0 +1,148 @@
+"""Columnar storage for Batch CSV predictions awaiting validation."""
+import csv
+import io
+from array import array
+from datetime import datetime
+from typing import Iterator, Optional
+
+import numpy as np
+
+LABELS = ("negative", "neutral", "positive")
+
+# Validation status codes
+PENDING = 0
+CORRECT = 1
+WRONG = 2
+
+
+class BatchResults:
+    """
+    Predictions for an uploaded CSV, stored one compact array per column.
+
+    Labels, confidences and validation state take a few bytes per row instead
+    of a dict each, and validating a row is an in-place update rather than a
+    list removal, so uploads of tens of thousands of rows stay responsive.
+    """
+
+    def __init__(self):
+        """Initialize an empty result set."""
+        self.texts: list[str] = []
+        self.rows = array("q")
+        self.labels = array("b")
+        # Doubles, so exported confidences match what the API returned
+        self.confidences = array("d")
+        self.status = bytearray()
+        self.validated_at = array("d")
+        # Positions in the order they were validated, for export
+        self.validated_order = array("q")
+        self.version = 0
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    @property
+    def validated_count(self) -> int:
+        """Number of rows the user has validated."""
+        return len(self.validated_order)
+
+    @property
+    def pending_count(self) -> int:
+        """Number of rows still awaiting validation."""
+        return len(self) - self.validated_count
+
+    def append(self, row: int, text: str, label: str, confidence: float) -> None:
+        """
+        Add a prediction awaiting validation.
+
+        Args:
+            row: Row number in the uploaded CSV.
+            text: Review text.
+            label: Predicted sentiment label.
+            confidence: Confidence of the prediction.
+        """
+        self.texts.append(text)
+        self.rows.append(row)
+        self.labels.append(LABELS.index(label))
+        self.confidences.append(confidence)
+        self.status.append(PENDING)
+        self.validated_at.append(0.0)
+        self.version += 1
+
+    def pending_positions(self, offset: int = 0, limit: Optional[int] = None) -> np.ndarray:
+        """
+        Positions of rows awaiting validation, in upload order.
+
+        Args:
+            offset: Number of pending rows to skip.
+            limit: Maximum number of positions to return.
+
+        Returns:
+            Array of positions usable with item() and validate().
+        """
+        pending = np.flatnonzero(np.frombuffer(bytes(self.status), dtype=np.uint8) == PENDING)
+        end = None if limit is None else offset + limit
+        return pending[offset:end]
+
+    def item(self, position: int) -> dict:
+        """Row at a position as a dict in the shape the history uses."""
+        text = self.texts[position]
+        item = {
+            "idx": self.rows[position],
+            "text": text[:80] + "..." if len(text) > 80 else text,
+            "full_text": text,
+            "sentiment": LABELS[self.labels[position]],
+            "confidence": float(self.confidences[position]),
+        }
+        if self.status[position] != PENDING:
+            item["validated"] = self.status[position] == CORRECT
+            item["timestamp"] = datetime.fromtimestamp(self.validated_at[position])
+        return item
+
+    def validate(self, position: int, correct: bool) -> dict:
+        """
+        Record the user's feedback on a prediction.
+
+        Args:
+            position: Position of the row.
+            correct: Whether the prediction was right.
+
+        Returns:
+            The validated row, as returned by item().
+
+        Raises:
+            ValueError: If the row was already validated.
+        """
+        if self.status[position] != PENDING:
+            raise ValueError(f"Row {self.rows[position]} is already validated")
+        self.status[position] = CORRECT if correct else WRONG
+        self.validated_at[position] = datetime.now().timestamp()
+        self.validated_order.append(position)
+        self.version += 1
+        return self.item(position)
+
+    def iter_csv(self, chunk_rows: int = 1000) -> Iterator[str]:
+        """
+        Validated rows as CSV text, a chunk of rows at a time.
+
+        Args:
+            chunk_rows: Rows per yielded chunk.
+
+        Yields:
+            CSV text, starting with the header.
+        """
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(["review", "sentiment", "confidence", "validated"])
+        for start in range(0, self.validated_count, chunk_rows):
+            for position in self.validated_order[start:start + chunk_rows]:
+                writer.writerow([
+                    self.texts[position],
+                    LABELS[self.labels[position]],
+                    float(self.confidences[position]),
+                    self.status[position] == CORRECT,
+                ])
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
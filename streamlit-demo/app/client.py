@@ -0,0 +1,827 @@
+"""
+Pooled clients for the sentiment analysis API.
+
+SentimentClient (blocking, on requests) and AsyncSentimentClient (asyncio, on
+httpx) have the same methods. Both keep a bounded connection pool, retry
+transient failures, and score many texts through /predict/batch with a
+bounded number of requests in flight. On API versions without an endpoint
+they fall back to single requests; the 404 is remembered, so the fallback
+costs one extra request per client rather than one per call. Any other batch
+failure fails every text in the batch rather than being retried text by text,
+which would only multiply the load on an API that is already struggling.
+
+Given several replica URLs, requests are spread across them by picking the
+less busy of two random replicas (see ReplicaPool).
+"""
+import asyncio
+import random
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Iterator, Optional, Union
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+# Statuses worth retrying: overloaded (429 from the batcher queue) or briefly unavailable
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a call does not finish within its deadline."""
+
+
+def is_not_found(error: Exception) -> bool:
+    """Whether a request failed because the endpoint doesn't exist on this API version."""
+    response = getattr(error, "response", None)
+    return response is not None and response.status_code == 404
+
+
+def is_transient(error: Exception) -> bool:
+    """Whether a request failed because the API is overloaded, unavailable or too slow, rather than because of its input."""
+    if isinstance(error, (TimeoutError, requests.Timeout, requests.ConnectionError, httpx.TransportError)):
+        return True
+    response = getattr(error, "response", None)
+    return response is not None and response.status_code in RETRY_STATUSES
+
+
+class _Deadline:
+    """Time budget shared by every request made for one call."""
+
+    def __init__(self, seconds: Optional[float]):
+        self.expires = None if seconds is None else time.monotonic() + seconds
+
+    @property
+    def expired(self) -> bool:
+        return self.expires is not None and self.expires <= time.monotonic()
+
+    def cap(self, seconds: float) -> float:
+        """
+        Cap a timeout or delay at the time left.
+
+        Raises:
+            DeadlineExceeded: If no time is left.
+        """
+        if self.expires is None:
+            return seconds
+        left = self.expires - time.monotonic()
+        if left <= 0:
+            raise DeadlineExceeded("Deadline exceeded")
+        return min(seconds, left)
+
+
+class _ResultCache:
+    """Thread-safe LRU of predictions keyed by (model, text), with optional expiry."""
+
+    def __init__(self, max_entries: int, ttl: Optional[float]):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, model: str, text: str) -> Optional[dict]:
+        key = (model, text)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, result = entry
+            if expires is not None and expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return dict(result)
+
+    def put(self, model: str, text: str, result: dict) -> None:
+        expires = None if self.ttl is None else time.monotonic() + self.ttl
+        with self._lock:
+            self._entries[(model, text)] = (expires, dict(result))
+            self._entries.move_to_end((model, text))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class _Replica:
+    """One API replica and the pool's bookkeeping for it."""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.outstanding = 0
+        self.failures = 0
+        self.ejected_until = 0.0
+
+
+class ReplicaPool:
+    """
+    API replicas to spread requests over.
+
+    Each request goes to the less busy, by requests in flight, of two replicas
+    picked at random ("power of two choices"). This follows load almost as
+    well as always picking the least busy replica, without every client
+    herding onto the same one. A replica is ejected for ``eject_seconds``
+    after ``failure_threshold`` consecutive failures (connection errors,
+    timeouts or 5xx). Background health checks eject replicas that stop
+    answering and readmit them as soon as they answer again. If every replica
+    is ejected, requests go to all of them rather than failing outright.
+    """
+
+    def __init__(
+        self,
+        urls: list[str],
+        failure_threshold: int = 2,
+        eject_seconds: float = 10.0,
+        health_path: str = "/health/ready",
+    ):
+        """
+        Initialize the pool.
+
+        Args:
+            urls: Replica URLs, e.g. http://api-1:8000.
+            failure_threshold: Consecutive failures that eject a replica.
+            eject_seconds: How long an ejected replica gets no requests,
+                unless a health check readmits it sooner.
+            health_path: Endpoint polled by health checks.
+        """
+        if not urls:
+            raise ValueError("At least one API URL is required")
+        self.replicas = [_Replica(url.rstrip("/")) for url in urls]
+        self.failure_threshold = failure_threshold
+        self.eject_seconds = eject_seconds
+        self.health_path = health_path
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._checker: Optional[threading.Thread] = None
+
+    def acquire(self) -> _Replica:
+        """Pick a replica for a request and count the request as in flight on it."""
+        with self._lock:
+            if len(self.replicas) == 1:
+                replica = self.replicas[0]
+            else:
+                now = time.monotonic()
+                candidates = [r for r in self.replicas if r.ejected_until <= now] or self.replicas
+                if len(candidates) == 1:
+                    replica = candidates[0]
+                else:
+                    first, second = random.sample(candidates, 2)
+                    replica = first if first.outstanding <= second.outstanding else second
+            replica.outstanding += 1
+            return replica
+
+    def release(self, replica: _Replica, failed: bool) -> None:
+        """Record the end of a request on a replica, ejecting it after repeated failures."""
+        with self._lock:
+            replica.outstanding -= 1
+            if not failed:
+                replica.failures = 0
+                return
+            replica.failures += 1
+            if replica.failures >= self.failure_threshold:
+                replica.ejected_until = time.monotonic() + self.eject_seconds
+
+    def record_health(self, replica: _Replica, healthy: bool) -> None:
+        """Readmit a replica that passed a health check, or eject one that failed it."""
+        with self._lock:
+            if healthy:
+                replica.failures = 0
+                replica.ejected_until = 0.0
+            else:
+                replica.failures = max(replica.failures, self.failure_threshold)
+                replica.ejected_until = time.monotonic() + self.eject_seconds
+
+    def check(self, timeout: float = 2.0) -> bool:
+        """
+        Health check every replica now.
+
+        Returns:
+            True if at least one replica is healthy.
+        """
+        results = []
+        for replica in self.replicas:
+            try:
+                # 404 only means an API version without this endpoint, so it still counts as up
+                healthy = requests.get(replica.url + self.health_path, timeout=timeout).status_code < 500
+            except requests.RequestException:
+                healthy = False
+            self.record_health(replica, healthy)
+            results.append(healthy)
+        return any(results)
+
+    def start_health_checks(self, interval: float) -> None:
+        """Health check every replica every ``interval`` seconds on a daemon thread."""
+        if self._checker is not None:
+            return
+
+        def run():
+            while not self._stop.wait(interval):
+                self.check(timeout=min(interval, 2.0))
+
+        self._checker = threading.Thread(target=run, name="replica-health", daemon=True)
+        self._checker.start()
+
+    def stop_health_checks(self) -> None:
+        """Stop the background health checks."""
+        self._stop.set()
+
+    def status(self) -> list[dict]:
+        """URL, requests in flight, consecutive failures and ejection of every replica."""
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {
+                    "url": r.url,
+                    "outstanding": r.outstanding,
+                    "failures": r.failures,
+                    "ejected": r.ejected_until > now,
+                }
+                for r in self.replicas
+            ]
+
+
+class _BaseClient:
+    """Settings, result cache and endpoint discovery shared by both clients."""
+
+    def __init__(
+        self,
+        base_url: Union[str, list[str]],
+        pool_size: int = 10,
+        timeout: float = 60.0,
+        retries: int = 3,
+        backoff_factor: float = 0.3,
+        batch_size: int = 64,
+        concurrency: int = 4,
+        cache_size: int = 0,
+        cache_ttl: Optional[float] = None,
+        health_interval: Optional[float] = 5.0,
+        failure_threshold: int = 2,
+        eject_seconds: float = 10.0,
+    ):
+        """
+        Initialize the client.
+
+        Args:
+            base_url: API URL, e.g. http://localhost:8000, or several replica
+                URLs as a list or a comma-separated string.
+            pool_size: Maximum open connections to each replica.
+            timeout: Timeout in seconds of each request.
+            retries: Retries of a request after a connection error or a
+                retryable status (429, 5xx), with exponential backoff.
+            backoff_factor: Delay before the first retry, doubling after each one.
+            batch_size: Texts per /predict/batch request in predict_many()
+                (the API accepts up to 1000).
+            concurrency: Requests in flight at once in predict_many() and compare_many().
+            cache_size: Predictions to keep client-side, keyed by model and
+                text. 0 disables the cache. Cached predictions don't notice
+                model version changes on the API, so set cache_ttl if those
+                happen while the client is running.
+            cache_ttl: Seconds a cached prediction stays valid (None for no expiry).
+            health_interval: Seconds between background health checks of the
+                replicas, when there are several (None disables them).
+            failure_threshold: Consecutive failures that eject a replica.
+            eject_seconds: How long an ejected replica gets no requests.
+        """
+        urls = base_url.split(",") if isinstance(base_url, str) else base_url
+        self.replicas = ReplicaPool([url.strip() for url in urls if url.strip()], failure_threshold, eject_seconds)
+        if health_interval is not None and len(self.replicas.replicas) > 1:
+            self.replicas.start_health_checks(health_interval)
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.cache = _ResultCache(cache_size, cache_ttl) if cache_size > 0 else None
+        # Endpoints that returned 404, skipped from then on
+        self._missing: set[str] = set()
+
+    def _retry_delay(self, attempt: int, response) -> float:
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after is not None and retry_after.isdigit():
+            return float(retry_after)
+        return self.backoff_factor * 2 ** attempt
+
+    def _should_retry(self, attempt: int, response) -> bool:
+        return attempt < self.retries and (response is None or response.status_code in RETRY_STATUSES)
+
+    def _chunks(self, count: int, size: int) -> range:
+        return range(0, count, size)
+
+    def _cached(self, texts: list[str], model: str) -> list[Optional[dict]]:
+        if self.cache is None:
+            return [None] * len(texts)
+        return [self.cache.get(model, text) for text in texts]
+
+    def _store(self, texts: list[str], model: str, results: list) -> None:
+        if self.cache is None:
+            return
+        for text, result in zip(texts, results):
+            if isinstance(result, dict):
+                self.cache.put(model, text, result)
+
+
+class SentimentClient(_BaseClient):
+    """
+    Blocking client for the sentiment analysis API.
+
+    Safe to share between threads. Use as a context manager, or call close(),
+    to release the pooled connections.
+    """
+
+    def __init__(self, base_url: Union[str, list[str]], **options):
+        """
+        Initialize the client.
+
+        Args:
+            base_url: API URL, or several replica URLs as a list or a comma-separated string.
+            **options: Pool, retry, batching and cache settings (see _BaseClient).
+        """
+        super().__init__(base_url, **options)
+        self.session = requests.Session()
+        # pool_block makes threads wait for a free connection instead of opening extra ones
+        adapter = HTTPAdapter(
+            pool_connections=len(self.replicas.replicas), pool_maxsize=self.pool_size, pool_block=True
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def __enter__(self) -> "SentimentClient":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Close the pooled connections and stop health checks."""
+        self.replicas.stop_health_checks()
+        self.session.close()
+
+    def _request(self, method: str, path: str, deadline: _Deadline, **kwargs) -> requests.Response:
+        attempt = 0
+        while True:
+            timeout = deadline.cap(self.timeout)
+            replica = self.replicas.acquire()
+            failed = True
+            try:
+                response = self.session.request(method, replica.url + path, timeout=timeout, **kwargs)
+                failed = response.status_code >= 500
+            except requests.Timeout as e:
+                # A timeout cut short by the deadline is reported as the deadline passing
+                if deadline.expired:
+                    failed = False
+                    raise DeadlineExceeded("Deadline exceeded") from e
+                if not isinstance(e, requests.ConnectTimeout) or not self._should_retry(attempt, None):
+                    raise
+                response = None
+            except requests.ConnectionError:
+                if not self._should_retry(attempt, None):
+                    raise
+                response = None
+            finally:
+                self.replicas.release(replica, failed)
+            if response is not None and not self._should_retry(attempt, response):
+                response.raise_for_status()
+                return response
+            time.sleep(deadline.cap(self._retry_delay(attempt, response)))
+            attempt += 1
+
+    def _post(self, path: str, deadline: _Deadline, payload: dict) -> dict:
+        return self._request("POST", path, deadline, json=payload).json()
+
+    def health(self, timeout: float = 5.0) -> bool:
+        """Health check every replica now, returning whether any of them is healthy."""
+        return self.replicas.check(timeout)
+
+    def _predict(self, text: str, model: str, deadline: _Deadline) -> dict:
+        result = self.cache.get(model, text) if self.cache is not None else None
+        if result is not None:
+            return result
+        path = f"/predict/{model}"
+        if path not in self._missing:
+            try:
+                result = self._post(path, deadline, {"text": text})
+            except requests.HTTPError as e:
+                if not is_not_found(e):
+                    raise
+                self._missing.add(path)
+        if result is None:
+            # APIs without per-model endpoints only serve the default model
+            result = self._post("/predict", deadline, {"text": text})
+        self._store([text], model, [result])
+        return result
+
+    def predict(self, text: str, model: str = "finetuned", deadline: Optional[float] = None) -> dict:
+        """
+        Predict the sentiment of one text.
+
+        Args:
+            text: Input text to classify.
+            model: Either "finetuned" or "pretrained".
+            deadline: Seconds the call may take, retries included (None for no limit).
+
+        Returns:
+            Dict with 'label' and 'confidence' keys.
+
+        Raises:
+            requests.RequestException: If the API request fails.
+            DeadlineExceeded: If the deadline passes.
+        """
+        return self._predict(text, model, _Deadline(deadline))
+
+    def _predict_chunk(self, texts: list[str], model: str, deadline: _Deadline, return_exceptions: bool) -> list:
+        results = self._cached(texts, model)
+        misses = [i for i, result in enumerate(results) if result is None]
+        if not misses:
+            return results
+        pending = [texts[i] for i in misses]
+
+        scored = None
+        if "/predict/batch" not in self._missing:
+            try:
+                scored = self._post("/predict/batch", deadline, {"texts": pending, "model": model})["results"]
+            except requests.RequestException as e:
+                if not is_not_found(e):
+                    if not return_exceptions:
+                        raise
+                    scored = [e] * len(pending)
+                else:
+                    self._missing.add("/predict/batch")
+        if scored is None:
+            # Older API without the batch endpoint: score one by one
+            scored = []
+            for text in pending:
+                try:
+                    scored.append(self._predict(text, model, deadline))
+                except requests.RequestException as e:
+                    if not return_exceptions:
+                        raise
+                    scored.append(e)
+
+        self._store(pending, model, scored)
+        for i, result in zip(misses, scored):
+            results[i] = result
+        return results
+
+    def iter_predict_many(
+        self,
+        texts: list[str],
+        model: str = "finetuned",
+        deadline: Optional[float] = None,
+        return_exceptions: bool = False,
+    ) -> Iterator[tuple[int, list]]:
+        """
+        Predict many texts, yielding results a chunk at a time as they arrive.
+
+        Args:
+            texts: Input texts to classify.
+            model: Either "finetuned" or "pretrained".
+            deadline: Seconds the whole call may take (None for no limit).
+            return_exceptions: Return a failed text's exception in place of
+                its result, instead of raising it.
+
+        Yields:
+            (start, results) per chunk of batch_size texts, in input order.
+
+        Raises:
+            requests.RequestException: If a request fails and return_exceptions is False.
+            DeadlineExceeded: If the deadline passes.
+        """
+        deadline = _Deadline(deadline)
+        starts = self._chunks(len(texts), self.batch_size)
+
+        def score(start: int) -> tuple[int, list]:
+            return start, self._predict_chunk(texts[start:start + self.batch_size], model, deadline, return_exceptions)
+
+        if len(starts) <= 1:
+            yield from map(score, starts)
+            return
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            yield from pool.map(score, starts)
+
+    def predict_many(
+        self,
+        texts: list[str],
+        model: str = "finetuned",
+        deadline: Optional[float] = None,
+        return_exceptions: bool = False,
+    ) -> list:
+        """
+        Predict many texts through batch requests, several in flight at once.
+
+        Args:
+            texts: Input texts to classify.
+            model: Either "finetuned" or "pretrained".
+            deadline: Seconds the whole call may take (None for no limit).
+            return_exceptions: Return a failed text's exception in place of
+                its result, instead of raising it.
+
+        Returns:
+            List of dicts with 'label' and 'confidence' keys, in input order.
+
+        Raises:
+            requests.RequestException: If a request fails and return_exceptions is False.
+            DeadlineExceeded: If the deadline passes.
+        """
+        return [result for _, chunk in self.iter_predict_many(texts, model, deadline, return_exceptions) for result in chunk]
+
+    def _compare(self, text: str, deadline: _Deadline) -> dict:
+        if "/predict/compare" not in self._missing:
+            try:
+                return self._post("/predict/compare", deadline, {"text": text})
+            except requests.HTTPError as e:
+                if not is_not_found(e):
+                    raise
+                self._missing.add("/predict/compare")
+        return {
+            "pretrained": self._predict(text, "pretrained", deadline),
+            "finetuned": self._predict(text, "finetuned", deadline),
+        }
+
+    def compare(self, text: str, deadline: Optional[float] = None) -> dict:
+        """
+        Score one text with both the fine-tuned and pretrained models.
+
+        Args:
+            text: Input text to classify.
+            deadline: Seconds the call may take (None for no limit).
+
+        Returns:
+            Dict with 'finetuned' and 'pretrained' keys, each with 'label' and
+            'confidence' keys (and 'scores', on APIs with /predict/compare).
+
+        Raises:
+            requests.RequestException: If the API request fails.
+            DeadlineExceeded: If the deadline passes.
+        """
+        return self._compare(text, _Deadline(deadline))
+
+    def compare_many(
+        self, texts: list[str], deadline: Optional[float] = None, return_exceptions: bool = False
+    ) -> list:
+        """
+        Score many texts with both models, several batch requests in flight at once.
+
+        Args:
+            texts: Input texts to classify.
+            deadline: Seconds the whole call may take (None for no limit).
+            return_exceptions: Return a failed text's exception in place of
+                its result, instead of raising it.
+
+        Returns:
+            List of dicts shaped like compare() results, in input order.
+
+        Raises:
+            requests.RequestException: If a request fails and return_exceptions is False.
+            DeadlineExceeded: If the deadline passes.
+        """
+        deadline = _Deadline(deadline)
+
+        def score(start: int) -> list:
+            chunk = texts[start:start + self.batch_size]
+            if "/predict/compare/batch" not in self._missing:
+                try:
+                    return self._post("/predict/compare/batch", deadline, {"texts": chunk})["results"]
+                except requests.RequestException as e:
+                    if not is_not_found(e):
+                        if not return_exceptions:
+                            raise
+                        return [e] * len(chunk)
+                    self._missing.add("/predict/compare/batch")
+            results = []
+            for text in chunk:
+                try:
+                    results.append(self._compare(text, deadline))
+                except requests.RequestException as e:
+                    if not return_exceptions:
+                        raise
+                    results.append(e)
+            return results
+
+        starts = self._chunks(len(texts), self.batch_size)
+        if len(starts) <= 1:
+            return [result for start in starts for result in score(start)]
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            return [result for chunk in pool.map(score, starts) for result in chunk]
+
+
+class AsyncSentimentClient(_BaseClient):
+    """
+    Asyncio client for the sentiment analysis API.
+
+    Has the same methods as SentimentClient, as coroutines, and raises
+    httpx.HTTPError where that raises requests.RequestException. Use as an
+    async context manager, or await aclose(), to release the pooled connections.
+    """
+
+    def __init__(self, base_url: Union[str, list[str]], **options):
+        """
+        Initialize the client.
+
+        Args:
+            base_url: API URL, or several replica URLs as a list or a comma-separated string.
+            **options: Pool, retry, batching and cache settings (see _BaseClient).
+        """
+        super().__init__(base_url, **options)
+        self.http = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=self.pool_size * len(self.replicas.replicas),
+                max_keepalive_connections=self.pool_size * len(self.replicas.replicas),
+            ),
+        )
+
+    async def __aenter__(self) -> "AsyncSentimentClient":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """Close the pooled connections and stop health checks."""
+        self.replicas.stop_health_checks()
+        await self.http.aclose()
+
+    async def _request(self, method: str, path: str, deadline: _Deadline, **kwargs) -> httpx.Response:
+        attempt = 0
+        while True:
+            timeout = deadline.cap(self.timeout)
+            replica = self.replicas.acquire()
+            failed = True
+            try:
+                response = await self.http.request(method, replica.url + path, timeout=timeout, **kwargs)
+                failed = response.status_code >= 500
+            except httpx.TimeoutException as e:
+                if deadline.expired:
+                    failed = False
+                    raise DeadlineExceeded("Deadline exceeded") from e
+                if not isinstance(e, httpx.ConnectTimeout) or not self._should_retry(attempt, None):
+                    raise
+                response = None
+            except httpx.ConnectError:
+                if not self._should_retry(attempt, None):
+                    raise
+                response = None
+            finally:
+                self.replicas.release(replica, failed)
+            if response is not None and not self._should_retry(attempt, response):
+                response.raise_for_status()
+                return response
+            await asyncio.sleep(deadline.cap(self._retry_delay(attempt, response)))
+            attempt += 1
+
+    async def _post(self, path: str, deadline: _Deadline, payload: dict) -> dict:
+        return (await self._request("POST", path, deadline, json=payload)).json()
+
+    async def health(self, timeout: float = 5.0) -> bool:
+        """Health check every replica now, returning whether any of them is healthy."""
+
+        async def check(replica: _Replica) -> bool:
+            try:
+                response = await self.http.get(replica.url + self.replicas.health_path, timeout=timeout)
+                healthy = response.status_code < 500
+            except httpx.HTTPError:
+                healthy = False
+            self.replicas.record_health(replica, healthy)
+            return healthy
+
+        return any(await asyncio.gather(*(check(replica) for replica in self.replicas.replicas)))
+
+    async def _predict(self, text: str, model: str, deadline: _Deadline) -> dict:
+        result = self.cache.get(model, text) if self.cache is not None else None
+        if result is not None:
+            return result
+        path = f"/predict/{model}"
+        if path not in self._missing:
+            try:
+                result = await self._post(path, deadline, {"text": text})
+            except httpx.HTTPStatusError as e:
+                if not is_not_found(e):
+                    raise
+                self._missing.add(path)
+        if result is None:
+            result = await self._post("/predict", deadline, {"text": text})
+        self._store([text], model, [result])
+        return result
+
+    async def predict(self, text: str, model: str = "finetuned", deadline: Optional[float] = None) -> dict:
+        """Predict the sentiment of one text. See SentimentClient.predict()."""
+        return await self._predict(text, model, _Deadline(deadline))
+
+    async def _predict_chunk(self, texts: list[str], model: str, deadline: _Deadline, return_exceptions: bool) -> list:
+        results = self._cached(texts, model)
+        misses = [i for i, result in enumerate(results) if result is None]
+        if not misses:
+            return results
+        pending = [texts[i] for i in misses]
+
+        scored = None
+        if "/predict/batch" not in self._missing:
+            try:
+                scored = (await self._post("/predict/batch", deadline, {"texts": pending, "model": model}))["results"]
+            except httpx.HTTPError as e:
+                if not is_not_found(e):
+                    if not return_exceptions:
+                        raise
+                    scored = [e] * len(pending)
+                else:
+                    self._missing.add("/predict/batch")
+        if scored is None:
+            scored = []
+            for text in pending:
+                try:
+                    scored.append(await self._predict(text, model, deadline))
+                except httpx.HTTPError as e:
+                    if not return_exceptions:
+                        raise
+                    scored.append(e)
+
+        self._store(pending, model, scored)
+        for i, result in zip(misses, scored):
+            results[i] = result
+        return results
+
+    async def iter_predict_many(
+        self,
+        texts: list[str],
+        model: str = "finetuned",
+        deadline: Optional[float] = None,
+        return_exceptions: bool = False,
+    ) -> AsyncIterator[tuple[int, list]]:
+        """Predict many texts, yielding (start, results) per chunk in input order. See SentimentClient.iter_predict_many()."""
+        deadline = _Deadline(deadline)
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def score(start: int) -> list:
+            async with semaphore:
+                return await self._predict_chunk(texts[start:start + self.batch_size], model, deadline, return_exceptions)
+
+        starts = self._chunks(len(texts), self.batch_size)
+        tasks = [asyncio.ensure_future(score(start)) for start in starts]
+        try:
+            for start, task in zip(starts, tasks):
+                yield start, await task
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def predict_many(
+        self,
+        texts: list[str],
+        model: str = "finetuned",
+        deadline: Optional[float] = None,
+        return_exceptions: bool = False,
+    ) -> list:
+        """Predict many texts through concurrent batch requests. See SentimentClient.predict_many()."""
+        results = []
+        async for _, chunk in self.iter_predict_many(texts, model, deadline, return_exceptions):
+            results.extend(chunk)
+        return results
+
+    async def _compare(self, text: str, deadline: _Deadline) -> dict:
+        if "/predict/compare" not in self._missing:
+            try:
+                return await self._post("/predict/compare", deadline, {"text": text})
+            except httpx.HTTPStatusError as e:
+                if not is_not_found(e):
+                    raise
+                self._missing.add("/predict/compare")
+        pretrained, finetuned = await asyncio.gather(
+            self._predict(text, "pretrained", deadline), self._predict(text, "finetuned", deadline)
+        )
+        return {"pretrained": pretrained, "finetuned": finetuned}
+
+    async def compare(self, text: str, deadline: Optional[float] = None) -> dict:
+        """Score one text with both models. See SentimentClient.compare()."""
+        return await self._compare(text, _Deadline(deadline))
+
+    async def compare_many(
+        self, texts: list[str], deadline: Optional[float] = None, return_exceptions: bool = False
+    ) -> list:
+        """Score many texts with both models. See SentimentClient.compare_many()."""
+        deadline = _Deadline(deadline)
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def score(start: int) -> list:
+            chunk = texts[start:start + self.batch_size]
+            async with semaphore:
+                if "/predict/compare/batch" not in self._missing:
+                    try:
+                        return (await self._post("/predict/compare/batch", deadline, {"texts": chunk}))["results"]
+                    except httpx.HTTPError as e:
+                        if not is_not_found(e):
+                            if not return_exceptions:
+                                raise
+                            return [e] * len(chunk)
+                        self._missing.add("/predict/compare/batch")
+                results = []
+                for text in chunk:
+                    try:
+                        results.append(await self._compare(text, deadline))
+                    except httpx.HTTPError as e:
+                        if not return_exceptions:
+                            raise
+                        results.append(e)
+                return results
+
+        chunks = await asyncio.gather(*(score(start) for start in self._chunks(len(texts), self.batch_size)))
+        return [result for chunk in chunks for result in chunk]
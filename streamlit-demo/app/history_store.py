@@ -0,0 +1,368 @@
+"""Persistent store of analyzed reviews with running aggregates for the Analytics tab."""
+import atexit
+import sqlite3
+import threading
+from collections import deque
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Optional, Union
+
+import numpy as np
+import pandas as pd
+
+LABELS = ("negative", "neutral", "positive")
+
+# Timestamps are stored as seconds from this point in local wall-clock time,
+# which pd.to_datetime(unit="s") turns back into the same naive datetimes
+EPOCH = datetime(1970, 1, 1)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY,
+    session TEXT NOT NULL DEFAULT '',
+    created_at REAL NOT NULL,
+    text TEXT NOT NULL,
+    sentiment INTEGER NOT NULL,
+    confidence REAL NOT NULL,
+    validated INTEGER
+);
+"""
+_INDEX = "CREATE INDEX IF NOT EXISTS idx_history_session_created_at ON history (session, created_at)"
+
+
+def _seconds(timestamp: datetime) -> float:
+    return (timestamp - EPOCH).total_seconds()
+
+
+def _range_clause(session: str, start: Optional[datetime], end: Optional[datetime]) -> tuple[str, list]:
+    """WHERE clause and parameters selecting a session's entries between two times (either may be open)."""
+    return (
+        "WHERE session = ? AND created_at >= ? AND created_at <= ?",
+        [session, _seconds(start) if start else float("-inf"), _seconds(end) if end else float("inf")],
+    )
+
+
+class HistoryDatabase:
+    """
+    SQLite file holding every session's history, with buffered writes.
+
+    One instance is shared by all sessions: it owns the connection and the
+    write buffer. Pending rows are inserted in one transaction once
+    ``flush_size`` are waiting, and a background thread flushes the rest
+    every ``flush_interval`` seconds, so at most that much is lost if the
+    process is killed.
+    """
+
+    def __init__(self, path: Union[str, Path] = ":memory:", flush_size: int = 100, flush_interval: float = 2.0):
+        """
+        Open the database, creating it if needed.
+
+        Args:
+            path: Location of the SQLite database file (":memory:" keeps
+                history for this process only).
+            flush_size: Pending rows that trigger an immediate write.
+            flush_interval: Seconds between background writes of pending rows.
+        """
+        if str(path) != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        # One connection shared by Streamlit's script threads, serialized by the lock
+        self._conn = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        # Databases created before history was kept per session
+        if "session" not in {column[1] for column in self._conn.execute("PRAGMA table_info(history)")}:
+            self._conn.execute("ALTER TABLE history ADD COLUMN session TEXT NOT NULL DEFAULT ''")
+        self._conn.execute(_INDEX)
+        self._lock = threading.RLock()
+
+        self.flush_size = flush_size
+        self._pending: list[tuple] = []
+        self._closed = threading.Event()
+        self._flusher = threading.Thread(
+            target=self._flush_periodically, args=(flush_interval,), name="history-flush", daemon=True
+        )
+        self._flusher.start()
+        atexit.register(self.close)
+
+    def _flush_periodically(self, interval: float) -> None:
+        while not self._closed.wait(interval):
+            self.flush()
+
+    def insert(self, row: tuple) -> None:
+        """Buffer a (session, created_at, text, sentiment, confidence, validated) row."""
+        with self._lock:
+            self._pending.append(row)
+            if len(self._pending) >= self.flush_size:
+                self.flush()
+
+    def flush(self) -> None:
+        """Write pending rows in one transaction."""
+        with self._lock:
+            if not self._pending:
+                return
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "INSERT INTO history (session, created_at, text, sentiment, confidence, validated) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    self._pending,
+                )
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            self._pending = []
+
+    def query(self, sql: str, params: Union[list, tuple] = ()) -> list[tuple]:
+        """Run a statement after flushing pending rows, returning every result row."""
+        with self._lock:
+            self.flush()
+            return self._conn.execute(sql, params).fetchall()
+
+    def delete_session(self, session: str) -> None:
+        """Delete a session's rows, pending or written."""
+        with self._lock:
+            self._pending = [row for row in self._pending if row[0] != session]
+            self._conn.execute("DELETE FROM history WHERE session = ?", (session,))
+
+    def close(self) -> None:
+        """Stop the background writer and write anything still pending."""
+        self._closed.set()
+        self.flush()
+
+
+class HistoryStore:
+    """
+    One session's analyzed reviews, persisted in a HistoryDatabase, with running aggregates.
+
+    Only a bounded amount is held in memory: the session's most recent
+    ``ring_size`` entries, for the Analyze tab. Counts, confidence sums and
+    validation tallies per label are loaded once when the store opens and
+    updated as entries are added, so the summary figures cost the same at any
+    history size. Charts and the log query the database by time range through
+    the (session, created_at) index.
+    """
+
+    def __init__(
+        self,
+        database: Union[HistoryDatabase, str, Path] = ":memory:",
+        session: str = "",
+        ring_size: int = 1000,
+    ):
+        """
+        Initialize the store.
+
+        Args:
+            database: Shared HistoryDatabase, or a path to open one at.
+            session: Key the entries are stored, read and cleared under.
+            ring_size: Most recent entries kept in memory for recent().
+        """
+        self.database = database if isinstance(database, HistoryDatabase) else HistoryDatabase(database)
+        self.session = session
+        self._recent: deque = deque(maxlen=ring_size)
+        self._lock = threading.Lock()
+        self._load_aggregates()
+
+    def _load_aggregates(self) -> None:
+        self.count = 0
+        self.confidence_sum = 0.0
+        self.label_counts = [0] * len(LABELS)
+        self.label_confidence_sums = [0.0] * len(LABELS)
+        self.validated_counts = [0] * len(LABELS)
+        self.correct_counts = [0] * len(LABELS)
+        rows = self.database.query(
+            "SELECT sentiment, validated, COUNT(*), SUM(confidence) FROM history "
+            "WHERE session = ? GROUP BY sentiment, validated",
+            (self.session,),
+        )
+        for label, validated, count, confidence_sum in rows:
+            self.count += count
+            self.confidence_sum += confidence_sum
+            self.label_counts[label] += count
+            self.label_confidence_sums[label] += confidence_sum
+            if validated is not None:
+                self.validated_counts[label] += count
+                self.correct_counts[label] += count if validated else 0
+
+        recent = self.database.query(
+            "SELECT session, created_at, text, sentiment, confidence, validated FROM history "
+            "WHERE session = ? ORDER BY created_at DESC LIMIT ?",
+            (self.session, self._recent.maxlen),
+        )
+        self._recent.extend(reversed(recent))
+
+    def __len__(self) -> int:
+        return self.count
+
+    def add(self, item: dict) -> None:
+        """
+        Add an analyzed review.
+
+        Args:
+            item: Dict with 'full_text' (or 'text'), 'sentiment', 'confidence',
+                and optionally 'timestamp' (defaults to now) and 'validated'.
+        """
+        label = LABELS.index(item["sentiment"])
+        validated = item.get("validated")
+        row = (
+            self.session,
+            _seconds(item.get("timestamp") or datetime.now()),
+            item.get("full_text", item["text"]),
+            label,
+            float(item["confidence"]),
+            None if validated is None else int(bool(validated)),
+        )
+
+        with self._lock:
+            self.database.insert(row)
+            self._recent.append(row)
+            self.count += 1
+            self.confidence_sum += row[4]
+            self.label_counts[label] += 1
+            self.label_confidence_sums[label] += row[4]
+            if validated is not None:
+                self.validated_counts[label] += 1
+                self.correct_counts[label] += bool(validated)
+
+    def clear(self) -> None:
+        """Delete this session's entries."""
+        with self._lock:
+            self._recent.clear()
+            self.database.delete_session(self.session)
+            self._load_aggregates()
+
+    @staticmethod
+    def _item(row: tuple) -> dict:
+        _, created_at, text, label, confidence, validated = row
+        item = {
+            "text": text[:80] + "..." if len(text) > 80 else text,
+            "full_text": text,
+            "sentiment": LABELS[label],
+            "confidence": confidence,
+            "timestamp": EPOCH + timedelta(seconds=created_at),
+        }
+        if validated is not None:
+            item["validated"] = bool(validated)
+        return item
+
+    def recent(self, count: int) -> list[dict]:
+        """The ``count`` most recent entries (up to ring_size), newest first."""
+        with self._lock:
+            rows = [self._recent[i] for i in range(len(self._recent) - 1, max(len(self._recent) - count, 0) - 1, -1)]
+        return [self._item(row) for row in rows]
+
+    @property
+    def average_confidence(self) -> float:
+        """Mean confidence over every entry (0 when empty)."""
+        return self.confidence_sum / self.count if self.count else 0.0
+
+    @property
+    def most_common(self) -> Optional[str]:
+        """Most frequent label, or None when empty."""
+        if not self.count:
+            return None
+        return LABELS[max(range(len(LABELS)), key=self.label_counts.__getitem__)]
+
+    @property
+    def validated_count(self) -> int:
+        """Entries with user feedback."""
+        return sum(self.validated_counts)
+
+    @property
+    def correct_count(self) -> int:
+        """Entries the user marked as correct."""
+        return sum(self.correct_counts)
+
+    def counts(self) -> dict[str, int]:
+        """Number of entries per label, for labels that occur."""
+        return {label: count for label, count in zip(LABELS, self.label_counts) if count}
+
+    def mean_confidence_by_label(self) -> dict[str, float]:
+        """Mean confidence per label, for labels that occur."""
+        return {
+            label: total / count
+            for label, total, count in zip(LABELS, self.label_confidence_sums, self.label_counts)
+            if count
+        }
+
+    def validation_by_label(self) -> dict[str, tuple[int, int]]:
+        """(correct, validated) counts per label."""
+        return {
+            label: (correct, validated)
+            for label, correct, validated in zip(LABELS, self.correct_counts, self.validated_counts)
+        }
+
+    def sentiment_over_time(
+        self, max_points: int, start: Optional[datetime] = None, end: Optional[datetime] = None
+    ) -> pd.DataFrame:
+        """
+        Sentiment score (0 negative, 1 neutral, 2 positive) over time, at most ``max_points`` points.
+
+        Up to ``max_points`` entries in the range are returned as they are.
+        Beyond that, the range is split into ``max_points`` equal intervals,
+        aggregated in SQL, and each non-empty interval becomes one point at
+        its mean time and mean score.
+
+        Args:
+            max_points: Maximum number of points to return.
+            start: Earliest entry to include (None for no limit).
+            end: Latest entry to include (None for no limit).
+
+        Returns:
+            DataFrame sorted by time with timestamp, sentiment_score and
+            count (entries in the point) columns.
+        """
+        where, params = _range_clause(self.session, start, end)
+        [(count, first, last)] = self.database.query(
+            f"SELECT COUNT(*), MIN(created_at), MAX(created_at) FROM history {where}", params
+        )
+        if count <= max_points:
+            rows = self.database.query(
+                f"SELECT created_at, sentiment, 1 FROM history {where} ORDER BY created_at", params
+            )
+        else:
+            width = (last - first) / max_points or 1.0
+            rows = self.database.query(
+                f"SELECT AVG(created_at), AVG(sentiment), COUNT(*) FROM history {where} "
+                f"GROUP BY MIN(CAST((created_at - ?) / ? AS INTEGER), ?) ORDER BY 1",
+                params + [first, width, max_points - 1],
+            )
+
+        columns = np.array(rows, dtype=np.float64).reshape(-1, 3)
+        return pd.DataFrame({
+            "timestamp": pd.to_datetime(columns[:, 0], unit="s"),
+            "sentiment_score": columns[:, 1],
+            "count": columns[:, 2].astype(np.int64),
+        })
+
+    def frame(
+        self, limit: Optional[int] = None, start: Optional[datetime] = None, end: Optional[datetime] = None
+    ) -> pd.DataFrame:
+        """
+        Entries in a time range as a DataFrame, oldest first.
+
+        Args:
+            limit: Keep only the most recent ``limit`` entries in the range.
+            start: Earliest entry to include (None for no limit).
+            end: Latest entry to include (None for no limit).
+
+        Returns:
+            DataFrame with timestamp, sentiment, confidence, validated (True,
+            False or None) and text columns.
+        """
+        where, params = _range_clause(self.session, start, end)
+        rows = self.database.query(
+            f"SELECT created_at, sentiment, confidence, validated, text FROM history {where} "
+            "ORDER BY created_at DESC LIMIT ?",
+            params + [-1 if limit is None else limit],
+        )
+        rows.reverse()
+        created_at, labels, confidences, validated, texts = zip(*rows) if rows else ((),) * 5
+        return pd.DataFrame({
+            "timestamp": pd.to_datetime(np.array(created_at, dtype=np.float64), unit="s"),
+            "sentiment": pd.Categorical.from_codes(np.array(labels, dtype=np.int8), LABELS),
+            "confidence": np.array(confidences, dtype=np.float64),
+            "validated": pd.Series([None if v is None else bool(v) for v in validated], dtype=object),
+            "text": pd.Series(texts, dtype=object),
+        })
@@ -1,22 +1,41 @@
 import os
+import uuid
 import streamlit as st
 from models_loader import ModelComparison
-from app.api_client import health_check, get_api_url
+from app.api_client import health_check, get_api_url, get_client
+from app.batch_results import BatchResults
+from app.history_store import HistoryDatabase, HistoryStore
 from tabs import render_analyze, render_batch_csv, render_analytics, render_compare
 
 # Validate API_URL environment variable
 API_URL = os.getenv("API_URL", "http://localhost:8000")
-if not API_URL.startswith(("http://", "https://")):
+if not all(url.strip().startswith(("http://", "https://")) for url in API_URL.split(",")):
     st.error(f"⚠️ Invalid API_URL format: {API_URL}")
 
-if "history" not in st.session_state:
-    st.session_state.history = []
+# Analysis history is kept on disk in one database shared by every session
+HISTORY_DB_PATH = os.getenv("HISTORY_DB_PATH", "data/history.db")
+
+
+@st.cache_resource
+def get_history_database(path: str) -> HistoryDatabase:
+    return HistoryDatabase(path)
+
+
+# Each browser session reads and clears only its own entries. The key lives in
+# the URL, so a reload (or a bookmark) picks the same history back up.
+if "session" not in st.query_params:
+    st.query_params["session"] = uuid.uuid4().hex
+if "history" not in st.session_state or st.session_state.history.session != st.query_params["session"]:
+    st.session_state.history = HistoryStore(get_history_database(HISTORY_DB_PATH), st.query_params["session"])
+
 if "pending_result" not in st.session_state:
     st.session_state.pending_result = None
 if "csv_results" not in st.session_state:
-    st.session_state.csv_results = []
-if "csv_validated" not in st.session_state:
-    st.session_state.csv_validated = []
+    st.session_state.csv_results = BatchResults()
+if "csv_errors" not in st.session_state:
+    st.session_state.csv_errors = []
+if "csv_export" not in st.session_state:
+    st.session_state.csv_export = None
 
 
 @st.cache_resource
@@ -28,7 +47,7 @@ def init_comparison(api_url: str):
 
 # Sidebar for API configuration
 st.sidebar.title("⚙️ Configuration")
-api_url = st.sidebar.text_input("API URL", value=get_api_url(), help="URL of the sentiment analysis API")
+api_url = st.sidebar.text_input("API URL", value=get_api_url(), help="URL of the sentiment analysis API, or several replica URLs separated by commas")
 
 # Store API URL in session state for tabs to access
 st.session_state.api_url = api_url
@@ -37,6 +56,10 @@ st.session_state.api_url = api_url
 if st.sidebar.button("Check API Health"):
     with st.sidebar.spinner("Checking..."):
         is_healthy = health_check(api_url)
+        replicas = get_client(api_url).replicas.status()
+        if len(replicas) > 1:
+            for replica in replicas:
+                st.sidebar.caption(f"{'❌' if replica['ejected'] else '✅'} {replica['url']}")
         if is_healthy:
             st.sidebar.success("✅ API is healthy")
         else:
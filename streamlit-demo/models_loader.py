@@ -1,6 +1,6 @@
 """Model comparison using API endpoints."""
 from typing import Optional
-from app.api_client import predict_pretrained, predict_finetuned
+from app.api_client import compare_models, compare_models_batch, predict_pretrained, predict_finetuned
 
 
 class ModelComparison:
@@ -36,13 +36,25 @@ class ModelComparison:
         """
         Compare predictions from pretrained and fine-tuned models.
         
+        Uses the API's single-pass compare endpoint; the client falls back to
+        one request per model on APIs that don't have it.
+        
         Args:
             text: Input text to classify.
         
         Returns:
             Dict with 'pretrained' and 'finetuned' keys, each containing prediction results.
         """
-        return {
-            "pretrained": self.predict_with_model(text, "pretrained"),
-            "finetuned": self.predict_with_model(text, "finetuned"),
-        }
+        return compare_models(text, self.api_url)
+
+    def compare_batch(self, texts: list[str]) -> list[dict]:
+        """
+        Compare predictions from both models on several texts through batch requests.
+        
+        Args:
+            texts: Input texts to classify.
+        
+        Returns:
+            List of dicts shaped like compare() results, in input order.
+        """
+        return compare_models_batch(texts, self.api_url)
@@ -1,36 +1,44 @@
-from collections import Counter
+from datetime import datetime, timedelta
 import streamlit as st
 import pandas as pd
 import plotly.express as px
 
 EMOJI_MAP = {"negative": "🔴", "neutral": "🟡", "positive": "🟢"}
 COLOR_MAP = {"Negative": "#ef4444", "Neutral": "#eab308", "Positive": "#22c55e"}
+MAX_POINTS_OPTIONS = [100, 250, 500, 1000, 2000]
+TIME_RANGES = {
+    "Last hour": timedelta(hours=1),
+    "Last 24 hours": timedelta(days=1),
+    "Last 7 days": timedelta(days=7),
+    "Last 30 days": timedelta(days=30),
+    "All time": None,
+}
+# Most recent entries shown in the log; older ones stay in the database
+LOG_ROWS = 1000
 
 
 def render():
-    if not st.session_state.history:
+    history = st.session_state.history
+    if not len(history):
         st.info("No analyses yet. Analyze some reviews to see analytics.")
         return
     
-    history = st.session_state.history
-    validated = [h for h in history if "validated" in h]
-    correct = [h for h in validated if h["validated"]]
-    incorrect = [h for h in validated if not h["validated"]]
+    # Summary figures come from the store's running totals, not a scan of every entry
+    validated_count = history.validated_count
+    correct_count = history.correct_count
     
     st.subheader("📋 Summary")
     col1, col2, col3, col4 = st.columns(4)
     with col1:
         st.metric("Total Analyses", len(history))
     with col2:
-        avg_conf = sum(h["confidence"] for h in history) / len(history)
-        st.metric("Avg Confidence", f"{avg_conf:.1%}")
+        st.metric("Avg Confidence", f"{history.average_confidence:.1%}")
     with col3:
-        counts = Counter(h["sentiment"] for h in history)
-        most_common = counts.most_common(1)[0][0] if counts else "N/A"
+        most_common = history.most_common or "N/A"
         st.metric("Most Common", most_common.capitalize())
     with col4:
-        if validated:
-            accuracy = len(correct) / len(validated) * 100
+        if validated_count:
+            accuracy = correct_count / validated_count * 100
             st.metric("HITL Accuracy", f"{accuracy:.0f}%")
         else:
             st.metric("HITL Accuracy", "N/A")
@@ -38,13 +46,13 @@ def render():
     st.markdown("---")
     st.subheader("🧑‍🔬 Human-in-the-Loop Validation")
     
-    if validated:
+    if validated_count:
         col_hitl1, col_hitl2 = st.columns(2)
         
         with col_hitl1:
             hitl_data = pd.DataFrame({
                 "Feedback": ["Correct 👍", "Wrong 👎"],
-                "Count": [len(correct), len(incorrect)]
+                "Count": [correct_count, validated_count - correct_count]
             })
             fig_hitl = px.pie(
                 hitl_data, values="Count", names="Feedback", color="Feedback",
@@ -55,13 +63,13 @@ def render():
         
         with col_hitl2:
             st.markdown("**Model Accuracy by Category**")
+            validation = history.validation_by_label()
             for sentiment in ["positive", "neutral", "negative"]:
-                cat_validated = [h for h in validated if h["sentiment"] == sentiment]
+                cat_correct, cat_validated = validation[sentiment]
                 emoji = EMOJI_MAP[sentiment]
                 if cat_validated:
-                    cat_correct = len([h for h in cat_validated if h["validated"]])
-                    cat_acc = cat_correct / len(cat_validated) * 100
-                    st.progress(cat_acc / 100, text=f"{emoji} {sentiment.capitalize()}: {cat_acc:.0f}% ({cat_correct}/{len(cat_validated)})")
+                    cat_acc = cat_correct / cat_validated * 100
+                    st.progress(cat_acc / 100, text=f"{emoji} {sentiment.capitalize()}: {cat_acc:.0f}% ({cat_correct}/{cat_validated})")
                 else:
                     st.progress(0.0, text=f"{emoji} {sentiment.capitalize()}: No data")
     else:
@@ -72,7 +80,7 @@ def render():
     
     with col_pie:
         st.subheader("Sentiment Distribution")
-        sentiment_counts = Counter(h["sentiment"] for h in history)
+        sentiment_counts = history.counts()
         df_pie = pd.DataFrame({
             "Sentiment": [s.capitalize() for s in sentiment_counts.keys()],
             "Count": list(sentiment_counts.values())
@@ -83,9 +91,11 @@ def render():
     
     with col_bar:
         st.subheader("Confidence by Sentiment")
-        df_conf = pd.DataFrame(history)
-        avg_by_sentiment = df_conf.groupby("sentiment")["confidence"].mean().reset_index()
-        avg_by_sentiment["sentiment"] = avg_by_sentiment["sentiment"].str.capitalize()
+        mean_confidence = history.mean_confidence_by_label()
+        avg_by_sentiment = pd.DataFrame({
+            "sentiment": [s.capitalize() for s in mean_confidence.keys()],
+            "confidence": list(mean_confidence.values())
+        })
         fig_bar = px.bar(avg_by_sentiment, x="sentiment", y="confidence", color="sentiment", color_discrete_map=COLOR_MAP)
         fig_bar.update_layout(margin=dict(t=0, b=0, l=0, r=0), showlegend=False, yaxis_tickformat=".0%")
         st.plotly_chart(fig_bar, width='stretch')
@@ -93,12 +103,28 @@ def render():
     st.markdown("---")
     st.subheader("Sentiment Over Time")
     
-    df_time = pd.DataFrame(history)
-    df_time["timestamp"] = pd.to_datetime(df_time["timestamp"])
-    df_time = df_time.sort_values("timestamp")
-    df_time["sentiment_score"] = df_time["sentiment"].map({"negative": 0, "neutral": 1, "positive": 2})
+    # The chart and log query only this range from the history database
+    col_range, col_resolution = st.columns(2)
+    with col_range:
+        time_range = st.selectbox("Time range", list(TIME_RANGES), index=len(TIME_RANGES) - 1, key="time_range")
+    with col_resolution:
+        max_points = st.select_slider(
+            "Resolution (max points)", options=MAX_POINTS_OPTIONS, value=500, key="time_resolution",
+            help="Longer histories are averaged into this many time intervals"
+        )
+    start = datetime.now() - TIME_RANGES[time_range] if TIME_RANGES[time_range] else None
+    df_time = history.sentiment_over_time(max_points, start=start)
+    if df_time.empty:
+        st.info("No analyses in this time range.")
+        return
+    analyses = int(df_time["count"].sum())
+    if len(df_time) < analyses:
+        st.caption(f"{analyses} analyses averaged into {len(df_time)} time intervals")
     
-    fig_line = px.line(df_time, x="timestamp", y="sentiment_score", markers=True, color_discrete_sequence=["#6366f1"])
+    fig_line = px.line(
+        df_time, x="timestamp", y="sentiment_score", markers=True, color_discrete_sequence=["#6366f1"],
+        hover_data={"count": True}
+    )
     fig_line.update_layout(
         yaxis=dict(tickmode="array", tickvals=[0, 1, 2], ticktext=["Negative", "Neutral", "Positive"]),
         xaxis_title="Time", yaxis_title="Sentiment", margin=dict(t=10, b=0, l=0, r=0)
@@ -107,12 +133,15 @@ def render():
     
     st.markdown("---")
     st.subheader("Analysis Log")
-    df_table = pd.DataFrame([{
-        "Time": h["timestamp"].strftime("%H:%M:%S"),
-        "Sentiment": h["sentiment"].capitalize(),
-        "Confidence": f"{h['confidence']:.1%}",
-        "Feedback": "👍" if h.get("validated") == True else ("👎" if h.get("validated") == False else "—"),
-        "Review": h["text"]
-    } for h in history])
+    df_log = history.frame(limit=LOG_ROWS, start=start).iloc[::-1]
+    if len(df_log) == LOG_ROWS:
+        st.caption(f"Showing the {LOG_ROWS} most recent analyses in this time range")
+    texts = df_log["text"]
+    df_table = pd.DataFrame({
+        "Time": df_log["timestamp"].dt.strftime("%Y-%m-%d %H:%M:%S"),
+        "Sentiment": df_log["sentiment"].astype(str).str.capitalize(),
+        "Confidence": (df_log["confidence"] * 100).map("{:.1f}%".format),
+        "Feedback": df_log["validated"].map({True: "👍", False: "👎"}).fillna("—"),
+        "Review": texts.where(texts.str.len() <= 80, texts.str.slice(0, 80) + "..."),
+    })
     st.dataframe(df_table, width='stretch', hide_index=True)
-
@@ -43,13 +43,13 @@ def render():
     
     if thumbs_up and st.session_state.pending_result:
         st.session_state.pending_result["validated"] = True
-        st.session_state.history.insert(0, st.session_state.pending_result)
+        st.session_state.history.add(st.session_state.pending_result)
         st.session_state.pending_result = None
         st.rerun()
     
     if thumbs_down and st.session_state.pending_result:
         st.session_state.pending_result["validated"] = False
-        st.session_state.history.insert(0, st.session_state.pending_result)
+        st.session_state.history.add(st.session_state.pending_result)
         st.session_state.pending_result = None
         st.rerun()
     
@@ -66,10 +66,10 @@ def render():
         with col2:
             st.metric("Confidence", f"{confidence:.1%}")
     
-    if st.session_state.history:
+    if len(st.session_state.history):
         st.markdown("---")
         st.subheader("Recent Analyses")
-        for item in st.session_state.history[:10]:
+        for item in st.session_state.history.recent(10):
             emoji = EMOJI_MAP.get(item["sentiment"], "")
             validation = ""
             if "validated" in item:
@@ -79,6 +79,6 @@ def render():
                 st.caption(item["text"])
         
         if st.button("Clear History"):
-            st.session_state.history = []
+            st.session_state.history.clear()
             st.rerun()
 
@@ -1,10 +1,121 @@
-from datetime import datetime
+import io
 import streamlit as st
 import pandas as pd
-from app.api_client import predict_sentiment, get_api_url
+from app.api_client import get_api_url, get_client
+from app.batch_results import BatchResults
 
 EMOJI_MAP = {"negative": "🔴", "neutral": "🟡", "positive": "🟢"}
 
+# Rows parsed from the upload at a time, and reviews shown per validation page
+READ_CHUNK_ROWS = 2000
+PAGE_SIZE = 20
+
+
+def _read_reviews(uploaded_file):
+    """Yield (first row number, reviews) from the upload, READ_CHUNK_ROWS rows at a time."""
+    reader = pd.read_csv(uploaded_file, usecols=["review"], dtype={"review": str}, chunksize=READ_CHUNK_ROWS)
+    start = 0
+    for chunk in reader:
+        texts = chunk["review"].fillna("").tolist()
+        yield start, texts
+        start += len(texts)
+
+
+def _process(uploaded_file, api_url: str) -> None:
+    """Score every review in the upload into a fresh BatchResults, showing progress."""
+    results = st.session_state.csv_results = BatchResults()
+    errors = st.session_state.csv_errors = []
+    st.session_state.csv_export = None
+    progress = st.progress(0)
+    status_text = st.empty()
+    done = 0
+    
+    try:
+        # Results are stored as each chunk arrives, so an interrupted run keeps them
+        for offset, texts in _read_reviews(uploaded_file):
+            # Chunks go to /predict/batch with a few requests in flight; a failed request fails only its own chunk
+            for start, scored in get_client(api_url).iter_predict_many(texts, return_exceptions=True):
+                for i, result in enumerate(scored, start):
+                    if isinstance(result, Exception):
+                        errors.append({"idx": offset + i, "text": texts[i], "error": str(result)})
+                    else:
+                        results.append(offset + i, texts[i], result["label"], result["confidence"])
+                done += len(scored)
+                status_text.text(f"Processed {done} reviews" + (f" ({len(errors)} failed)" if errors else ""))
+            # Progress by bytes parsed, as the row count isn't known up front
+            progress.progress(min(uploaded_file.tell() / max(uploaded_file.size, 1), 1.0))
+        
+        status_text.empty()
+        st.rerun()
+    except Exception as e:
+        status_text.empty()
+        st.error(f"Error processing reviews after {done}: {str(e)}")
+        st.info("Make sure the API is running and accessible.")
+
+
+def _render_pending(results: BatchResults) -> None:
+    """Show one page of predictions awaiting validation, with feedback buttons."""
+    pages = max(1, -(-results.pending_count // PAGE_SIZE))
+    # Validating the last rows of the last page can leave the selected page out of range
+    if st.session_state.get("csv_page", 1) > pages:
+        st.session_state.csv_page = pages
+    page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1, key="csv_page") if pages > 1 else 1
+    
+    for position in results.pending_positions((page - 1) * PAGE_SIZE, PAGE_SIZE):
+        item = results.item(position)
+        emoji = EMOJI_MAP.get(item["sentiment"], "")
+        
+        with st.container():
+            col_info, col_up, col_down = st.columns([4, 1, 1])
+            
+            with col_info:
+                st.markdown(f"**{emoji} {item['sentiment'].capitalize()}** ({item['confidence']:.1%})")
+                st.caption(item["text"])
+            
+            with col_up:
+                if st.button("👍", key=f"csv_up_{item['idx']}", width='stretch'):
+                    st.session_state.history.add(results.validate(position, True))
+                    st.rerun()
+            
+            with col_down:
+                if st.button("👎", key=f"csv_down_{item['idx']}", width='stretch'):
+                    st.session_state.history.add(results.validate(position, False))
+                    st.rerun()
+            
+            st.markdown("---")
+
+
+def _clear_export() -> None:
+    st.session_state.csv_export = None
+
+
+def _render_export(results: BatchResults) -> None:
+    """
+    Offer the validated rows as a CSV, built only when asked for.
+    
+    The CSV bytes are held in the session only between preparing and
+    downloading them, and are dropped once validation changes the rows.
+    """
+    export = st.session_state.csv_export
+    if export is not None and export[0] != results.version:
+        _clear_export()
+        export = None
+    if export is None:
+        if st.button(f"Prepare Export ({results.validated_count} validated)", width='stretch'):
+            buffer = io.BytesIO()
+            for chunk in results.iter_csv():
+                buffer.write(chunk.encode("utf-8"))
+            st.session_state.csv_export = export = (results.version, buffer.getvalue())
+    if export is not None:
+        st.download_button(
+            f"Download Validated Results ({results.validated_count})",
+            export[1],
+            "validated_reviews.csv",
+            "text/csv",
+            on_click=_clear_export,
+            width='stretch'
+        )
+
 
 def render():
     st.markdown("Upload a CSV file with a `review` column to batch process reviews.")
@@ -12,101 +123,36 @@ def render():
     uploaded_file = st.file_uploader("Choose a CSV file", type="csv")
     
     if uploaded_file is not None:
-        df = pd.read_csv(uploaded_file)
+        # Only the header is parsed here; rows are read in chunks while scoring
+        columns = pd.read_csv(uploaded_file, nrows=0).columns
+        uploaded_file.seek(0)
         
-        if "review" not in df.columns:
+        if "review" not in columns:
             st.error("CSV must have a 'review' column")
-        else:
-            if st.button("Process All Reviews", type="primary"):
-                st.session_state.csv_results = []
-                st.session_state.csv_validated = []
-                progress = st.progress(0)
-                status_text = st.empty()
-                
-                # Get API URL from session state if available, otherwise use default
-                api_url = st.session_state.get("api_url", get_api_url())
-                
-                try:
-                    for i, row in df.iterrows():
-                        review_text = str(row["review"])
-                        status_text.text(f"Processing review {i+1}/{len(df)}...")
-                        result = predict_sentiment(review_text, api_url)
-                        st.session_state.csv_results.append({
-                            "idx": i,
-                            "text": review_text[:80] + "..." if len(review_text) > 80 else review_text,
-                            "full_text": review_text,
-                            "sentiment": result["label"],
-                            "confidence": result["confidence"],
-                        })
-                        progress.progress((i + 1) / len(df))
-                    
-                    status_text.empty()
-                    st.rerun()
-                except Exception as e:
-                    status_text.empty()
-                    st.error(f"Error processing reviews: {str(e)}")
-                    st.info("Make sure the API is running and accessible.")
+        elif st.button("Process All Reviews", type="primary"):
+            # Get API URL from session state if available, otherwise use default
+            _process(uploaded_file, st.session_state.get("api_url", get_api_url()))
     
-    if st.session_state.csv_results or st.session_state.csv_validated:
+    results = st.session_state.csv_results
+    
+    if st.session_state.csv_errors:
+        with st.expander(f"⚠️ {len(st.session_state.csv_errors)} reviews could not be scored"):
+            st.dataframe(pd.DataFrame(st.session_state.csv_errors), hide_index=True)
+    
+    if len(results):
         st.markdown("---")
+        st.markdown(f"**Remaining: {results.pending_count} / {len(results)}**")
         
-        total = len(st.session_state.csv_results) + len(st.session_state.csv_validated)
-        remaining = len(st.session_state.csv_results)
-        st.markdown(f"**Remaining: {remaining} / {total}**")
-        
-        for item in st.session_state.csv_results:
-            idx = item["idx"]
-            emoji = EMOJI_MAP.get(item["sentiment"], "")
-            
-            with st.container():
-                col_info, col_up, col_down = st.columns([4, 1, 1])
-                
-                with col_info:
-                    st.markdown(f"**{emoji} {item['sentiment'].capitalize()}** ({item['confidence']:.1%})")
-                    st.caption(item["text"])
-                
-                with col_up:
-                    if st.button("👍", key=f"csv_up_{idx}", width='stretch'):
-                        item["validated"] = True
-                        item["timestamp"] = datetime.now()
-                        st.session_state.csv_validated.append(item.copy())
-                        st.session_state.history.insert(0, item.copy())
-                        st.session_state.csv_results.remove(item)
-                        st.rerun()
-                
-                with col_down:
-                    if st.button("👎", key=f"csv_down_{idx}", width='stretch'):
-                        item["validated"] = False
-                        item["timestamp"] = datetime.now()
-                        st.session_state.csv_validated.append(item.copy())
-                        st.session_state.history.insert(0, item.copy())
-                        st.session_state.csv_results.remove(item)
-                        st.rerun()
-                
-                st.markdown("---")
-        
-        if not st.session_state.csv_results and st.session_state.csv_validated:
+        if results.pending_count:
+            _render_pending(results)
+        else:
             st.success("All reviews validated!")
         
-        if st.session_state.csv_validated:
-            df_export = pd.DataFrame([{
-                "review": r["full_text"],
-                "sentiment": r["sentiment"],
-                "confidence": r["confidence"],
-                "validated": r["validated"]
-            } for r in st.session_state.csv_validated])
-            
-            csv_data = df_export.to_csv(index=False)
-            st.download_button(
-                f"Download Validated Results ({len(st.session_state.csv_validated)})",
-                csv_data,
-                "validated_reviews.csv",
-                "text/csv",
-                width='stretch'
-            )
+        if results.validated_count:
+            _render_export(results)
         
         if st.button("Clear Batch Results"):
-            st.session_state.csv_results = []
-            st.session_state.csv_validated = []
+            st.session_state.csv_results = BatchResults()
+            st.session_state.csv_errors = []
+            st.session_state.csv_export = None
             st.rerun()
-
@@ -1,11 +1,23 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import streamlit as st
 import pandas as pd
 import plotly.express as px
 from datetime import datetime
+from app.client import is_transient
 
 EMOJI_MAP = {"negative": "🔴", "neutral": "🟡", "positive": "🟢"}
 COLOR_MAP = {"negative": "#ef4444", "neutral": "#eab308", "positive": "#22c55e"}
 
+# Reviews per /predict/compare/batch request, and requests in flight at once
+CHUNK_SIZE = 32
+MAX_CONCURRENT_REQUESTS = 4
+# Reviews shown per page in the per-review sections
+PAGE_SIZE = 20
+
+# Accepted column names for an uploaded labeled dataset
+TEXT_COLUMNS = ("review", "text")
+LABEL_COLUMNS = ("expected", "label", "sentiment")
+
 SAMPLE_REVIEWS = [
     {"text": "Absolutely loved this product! Best purchase I've ever made.", "expected": "positive"},
     {"text": "Terrible experience. The item broke after one day. Never buying again.", "expected": "negative"},
@@ -20,42 +32,156 @@ SAMPLE_REVIEWS = [
 ]
 
 
-def _get_cache_key(api_url: str) -> str:
-    """Generate cache key based on API URL."""
-    return f"compare_results_{api_url}"
+def _get_cache_key(api_url: str, dataset: str) -> str:
+    """Generate cache key based on API URL and dataset."""
+    return f"compare_results_{api_url}_{dataset}"
 
 
-def _run_comparison(comparison, api_url: str) -> list:
-    """Run comparison on all sample reviews with progress tracking."""
-    results = []
-    progress_bar = st.progress(0)
-    status_text = st.empty()
+def _load_dataset(uploaded_file) -> tuple:
+    """
+    Read a labeled dataset from an uploaded CSV.
+    
+    Args:
+        uploaded_file: CSV with a review column and an expected label column.
+    
+    Returns:
+        (reviews, skipped) where reviews is a list of dicts with 'text' and
+        'expected' keys, and skipped counts rows with a missing review or an
+        unknown label.
+    
+    Raises:
+        ValueError: If the CSV lacks a review or label column.
+    """
+    df = pd.read_csv(uploaded_file)
+    text_col = next((c for c in TEXT_COLUMNS if c in df.columns), None)
+    label_col = next((c for c in LABEL_COLUMNS if c in df.columns), None)
+    if text_col is None or label_col is None:
+        raise ValueError(
+            f"CSV needs a review column ({', '.join(TEXT_COLUMNS)}) "
+            f"and a label column ({', '.join(LABEL_COLUMNS)})"
+        )
     
-    total = len(SAMPLE_REVIEWS)
-    for i, review in enumerate(SAMPLE_REVIEWS):
-        status_text.text(f"Processing review {i+1}/{total}...")
+    labels = df[label_col].astype(str).str.strip().str.lower()
+    valid = labels.isin(EMOJI_MAP.keys()) & df[text_col].notna()
+    reviews = [
+        {"text": text, "expected": label}
+        for text, label in zip(df.loc[valid, text_col].astype(str), labels[valid])
+    ]
+    return reviews, int((~valid).sum())
+
+
+def _error_result(review: dict, error: str) -> dict:
+    return {
+        "text": review["text"],
+        "expected": review["expected"],
+        "pretrained": {"label": "error", "confidence": 0.0},
+        "finetuned": {"label": "error", "confidence": 0.0},
+        "error": error,
+    }
+
+
+def _compare_each(comparison, texts: list) -> list:
+    """Compare texts one request at a time, so a review the API rejects fails on its own."""
+    predictions = []
+    for text in texts:
         try:
-            result = comparison.compare(review["text"])
-            results.append({
-                "text": review["text"],
-                "expected": review["expected"],
-                "pretrained": result["pretrained"],
-                "finetuned": result["finetuned"]
-            })
+            predictions.append(comparison.compare(text))
         except Exception as e:
-            st.error(f"Error processing review {i+1}: {str(e)}")
-            # Continue with other reviews even if one fails
-            results.append({
-                "text": review["text"],
-                "expected": review["expected"],
-                "pretrained": {"label": "error", "confidence": 0.0},
-                "finetuned": {"label": "error", "confidence": 0.0}
-            })
-        
-        progress_bar.progress((i + 1) / total)
+            predictions.append({"error": str(e)})
+            if is_transient(e):
+                # The API is struggling, not this review; don't pile more requests on it
+                predictions += [{"error": str(e)}] * (len(texts) - len(predictions))
+                break
+    return predictions
+
+
+def _compare_chunk(comparison, reviews: list) -> list:
+    """
+    Compare a chunk of reviews in one request.
+    
+    If the API is overloaded, unavailable or times out, every review in the
+    chunk is marked with the error, as retrying them one by one would only
+    multiply the load. Any other failure, such as a review the API rejects,
+    is retried one review at a time so it doesn't take its neighbours with it.
+    """
+    texts = [review["text"] for review in reviews]
+    try:
+        predictions = comparison.compare_batch(texts)
+    except Exception as e:
+        predictions = [{"error": str(e)}] * len(reviews) if is_transient(e) else _compare_each(comparison, texts)
+    
+    return [
+        _error_result(review, prediction["error"]) if "error" in prediction else {
+            "text": review["text"],
+            "expected": review["expected"],
+            "pretrained": prediction["pretrained"],
+            "finetuned": prediction["finetuned"],
+        }
+        for review, prediction in zip(reviews, predictions)
+    ]
+
+
+def _table_row(r: dict) -> dict:
+    """Row of the compact results table for one compared review."""
+    return {
+        "Review": r["text"][:60] + "..." if len(r["text"]) > 60 else r["text"],
+        "Expected": f"{EMOJI_MAP[r['expected']]} {r['expected'].capitalize()}",
+        "Pretrained": f"{EMOJI_MAP[r['pretrained']['label']]} {r['pretrained']['label'].capitalize()} ({r['pretrained']['confidence']:.0%})",
+        "Fine-tuned": f"{EMOJI_MAP[r['finetuned']['label']]} {r['finetuned']['label'].capitalize()} ({r['finetuned']['confidence']:.0%})",
+        "Pre ✓": "✓" if r["pretrained"]["label"] == r["expected"] else "✗",
+        "Fine ✓": "✓" if r["finetuned"]["label"] == r["expected"] else "✗",
+    }
+
+
+def _run_comparison(comparison, reviews: list) -> list:
+    """
+    Run comparison on all reviews with progress tracking.
+    
+    Chunks are compared concurrently and their rows appended to a live table
+    as they complete, but results are returned in the order of ``reviews``.
+    """
+    results = [None] * len(reviews)
+    progress_bar = st.progress(0)
+    status_text = st.empty()
+    live_table = st.dataframe(
+        pd.DataFrame(columns=["Review", "Expected", "Pretrained", "Fine-tuned", "Pre ✓", "Fine ✓"]),
+        use_container_width=True, hide_index=True
+    )
+    
+    total = len(reviews)
+    done = pretrained_correct = finetuned_correct = failed = 0
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_REQUESTS) as pool:
+        futures = {
+            pool.submit(_compare_chunk, comparison, reviews[start:start + CHUNK_SIZE]): start
+            for start in range(0, total, CHUNK_SIZE)
+        }
+        for future in as_completed(futures):
+            start = futures[future]
+            chunk = future.result()
+            results[start:start + len(chunk)] = chunk
+            
+            for r in chunk:
+                if "error" in r:
+                    failed += 1
+                    continue
+                pretrained_correct += r["pretrained"]["label"] == r["expected"]
+                finetuned_correct += r["finetuned"]["label"] == r["expected"]
+            # Only the new rows are sent to the browser, not the table so far
+            rows = [_table_row(r) for r in chunk if "error" not in r]
+            if rows:
+                live_table.add_rows(pd.DataFrame(rows))
+            done += len(chunk)
+            scored = max(done - failed, 1)
+            status_text.text(
+                f"Processed {done}/{total} reviews · "
+                f"pretrained {pretrained_correct / scored:.0%}, fine-tuned {finetuned_correct / scored:.0%} correct so far"
+                + (f" · {failed} failed" if failed else "")
+            )
+            progress_bar.progress(done / total)
     
     progress_bar.empty()
     status_text.empty()
+    live_table.empty()
     return results
 
 
@@ -65,7 +191,27 @@ def render(comparison):
     
     # Get API URL from session state for cache key
     api_url = st.session_state.get("api_url", "http://localhost:8000")
-    cache_key = _get_cache_key(api_url)
+    
+    source = st.radio("Reviews", ["Sample reviews", "Labeled CSV"], horizontal=True, key="compare_source")
+    reviews, dataset = SAMPLE_REVIEWS, "samples"
+    if source == "Labeled CSV":
+        uploaded_file = st.file_uploader(
+            "CSV with a `review` column and an `expected` label (negative, neutral or positive)",
+            type="csv", key="compare_upload"
+        )
+        if uploaded_file is None:
+            return
+        try:
+            reviews, skipped = _load_dataset(uploaded_file)
+        except ValueError as e:
+            st.error(str(e))
+            return
+        if skipped:
+            st.warning(f"Skipped {skipped} rows with a missing review or an unknown label.")
+        if not reviews:
+            return
+        dataset = f"{uploaded_file.name}_{uploaded_file.size}"
+    cache_key = _get_cache_key(api_url, dataset)
     
     # Initialize session state for cached results
     if cache_key not in st.session_state:
@@ -75,18 +221,18 @@ def render(comparison):
     col1, col2 = st.columns([3, 1])
     with col1:
         st.markdown("### Run Comparison")
-        st.caption("Click the button below to compare models on sample reviews. Results are cached until you refresh.")
+        st.caption(f"Click the button below to compare models on {len(reviews)} reviews. Results are cached until you refresh.")
     with col2:
         run_comparison = st.button("🔄 Run Comparison", type="primary", use_container_width=True)
     
-    # Run comparison if button clicked or if no cached results
-    if run_comparison or st.session_state[cache_key] is None:
+    # Run comparison if button clicked, or if no cached results for the samples
+    if run_comparison or (st.session_state[cache_key] is None and dataset == "samples"):
         if run_comparison:
             st.session_state[cache_key] = None  # Clear cache to force refresh
         
         try:
             with st.spinner("Running model comparison..."):
-                results = _run_comparison(comparison, api_url)
+                results = _run_comparison(comparison, reviews)
                 # Store results with timestamp
                 st.session_state[cache_key] = {
                     "results": results,
@@ -118,13 +264,25 @@ def render(comparison):
     
     # Filter out error results for display
     valid_results = [r for r in results if r["pretrained"]["label"] != "error"]
+    failed_results = [r for r in results if r["pretrained"]["label"] == "error"]
+    if failed_results:
+        with st.expander(f"⚠️ {len(failed_results)} reviews could not be compared"):
+            st.dataframe(pd.DataFrame(failed_results)[["text", "expected", "error"]], hide_index=True)
     if not valid_results:
         st.error("No valid results to display. Please check API connection and try again.")
         return
     
     st.subheader("📊 Comparison Results")
     
-    for i, r in enumerate(results):
+    # Large datasets are paged so each rerun renders a fixed number of reviews
+    pages = -(-len(valid_results) // PAGE_SIZE)
+    if st.session_state.get("compare_page", 1) > pages:
+        st.session_state.compare_page = pages
+    page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1, key="compare_page") if pages > 1 else 1
+    first = (page - 1) * PAGE_SIZE
+    page_results = valid_results[first:first + PAGE_SIZE]
+    
+    for i, r in enumerate(page_results, first):
         with st.container():
             st.markdown(f"**Review {i+1}:** {r['text']}")
             col1, col2, col3 = st.columns([1, 1, 1])
@@ -283,17 +441,10 @@ def render(comparison):
         )
     
     # Detailed table with better formatting
-    df_comp = pd.DataFrame([{
-        "Review": r["text"][:60] + "..." if len(r["text"]) > 60 else r["text"],
-        "Expected": f"{EMOJI_MAP[r['expected']]} {r['expected'].capitalize()}",
-        "Pretrained": f"{EMOJI_MAP[r['pretrained']['label']]} {r['pretrained']['label'].capitalize()} ({r['pretrained']['confidence']:.0%})",
-        "Fine-tuned": f"{EMOJI_MAP[r['finetuned']['label']]} {r['finetuned']['label'].capitalize()} ({r['finetuned']['confidence']:.0%})",
-        "Pre ✓": "✓" if r["pretrained"]["label"] == r["expected"] else "✗",
-        "Fine ✓": "✓" if r["finetuned"]["label"] == r["expected"] else "✗",
-    } for r in valid_results])
+    df_comp = pd.DataFrame([_table_row(r) for r in valid_results])
     
-    # Add expandable sections for each review
-    for i, r in enumerate(valid_results):
+    # Add expandable sections for each review on the current page
+    for i, r in enumerate(page_results, first):
         with st.expander(f"Review {i+1}: {r['text'][:50]}..."):
             col1, col2, col3 = st.columns(3)
             